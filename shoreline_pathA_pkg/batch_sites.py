@@ -0,0 +1,134 @@
+# batch_sites.py — train + evaluate many sites through one shared process pool
+#
+# Sites come from the registry (config.SITES_REGISTRY):
+#   {"sites": [{"name": "frankston", "ndwi_dir": "...", "waves_csv": "...", "rain_csv": "..."}, ...]}
+# Each site runs train_model.train -> evaluate_holdout.holdout -> enrich_transects.enrich into
+# SITES_ART_ROOT/<name>/ (serve it with ART_DIR=artifacts/sites/<name> uvicorn serve_api:app).
+# One site = one pool task (extraction inside a task is serial, so the pool is the only fan-out).
+# Sites are submitted longest-expected first: last run's duration from batch_report.json, else
+# NDWI bytes scaled by the seconds/byte seen on timed sites. Per-site logs go to <art_dir>/batch.log.
+#
+#   python batch_sites.py                        # every site, BATCH_WORKERS processes
+#   python batch_sites.py --sites a,b --workers 4 --full
+import os, sys, json, time, argparse, contextlib, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from config import SITES_REGISTRY, SITES_ART_ROOT, BATCH_WORKERS, INCREMENTAL_ARTIFACTS
+
+REPORT_JSON = "batch_report.json"
+
+def load_registry(path=SITES_REGISTRY):
+    """Site dicts with absolute paths; names must be unique (they become directory names)."""
+    with open(path) as f:
+        sites = json.load(f)["sites"]
+    root = os.path.dirname(os.path.abspath(path))
+    names = [s["name"] for s in sites]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate site names in {path}")
+    return [{**s, **{k: os.path.join(root, s[k]) for k in ("ndwi_dir", "waves_csv", "rain_csv")}} for s in sites]
+
+def load_report(art_root=SITES_ART_ROOT):
+    p = os.path.join(art_root, REPORT_JSON)
+    if not os.path.exists(p):
+        return {}
+    with open(p) as f:
+        return json.load(f).get("sites", {})
+
+def _ndwi_bytes(ndwi_dir):
+    if not os.path.isdir(ndwi_dir):
+        return 0
+    return sum(os.path.getsize(os.path.join(ndwi_dir, f)) for f in os.listdir(ndwi_dir) if f.lower().endswith(".tif"))
+
+def estimate_costs(sites, report):
+    """Expected seconds per site: last successful duration, else NDWI bytes x median seconds/byte."""
+    size = {s["name"]: _ndwi_bytes(s["ndwi_dir"]) for s in sites}
+    rates = [r["seconds"] / r["ndwi_bytes"] for r in report.values()
+             if r.get("status") == "ok" and r.get("ndwi_bytes")]
+    rate = float(np.median(rates)) if rates else 1e-6
+    cost = {}
+    for s in sites:
+        r = report.get(s["name"], {})
+        cost[s["name"]] = r["seconds"] if r.get("status") == "ok" and r.get("ndwi_bytes") == size[s["name"]] \
+            else size[s["name"]] * rate
+    return cost, size
+
+def run_site(site, art_dir, full=False, holdout=True):
+    """Full pipeline for one site (runs inside a pool worker); returns a report record."""
+    from train_model import train
+    from enrich_transects import enrich
+    os.makedirs(art_dir, exist_ok=True)
+    t0, c0 = time.perf_counter(), time.process_time()
+    rec = {"art_dir": os.path.abspath(art_dir)}
+    with open(os.path.join(art_dir, "batch.log"), "w") as log, contextlib.redirect_stdout(log):
+        try:
+            rec["train"] = train(site["ndwi_dir"], site["waves_csv"], site["rain_csv"], art_dir, full=full, workers=1)
+            if holdout:
+                from evaluate_holdout import holdout as score
+                m = score(art_dir, site["ndwi_dir"], site["waves_csv"], site["rain_csv"], workers=1)
+                rec["holdout_mae_m"] = None if m is None else m["mae_overall_m"]
+            enrich(art_dir)
+            rec["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc(file=log)
+            rec.update(status="error", error=f"{type(e).__name__}: {e}")
+    rec.update(seconds=round(time.perf_counter() - t0, 2), cpu_seconds=round(time.process_time() - c0, 2))
+    return rec
+
+def run_batch(sites, art_root=SITES_ART_ROOT, workers=BATCH_WORKERS, full=False, holdout=True):
+    os.makedirs(art_root, exist_ok=True)
+    report = load_report(art_root)
+    cost, size = estimate_costs(sites, report)
+    order = sorted(sites, key=lambda s: cost[s["name"]], reverse=True)
+    workers = min((os.cpu_count() or 1) if workers <= 0 else workers, len(order))
+    print(f"{len(order)} sites on {workers} workers; order: " + ", ".join(s["name"] for s in order))
+
+    t0 = time.perf_counter()
+    results = {}
+    def done(name, rec):
+        rec.update(ndwi_bytes=size[name], est_seconds=round(cost[name], 2))
+        results[name] = rec
+        print(f"  [{len(results)}/{len(order)}] {name}: {rec['status']} in {rec['seconds']:.1f}s"
+              + (f" (holdout MAE {rec['holdout_mae_m']} m)" if rec.get("holdout_mae_m") is not None else "")
+              + (f" — {rec['error']}" if rec["status"] != "ok" else ""))
+
+    if workers == 1:
+        for s in order:
+            done(s["name"], run_site(s, os.path.join(art_root, s["name"]), full, holdout))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = {ex.submit(run_site, s, os.path.join(art_root, s["name"]), full, holdout): s["name"] for s in order}
+            for fut in as_completed(futs):
+                done(futs[fut], fut.result())
+
+    wall = time.perf_counter() - t0
+    report.update(results)
+    with open(os.path.join(art_root, REPORT_JSON), "w") as f:
+        json.dump({"wall_seconds": round(wall, 2), "workers": workers,
+                   "order": [s["name"] for s in order], "sites": report}, f, indent=2)
+    n_err = sum(r["status"] != "ok" for r in results.values())
+    print(f"Batch done in {wall:.1f}s ({n_err} failed). Report: {os.path.join(art_root, REPORT_JSON)}")
+    return results
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Train and evaluate every registered site through one process pool.")
+    ap.add_argument("--registry", default=SITES_REGISTRY)
+    ap.add_argument("--art-root", default=SITES_ART_ROOT)
+    ap.add_argument("--sites", default=None, help="comma-separated subset of site names")
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS, help="processes (0 = all CPUs)")
+    ap.add_argument("--full", action="store_true", help="rebuild label/driver stores from scratch")
+    ap.add_argument("--no-holdout", action="store_true")
+    args = ap.parse_args(argv)
+
+    sites = load_registry(args.registry)
+    if args.sites:
+        want = args.sites.split(",")
+        unknown = set(want) - {s["name"] for s in sites}
+        if unknown:
+            raise SystemExit(f"Unknown sites: {', '.join(sorted(unknown))}")
+        sites = [s for s in sites if s["name"] in want]
+    results = run_batch(sites, args.art_root, args.workers, args.full or not INCREMENTAL_ARTIFACTS, not args.no_holdout)
+    return int(any(r["status"] != "ok" for r in results.values()))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# benchmark_coastline.py — polygon vs contour coastline backends: speed & position agreement
+#
+#   python benchmark_coastline.py [--ndwi-dir DIR] [--years 2000 2019]
+#
+# Extraction cache is bypassed so timings are real. Positions are compared on the
+# trained transects (artifacts/transects.csv) when present, else on transects built
+# from the baseline scene. Coastline lengths are reported per year too, so a backend
+# that traces a different (longer) feature shows up even where shared positions agree.
+import os, time, json, argparse
+import numpy as np
+import pandas as pd
+
+from config import NDWI_DIR, TRANSECT_SPACING_M, TRANSECT_LENGTH_M
+from train_model import (
+    ART_DIR, list_year_tifs, build_transects, to_3857, intersect_transects,
+    _extract_coastline, contour_coastline,
+)
+
+BACKENDS = (("polygon", _extract_coastline), ("contour", contour_coastline))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ndwi-dir", default=NDWI_DIR)
+    ap.add_argument("--years", nargs=2, type=int, default=None, metavar=("FROM", "TO"))
+    args = ap.parse_args(argv)
+
+    year2tif = list_year_tifs(args.ndwi_dir)
+    if args.years:
+        year2tif = {y: p for y, p in year2tif.items() if args.years[0] <= y <= args.years[1]}
+    if not year2tif:
+        raise RuntimeError(f"No .tif files found in {args.ndwi_dir}")
+
+    tr_csv = os.path.join(ART_DIR, "transects.csv")
+    if os.path.exists(tr_csv):
+        transects = pd.read_csv(tr_csv)
+    else:
+        base = 2010 if 2010 in year2tif else min(year2tif)
+        transects = build_transects(year2tif[base], spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M)
+
+    rows = []
+    for y, tif in year2tif.items():
+        rec = {"year": y}
+        pos = {}
+        for name, fn in BACKENDS:
+            t0 = time.perf_counter()
+            coast, crs = fn(tif)
+            rec[f"{name}_s"] = time.perf_counter() - t0
+            coast = to_3857(coast, crs)
+            rec[f"{name}_length_m"] = float(coast.length)
+            pos[name] = intersect_transects(coast, transects)
+            rec[f"{name}_valid"] = int(np.isfinite(pos[name]).sum())
+        both = np.isfinite(pos["polygon"]) & np.isfinite(pos["contour"])
+        diff = np.abs(pos["polygon"][both] - pos["contour"][both])
+        rec["n_both"] = int(both.sum())
+        rec["median_abs_diff_m"] = float(np.median(diff)) if diff.size else np.nan
+        rec["p90_abs_diff_m"] = float(np.percentile(diff, 90)) if diff.size else np.nan
+        rows.append(rec)
+        print(f"{y}: polygon {rec['polygon_s']:.3f}s {rec['polygon_length_m']:.0f} m ({rec['polygon_valid']} hits) | "
+              f"contour {rec['contour_s']:.3f}s {rec['contour_length_m']:.0f} m ({rec['contour_valid']} hits) | "
+              f"median |Δ| {rec['median_abs_diff_m']:.2f} m")
+
+    df = pd.DataFrame(rows)
+    summary = {
+        "years": int(len(df)),
+        "polygon_total_s": float(df["polygon_s"].sum()),
+        "contour_total_s": float(df["contour_s"].sum()),
+        "speedup": float(df["polygon_s"].sum() / max(df["contour_s"].sum(), 1e-9)),
+        "polygon_valid": int(df["polygon_valid"].sum()),
+        "contour_valid": int(df["contour_valid"].sum()),
+        "median_abs_diff_m": float(np.nanmedian(df["median_abs_diff_m"])) if df["n_both"].any() else None,
+    }
+    out = os.path.join(ART_DIR, "benchmark_coastline.json")
+    with open(out, "w") as f:
+        json.dump({"summary": summary, "by_year": df.to_dict(orient="records")}, f, indent=2, default=float)
+    print("\n" + json.dumps(summary, indent=2))
+    print(f"Saved: {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmark_suite.py — extraction / training throughput on synthetic sites (no real data needed)
+#
+#   python benchmark_suite.py                         # scales small,medium,large -> artifacts/benchmarks/<stamp>.json
+#   python benchmark_suite.py --scales small --repeats 5 --compare latest
+#   python benchmark_suite.py --shape jagged --noise 0.1 --nodata-frac 0.2 --compare artifacts/benchmarks/X.json
+#
+# Per scale, a synthetic site (synthetic_data.py; regenerated only when its spec changes) is
+# timed through build_transects, shoreline_position (one scene), build_labels (all years),
+# annual_features and the full train_model.train (== main()). The extraction cache is bypassed
+# so every run does the real work; the ERA5 columnar cache is warmed first. Each benchmark
+# reports the best and median of --repeats (train: one run). Results carry the git commit,
+# library versions and the config switches that change extraction. --compare flags benchmarks
+# slower than a previous result file by more than --tolerance (exit 1 with --fail-on-regression).
+import os, sys, glob, json, time, shutil, tempfile, argparse, platform, subprocess, contextlib, io
+import numpy as np
+
+import extract_cache
+import synthetic_data
+import train_model as tm
+from config import (EXTRACT_MODE, COASTLINE_BACKEND, COARSE_TO_FINE, INTERSECT_NATIVE_CRS, NDWI_THRESHOLD,
+                    RASTER_MEMORY_MB, NDWI_CUBE_DIR)
+
+SCALES = {                    # name: (pixels per side, years)
+    "small":  (256, 6),
+    "medium": (512, 10),
+    "large":  (1024, 12),
+    "xlarge": (2048, 12),
+}
+OUT_DIR = os.path.join(tm.ART_DIR, "benchmarks")
+DATA_DIR = "./cache/synthetic"
+
+def _timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": round(min(times), 4), "median_s": round(float(np.median(times)), 4), "runs": repeats}
+
+def run_scale(name, spec, repeats=3, workers=1):
+    paths = synthetic_data.write_site(os.path.join(DATA_DIR, name), spec)
+    year2tif = tm.list_year_tifs(paths["ndwi_dir"])
+    base = year2tif[tm.baseline_year(year2tif)]
+    hourly = tm.load_hourly_drivers(paths["waves_csv"], paths["rain_csv"], columns=tm.DRIVER_COLUMNS)  # warms era5 cache
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    res = {}
+    with extract_cache.bypass(), quiet:
+        transects = tm.build_transects(base)
+        res["build_transects"] = _timed(lambda: tm.build_transects(base), repeats)
+        res["shoreline_position"] = _timed(lambda: tm.shoreline_position(base, transects), repeats)
+        res["build_labels"] = _timed(lambda: tm.build_labels(paths["ndwi_dir"], workers), repeats)
+        res["annual_features"] = _timed(lambda: tm.annual_features(hourly), repeats)
+        art = tempfile.mkdtemp(prefix="bench_art_")
+        try:
+            res["train"] = _timed(lambda: tm.train(paths["ndwi_dir"], paths["waves_csv"], paths["rain_csv"], art,
+                                                   full=True, workers=workers, profile=False, cprofile=False), 1)
+        finally:
+            shutil.rmtree(art, ignore_errors=True)
+    res["shoreline_position"]["per_mpix_s"] = round(res["shoreline_position"]["best_s"] / (spec["height"] * spec["width"] / 1e6), 4)
+    return {"spec": spec, "n_transects": int(len(transects)), "n_years": len(year2tif), "bench": res}
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import pandas, shapely, rasterio, sklearn
+    return {
+        "commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+        "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pandas.__version__,
+        "shapely": shapely.__version__, "rasterio": rasterio.__version__, "sklearn": sklearn.__version__,
+        "config": {"EXTRACT_MODE": EXTRACT_MODE, "COASTLINE_BACKEND": COASTLINE_BACKEND,
+                   "COARSE_TO_FINE": COARSE_TO_FINE, "INTERSECT_NATIVE_CRS": INTERSECT_NATIVE_CRS,
+                   "NDWI_THRESHOLD": str(NDWI_THRESHOLD), "RASTER_MEMORY_MB": RASTER_MEMORY_MB,
+                   "NDWI_CUBE_DIR": NDWI_CUBE_DIR},
+    }
+
+def compare(current, previous, tolerance):
+    """Rows (scale, bench, previous s, current s, ratio, regression?) over benchmarks present in both."""
+    rows = []
+    for scale, cur in current["scales"].items():
+        prev = previous["scales"].get(scale)
+        if prev is None or prev["spec"] != cur["spec"]:
+            continue
+        for bench, r in cur["bench"].items():
+            p = prev["bench"].get(bench)
+            if p:
+                ratio = r["best_s"] / max(p["best_s"], 1e-9)
+                rows.append((scale, bench, p["best_s"], r["best_s"], ratio, ratio > 1 + tolerance))
+    return rows
+
+def _latest(exclude):
+    files = sorted(f for f in glob.glob(os.path.join(OUT_DIR, "*.json")) if os.path.abspath(f) != os.path.abspath(exclude))
+    return files[-1] if files else None
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Synthetic-data benchmark suite.")
+    ap.add_argument("--scales", default="small,medium,large", help=f"comma list of {','.join(SCALES)}")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=1, help="extraction processes for build_labels / train")
+    ap.add_argument("--shape", choices=synthetic_data.SHAPES, default="sine")
+    ap.add_argument("--noise", type=float, default=0.05)
+    ap.add_argument("--nodata-frac", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--compare", default=None, help="previous result file, or 'latest'")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before flagging (0.15 = 15%%)")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args(argv)
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    result = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "env": environment(), "repeats": args.repeats,
+              "workers": args.workers, "scales": {}}
+    for name in args.scales.split(","):
+        size, n_years = SCALES[name]
+        spec = synthetic_data.site_spec(size, (2000, 2000 + n_years - 1), noise=args.noise,
+                                        nodata_frac=args.nodata_frac, shape=args.shape, seed=args.seed)
+        t0 = time.perf_counter()
+        result["scales"][name] = r = run_scale(name, spec, args.repeats, args.workers)
+        print(f"{name}: {size}x{size} px x {n_years} years, {r['n_transects']} transects ({time.perf_counter() - t0:.1f}s)")
+        for bench, t in r["bench"].items():
+            print(f"  {bench:<20} best {t['best_s']:8.3f}s  median {t['median_s']:8.3f}s")
+
+    out = os.path.join(OUT_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved: {out}")
+
+    if not args.compare:
+        return 0
+    ref = _latest(out) if args.compare == "latest" else args.compare
+    if ref is None:
+        print("Nothing to compare against.")
+        return 0
+    with open(ref) as f:
+        rows = compare(result, json.load(f), args.tolerance)
+    print(f"\nvs {ref}:")
+    for scale, bench, p, c, ratio, slow in rows:
+        print(f"  {scale:<7} {bench:<20} {p:8.3f}s -> {c:8.3f}s  x{ratio:.2f}" + ("  REGRESSION" if slow else ""))
+    n_slow = sum(r[-1] for r in rows)
+    print(f"{n_slow} regression(s) beyond {args.tolerance:.0%}" if rows else "No comparable benchmarks (different specs).")
+    return int(args.fail_on_regression and n_slow > 0)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,31 @@
 import os
 import pandas as pd
 
+import position_matrix
+import transect_quality
+from incremental import pruned_years
+
 BASE = os.path.dirname(os.path.abspath(__file__))
-path = os.path.join(BASE, "artifacts", "shoreline_positions_annual.csv")
+art_dir = os.path.join(BASE, "artifacts")
 
-df = pd.read_csv(path)
+pm = position_matrix.load(art_dir)
 
 # % valid positions per year
-by_year = df.groupby("year")["position_m"].apply(lambda s: s.notna().mean()).rename("valid_frac").round(3)
+by_year = pd.Series(pm.valid_fraction(axis=0), index=pd.Index(pm.years, name="year"), name="valid_frac").round(3)
 print("Valid fraction by year:")
 print(by_year.to_string())
 
 # % valid positions per transect (and summary stats)
-by_tr = df.groupby("transect_id")["position_m"].apply(lambda s: s.notna().mean()).rename("valid_frac").round(3)
+by_tr = pd.Series(pm.valid_fraction(axis=1), index=pd.Index(pm.transect_ids, name="transect_id"), name="valid_frac").round(3)
 print("\nValid fraction by transect (summary):")
 print(by_tr.describe().round(3).to_string())
 
 # save to CSVs for inspection
-out_dir = os.path.join(BASE, "artifacts")
+out_dir = art_dir
 by_year.to_csv(os.path.join(out_dir, "validity_by_year.csv"), header=True)
 by_tr.to_csv(os.path.join(out_dir, "validity_by_transect.csv"), header=True)
 print("\nSaved: artifacts/validity_by_year.csv and artifacts/validity_by_transect.csv")
+
+# transect quality index (active/dead transects) for extraction pruning and serving
+transects = pd.read_csv(os.path.join(art_dir, "transects.csv"), float_precision="round_trip")
+transect_quality.save_index(transect_quality.build_index(pm, exclude_years=pruned_years(art_dir)), transects, art_dir)
@@ -34,6 +34,90 @@ NDWI_WATER_HIGH     = True     # True: water >= threshold; False: water <= thres
 # --- transects (denser & longer = more reliable intersections) ---
 TRANSECT_SPACING_M = 50.0      # was 100.0
 TRANSECT_LENGTH_M  = 600.0     # was 400.0 (half-length per side)
+TRANSECT_NORMAL_SMOOTH = 1     # average shore normals over this many stations (1 = off)
+
+# --- extraction mode ---
+# "polygon": polygonize the water mask, take the coastline, intersect transects
+# "profile": sample NDWI along each transect and take the sub-pixel threshold crossing
+#            (no polygonization; cost scales with transects x samples)
+EXTRACT_MODE   = "polygon"
+PROFILE_STEP_M = 5.0           # sample spacing along transects in "profile" mode
+
+# Coastline tracing for "polygon" mode (and baseline transects):
+# "polygon": boundary of the polygonized water mask (pixel edges)
+# "contour": marching-squares iso-line at the NDWI threshold around the largest connected water
+#            body, water on its right (sub-pixel, no polygonizing; compare: python benchmark_coastline.py)
+COASTLINE_BACKEND = "polygon"
+
+# Coarse-to-fine coastline: threshold and shore from a COARSE_FACTOR-decimated overview ("overview"), or
+# the shore from the previous year's cached coastline ("previous"), then the largest water body's boundary
+# traced at full resolution only in the window around it (buffered by COARSE_ROI_BUFFER_M). Not the
+# full-scene line (see README). Falls back to the full scene when the overview has no water, the window
+# would cover more than COARSE_MAX_WINDOW_FRAC of the scene, or less than COARSE_MIN_OVERLAP of the
+# located shore is within two coarse pixels of the traced one.
+COARSE_TO_FINE         = False
+COARSE_FACTOR          = 8
+COARSE_ROI_BUFFER_M    = 600.0     # >= TRANSECT_LENGTH_M keeps every transect's full reach inside the window
+COARSE_ROI_SOURCE      = "overview"
+COARSE_MAX_WINDOW_FRAC = 0.6
+COARSE_MIN_OVERLAP     = 0.9
+
+# Intersect in each raster's native CRS (transects projected once per CRS) instead of
+# reprojecting every year's coastline to EPSG:3857. Positions stay metres along the 3857 transect.
+INTERSECT_NATIVE_CRS = False
+
+# Raster memory budget per scene (MB). Scenes whose working set exceeds it are processed
+# in row-strip windows with the same result as the whole-array path. 0 = always whole-array.
+RASTER_MEMORY_MB = 0
+
+# Multi-year NDWI cube (python datacube.py build): year-stacked memory-mapped copy of NDWI_DIR.
+# When set and built, scenes stored on their own grid are read from it instead of the GeoTIFFs. "" = off.
+NDWI_CUBE_DIR = ""
+
+# --- extraction parallelism ---
+# Worker processes for per-year shoreline extraction (1 = serial, 0 = all CPUs)
+EXTRACT_WORKERS = 1
+
+# --- extraction cache ---
+# Content-addressed cache of coastlines & per-year positions (file hash + NDWI settings + transects).
+# Maintenance: python extract_cache.py stats|prune|clear
+EXTRACT_CACHE     = True
+EXTRACT_CACHE_DIR = "./cache"
+
+# --- ERA5 columnar cache (merged hourly drivers; python era5_cache.py build|clear) ---
+ERA5_CACHE_DIR      = "./cache/era5"   # "" disables the cache
+ERA5_CACHE_VALIDATE = "mtime"          # "mtime": size+mtime of the CSVs; "hash": content hash
+
+# --- transect quality index (artifacts/transect_quality.csv; rebuilt by train_model.py / check_positions.py) ---
+# A transect is "active" when at least QUALITY_MIN_VALID_FRAC of years (and QUALITY_MIN_VALID_YEARS years)
+# have a valid intersection, counted over the years extracted on every transect.
+QUALITY_MIN_VALID_FRAC   = 0.10
+QUALITY_MIN_VALID_YEARS  = 3
+QUALITY_RECENT_YEARS     = 10      # window for the informational valid_frac_recent column
+QUALITY_PRUNE_EXTRACTION = False   # intersect only active transects (others stay NaN) for newly extracted years
+QUALITY_RECHECK_YEARS    = 5       # but one new year in this many (and every full rebuild) covers all transects
+QUALITY_SERVE_ACTIVE_ONLY = False  # serve_api forecasts/lists only active transects (env SERVE_ACTIVE_ONLY overrides)
+
+# --- incremental artifacts ---
+# train_model.py keeps artifacts/manifest.json of processed years and only re-extracts labels /
+# recomputes drivers for new or changed years (storm_index is renormalized over all years).
+# False (or `python train_model.py --full`) rebuilds everything.
+INCREMENTAL_ARTIFACTS = True
+
+# --- stage profiling (python train_model.py --profile [--cprofile]) ---
+# Wall/CPU/peak-memory per stage and year -> artifacts/profile_report.json; cProfile re-runs the
+# slowest scene with the extraction cache bypassed -> artifacts/profile_slowest_<year>.prof/.txt
+PROFILE_STAGES   = False
+PROFILE_CPROFILE = False
+PROFILE_MEMORY   = True    # tracemalloc peaks (slows Python-heavy stages; numbers are still comparable)
+
+# --- multi-site batch (python batch_sites.py) ---
+# Registry of sites (name, ndwi_dir, waves_csv, rain_csv; relative paths resolve against the registry's
+# folder). Each site's artifacts go to SITES_ART_ROOT/<name>, a drop-in ART_DIR for serve_api.
+SITES_REGISTRY = os.path.join(BASE_DIR, "sites.json")
+SITES_ART_ROOT = "./artifacts/sites"
+BATCH_WORKERS  = 0    # processes shared by all sites (0 = all CPUs)
 
 # --- model ---
-RIDGE_ALPHA = 1.0
+RIDGE_ALPHA = 1.0                                # fallback when < 3 years for LOO-Year CV
+RIDGE_ALPHAS = [0.1, 0.3, 1.0, 3.0, 10.0, 30.0]  # LOO-Year grid (python ridge_cv.py for larger grids / feature sets)
@@ -0,0 +1,114 @@
+# contours.py — vectorized marching squares for NDWI iso-lines (sub-pixel coastlines)
+import numpy as np
+import shapely
+from scipy import ndimage
+from shapely.geometry import LineString
+
+# edge ids within a cell (a=top-left, b=top-right, c=bottom-right, d=bottom-left)
+TOP, RIGHT, BOTTOM, LEFT = 0, 1, 2, 3
+CORNERS = np.array([[0, 0], [0, 1], [1, 1], [1, 0]])   # (row, col) of a, b, c, d within a cell
+EIGHT = np.ones((3, 3), dtype=bool)
+
+def largest_component(mask):
+    """Largest 8-connected True region of a 2-D boolean mask (all False if there is none)."""
+    labels, n = ndimage.label(mask, structure=EIGHT)
+    if n == 0:
+        return np.zeros(mask.shape, dtype=bool)
+    return labels == np.argmax(np.bincount(labels.ravel())[1:]) + 1
+
+def touching_cells(mask):
+    """Marching-squares cells (one fewer row and column) with at least one corner in mask."""
+    return mask[:-1, :-1] | mask[:-1, 1:] | mask[1:, :-1] | mask[1:, 1:]
+
+def nan_as_land(arr, level, water_high):
+    """arr with NaN set one unit on the land side of level, so iso-lines close along nodata edges."""
+    return np.where(np.isnan(arr), np.float32(level - 1 if water_high else level + 1), arr)
+
+def iso_segments(arr, level, row_offset=0, cells=None):
+    """
+    Marching squares over a 2-D array. Returns float64 [n, 2, 2] segments as (row, col)
+    in pixel-centre index space (rows shifted by `row_offset` for strips of a larger grid),
+    each running with the values >= level on its right (north-up, rows pointing south).
+    Cells with a NaN corner are skipped, and so are cells outside `cells` when given; saddles
+    are resolved with the cell-centre mean. Points on a shared cell edge are computed with
+    identical arithmetic, so neighbouring segments join exactly.
+    """
+    f = np.asarray(arr, dtype=np.float64)
+    if f.ndim != 2 or min(f.shape) < 2:
+        return np.empty((0, 2, 2))
+    a, b = f[:-1, :-1], f[:-1, 1:]
+    d, c = f[1:, :-1], f[1:, 1:]
+    A, B, C, D = a >= level, b >= level, c >= level, d >= level
+    ok = np.isfinite(a) & np.isfinite(b) & np.isfinite(c) & np.isfinite(d)
+    if cells is not None:
+        ok &= cells
+    crossed = np.stack([A != B, B != C, D != C, A != D], axis=-1) & ok[..., None]
+    ii, jj = np.nonzero(crossed.any(axis=-1))
+    if ii.size == 0:
+        return np.empty((0, 2, 2))
+
+    a, b, c, d = a[ii, jj], b[ii, jj], c[ii, jj], d[ii, jj]
+    ri = ii + row_offset   # global row index (windowed callers)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pts = np.empty((ii.size, 4, 2))
+        pts[:, TOP]    = np.c_[ri,                          jj + (level - a) / (b - a)]
+        pts[:, RIGHT]  = np.c_[ri + (level - b) / (c - b),  jj + 1]
+        pts[:, BOTTOM] = np.c_[ri + 1,                      jj + (level - d) / (c - d)]
+        pts[:, LEFT]   = np.c_[ri + (level - a) / (d - a),  jj]
+    cr = crossed[ii, jj]
+    saddle = cr.all(axis=-1)
+    high = np.stack([A[ii, jj], B[ii, jj], C[ii, jj], D[ii, jj]], axis=-1)
+    origin = np.c_[ri, jj]
+
+    # regular cells: exactly two crossed edges -> one segment, which separates every high corner
+    reg = ~saddle
+    e = np.argsort(~cr[reg], axis=-1, kind="stable")[:, :2]
+    rows = np.nonzero(reg)[0]
+    corner = np.argmax(high[rows], axis=-1)
+    segs = [_high_on_right(np.stack([pts[rows, e[:, 0]], pts[rows, e[:, 1]]], axis=1),
+                           origin[rows] + CORNERS[corner], True)]
+
+    # saddles: two segments, paired by whether the centre is on the a/c diagonal's side
+    if saddle.any():
+        s = np.nonzero(saddle)[0]
+        centre_hi = (a[s] + b[s] + c[s] + d[s]) / 4.0 >= level
+        cut_ac = centre_hi != A[ii[s], jj[s]]   # True -> corners a & c are isolated
+        p1 = np.where(cut_ac[:, None, None],
+                      np.stack([pts[s, LEFT], pts[s, TOP]], axis=1),
+                      np.stack([pts[s, TOP], pts[s, RIGHT]], axis=1))
+        p2 = np.where(cut_ac[:, None, None],
+                      np.stack([pts[s, RIGHT], pts[s, BOTTOM]], axis=1),
+                      np.stack([pts[s, LEFT], pts[s, BOTTOM]], axis=1))
+        # each saddle segment cuts off one corner: a or b for p1, c or d for p2
+        k1, k2 = np.where(cut_ac, 0, 1), np.where(cut_ac, 2, 3)
+        segs += [_high_on_right(p1, origin[s] + CORNERS[k1], high[s, k1]),
+                 _high_on_right(p2, origin[s] + CORNERS[k2], high[s, k2])]
+    return np.concatenate(segs)
+
+def _high_on_right(segs, corner, corner_high):
+    """Flip segments so `corner` lies on their right if it is high, on their left if not."""
+    p, q = segs[:, 0], segs[:, 1]
+    # z of (q - p) x (corner - p) with x = col, y = -row: negative when corner is on the right
+    z = (q[:, 0] - p[:, 0]) * (corner[:, 1] - p[:, 1]) - (q[:, 1] - p[:, 1]) * (corner[:, 0] - p[:, 0])
+    flip = (z > 0) == np.asarray(corner_high)
+    segs[flip] = segs[flip, ::-1]
+    return segs
+
+def iso_line(arr, level, transform):
+    """Longest georeferenced iso-line of `arr` at `level` (LineString; empty if none)."""
+    return longest_line(iso_segments(arr, level), transform)
+
+def _georef(segs, transform):
+    rows, cols = segs[..., 0], segs[..., 1]
+    xs, ys = transform * (cols + 0.5, rows + 0.5)
+    return shapely.linestrings(np.stack([xs, ys], axis=-1))
+
+def longest_line(segs, transform):
+    """Georeference (row, col) segments, merge them (keeping their direction) and keep the longest line."""
+    if segs.size == 0:
+        return LineString()
+    merged = shapely.line_merge(shapely.multilinestrings(_georef(segs, transform)), directed=True)
+    parts = shapely.get_parts(merged)
+    if parts.size == 0:
+        return LineString()
+    return parts[np.argmax(shapely.length(parts))]
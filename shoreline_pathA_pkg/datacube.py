@@ -0,0 +1,209 @@
+# datacube.py — year-stacked NDWI cube (one memory-mapped float32 array [n_years, H, W])
+#
+# Built once from the per-year GeoTIFFs: every scene is co-registered to the most common
+# grid (scenes already on it are copied as stored, others are reprojected, NaN outside).
+# cube.npy is year-major (each year's band contiguous, row by row), so a (years x window)
+# read touches only the needed rows of the needed years. meta.json records the grid and,
+# per year, the source file (path, size, mtime, sha256) and whether it was resampled.
+#
+# With NDWI_CUBE_DIR set, train_model reads unresampled scenes from the cube instead of
+# decoding the GeoTIFF (same values, same results). Temporal products come in one pass:
+#
+#   python datacube.py build [--ndwi-dir DIR]
+#   python datacube.py info
+#   python datacube.py frequency --years 2000:2019     # -> artifacts/water_frequency_2000_2019.tif
+import os, sys, json, shutil, argparse
+from collections import Counter
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.crs import CRS
+from rasterio.warp import reproject, Resampling
+from affine import Affine
+
+import extract_cache
+from config import NDWI_DIR, NDWI_CUBE_DIR, NDWI_THRESHOLD
+
+FORMAT_VERSION = 1
+
+def _grid(src):
+    return (src.crs.to_string() if src.crs else "", tuple(src.transform)[:6], src.height, src.width)
+
+def build(ndwi_dir=NDWI_DIR, cube_dir=NDWI_CUBE_DIR):
+    """Stack every year's band 1 onto one grid; written to a temp dir and swapped in."""
+    from train_model import list_year_tifs   # train_model imports this module
+    year2tif = list_year_tifs(ndwi_dir)
+    if not year2tif:
+        raise RuntimeError(f"No .tif files found in {ndwi_dir}")
+    grids = {}
+    for y, p in year2tif.items():
+        with rasterio.open(p) as src:
+            grids[y] = _grid(src)
+    crs, transform, height, width = Counter(grids.values()).most_common(1)[0][0]
+    transform = Affine(*transform)
+
+    tmp = f"{cube_dir.rstrip('/')}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    data = np.lib.format.open_memmap(os.path.join(tmp, "cube.npy"), mode="w+", dtype=np.float32,
+                                     shape=(len(year2tif), height, width))
+    sources = []
+    for i, (y, p) in enumerate(year2tif.items()):
+        resampled = grids[y] != (crs, tuple(transform)[:6], height, width)
+        with rasterio.open(p) as src:
+            if not resampled:
+                data[i] = src.read(1)
+            else:
+                band = np.full((height, width), np.nan, dtype=np.float32)
+                reproject(src.read(1).astype(np.float32), band, src_transform=src.transform, src_crs=src.crs,
+                          src_nodata=src.nodata, dst_transform=transform, dst_crs=CRS.from_string(crs),
+                          dst_nodata=np.nan, resampling=Resampling.bilinear)
+                data[i] = band
+        st = os.stat(p)
+        sources.append({"year": y, "path": os.path.abspath(p), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                        "sha256": extract_cache.file_hash(p), "resampled": bool(resampled)})
+    data.flush()
+    del data
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "crs": crs, "transform": list(transform)[:6],
+                   "height": height, "width": width, "sources": sources}, f, indent=2)
+    shutil.rmtree(cube_dir, ignore_errors=True)
+    os.replace(tmp, cube_dir)
+    _OPEN.pop(cube_dir, None)
+    return NDWICube(cube_dir)
+
+class NDWICube:
+    def __init__(self, cube_dir=NDWI_CUBE_DIR):
+        with open(os.path.join(cube_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise RuntimeError(f"NDWI cube {cube_dir} has an old format; rebuild it (python datacube.py build).")
+        self.data = np.load(os.path.join(cube_dir, "cube.npy"), mmap_mode="r")
+        self.years = np.array([s["year"] for s in self.meta["sources"]])
+        self.crs = CRS.from_string(self.meta["crs"]) if self.meta["crs"] else None
+        self.transform = Affine(*self.meta["transform"])
+        self._by_path = {s["path"]: i for i, s in enumerate(self.meta["sources"])}
+
+    def scene(self, year):
+        return self.data[int(np.flatnonzero(self.years == year)[0])]
+
+    def slice(self, years=None, window=None):
+        """(years, view [n, h, w], window transform) for a year range (y0, y1) and a rasterio Window."""
+        sel = np.ones(self.years.size, bool) if years is None else (self.years >= years[0]) & (self.years <= years[1])
+        idx = np.flatnonzero(sel)
+        if window is None:
+            return self.years[idx], self.data[idx[0]:idx[-1] + 1] if idx.size else self.data[:0], self.transform
+        r0, c0 = int(window.row_off), int(window.col_off)
+        r1, c1 = r0 + int(window.height), c0 + int(window.width)
+        view = self.data[idx[0]:idx[-1] + 1, r0:r1, c0:c1] if idx.size else self.data[:0, r0:r1, c0:c1]
+        return self.years[idx], view, self.transform * Affine.translation(c0, r0)
+
+    def lookup(self, ndwi_path):
+        """Index of this GeoTIFF in the cube if it is unchanged and was stored on its own grid, else None."""
+        i = self._by_path.get(os.path.abspath(ndwi_path))
+        if i is None:
+            return None
+        s = self.meta["sources"][i]
+        st = os.stat(ndwi_path)
+        if s["resampled"] or s["size"] != st.st_size or s["mtime_ns"] != st.st_mtime_ns:
+            return None
+        return i
+
+    def thresholds(self, years=None, thr=NDWI_THRESHOLD):
+        """Per-year threshold records (train_model.threshold_decision format), one pass over the cube."""
+        from train_model import prepare_ndwi, decide_threshold, NDWI_AUTO_RESCALE
+        yrs, view, _ = self.slice(years)
+        rows = []
+        for y, raw in zip(yrs, view):
+            raw = np.asarray(raw, dtype=np.float32)
+            finite = raw[np.isfinite(raw)]
+            rec = {"year": int(y), "n_valid": int(finite.size)}
+            if finite.size:
+                vmin, vmax = float(finite.min()), float(finite.max())
+                _, v = prepare_ndwi(raw)
+                thr_val, water_high, audit = decide_threshold(v, thr)
+                rec.update(rescaled=bool(NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0), vmin=vmin, vmax=vmax,
+                           **audit, thr_val=thr_val, water_high=bool(water_high))
+            else:
+                rec.update(rescaled=False, thr=str(thr), rule="no_data")
+            rows.append(rec)
+        return pd.DataFrame(rows)
+
+    def water_frequency(self, years=None, window=None, thr=NDWI_THRESHOLD):
+        """
+        Per-pixel share of valid years classified as water (each year with its own full-scene threshold).
+        Returns (frequency float32 [h, w] (NaN where never valid), valid-year count, window transform).
+        """
+        rules = self.thresholds(years, thr).set_index("year")
+        yrs, view, transform = self.slice(years, window)
+        water = np.zeros(view.shape[1:], dtype=np.int32)
+        valid = np.zeros(view.shape[1:], dtype=np.int32)
+        for y, raw in zip(yrs, view):
+            r = rules.loc[y]
+            if r["rule"] == "no_data":
+                continue
+            arr = np.asarray(raw, dtype=np.float32)
+            if r["rescaled"]:
+                arr = (arr - r["vmin"]) / (r["vmax"] - r["vmin"] + 1e-9)
+            ok = np.isfinite(arr)
+            valid += ok
+            water += ok & ((arr >= r["thr_val"]) if r["water_high"] else (arr <= r["thr_val"]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            freq = np.where(valid > 0, water / np.maximum(valid, 1), np.nan).astype(np.float32)
+        return freq, valid, transform
+
+_OPEN: dict = {}   # cube_dir -> NDWICube (per process)
+
+def open_cube(cube_dir=NDWI_CUBE_DIR):
+    """Opened cube (memoized) or None when cube_dir is unset or not built."""
+    if not cube_dir or not os.path.exists(os.path.join(cube_dir, "meta.json")):
+        return None
+    cube = _OPEN.get(cube_dir)
+    if cube is None:
+        cube = _OPEN[cube_dir] = NDWICube(cube_dir)
+    return cube
+
+def read_scene(ndwi_path, cube_dir=NDWI_CUBE_DIR):
+    """(band 1 as stored, crs, transform) from the cube, or None if the cube doesn't hold this scene as-is."""
+    cube = open_cube(cube_dir)
+    i = cube.lookup(ndwi_path) if cube is not None else None
+    if i is None:
+        return None
+    return cube.data[i], cube.crs, cube.transform
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build / inspect the multi-year NDWI cube.")
+    ap.add_argument("cmd", choices=["build", "info", "frequency"])
+    ap.add_argument("--ndwi-dir", default=NDWI_DIR)
+    ap.add_argument("--cube-dir", default=NDWI_CUBE_DIR or "./cache/cube")
+    ap.add_argument("--years", default=None, help="y0:y1 (frequency)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        cube = build(args.ndwi_dir, args.cube_dir)
+        n_res = sum(s["resampled"] for s in cube.meta["sources"])
+        print(f"Cube: {cube.data.shape[0]} years x {cube.data.shape[1]}x{cube.data.shape[2]} "
+              f"({cube.data.nbytes / 2**20:.0f} MB, {n_res} resampled) -> {args.cube_dir}")
+        return
+    cube = NDWICube(args.cube_dir)
+    if args.cmd == "info":
+        print(f"{args.cube_dir}: years {cube.years.min()}–{cube.years.max()} ({cube.years.size}), "
+              f"grid {cube.meta['height']}x{cube.meta['width']} {cube.meta['crs']}")
+        stale = [s["year"] for s in cube.meta["sources"]
+                 if not os.path.exists(s["path"]) or os.stat(s["path"]).st_mtime_ns != s["mtime_ns"]]
+        print(f"resampled: {[s['year'] for s in cube.meta['sources'] if s['resampled']]} | changed since build: {stale}")
+        return
+    years = tuple(int(y) for y in args.years.split(":")) if args.years else (int(cube.years.min()), int(cube.years.max()))
+    freq, valid, transform = cube.water_frequency(years)
+    out = args.out or os.path.join("artifacts", f"water_frequency_{years[0]}_{years[1]}.tif")
+    with rasterio.open(out, "w", driver="GTiff", width=freq.shape[1], height=freq.shape[0], count=2,
+                       dtype="float32", crs=cube.crs, transform=transform, nodata=np.nan) as dst:
+        dst.write(freq, 1)
+        dst.write(valid.astype(np.float32), 2)
+        dst.set_band_description(1, "water_frequency")
+        dst.set_band_description(2, "valid_years")
+    print(f"Water frequency {years[0]}–{years[1]} -> {out}")
+
+if __name__ == "__main__":
+    sys.exit(main())
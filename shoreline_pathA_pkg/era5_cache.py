@@ -0,0 +1,110 @@
+# era5_cache.py — columnar cache of the merged hourly ERA5 frame (load_hourly_drivers)
+#
+# The first run parses both CSVs, merges them and writes one .npy per column plus
+# meta.json under ERA5_CACHE_DIR. Later runs memory-map only the requested columns.
+# The entry is rebuilt when either source changes (size+mtime, or content hash with
+# ERA5_CACHE_VALIDATE = "hash").
+#
+#   python era5_cache.py build   # warm the cache from config.WAVES_CSV / RAIN_CSV
+#   python era5_cache.py clear
+import os, sys, json, shutil, hashlib, argparse
+import numpy as np
+import pandas as pd
+
+from config import WAVES_CSV, RAIN_CSV, ERA5_CACHE_DIR, ERA5_CACHE_VALIDATE
+import extract_cache
+
+FORMAT_VERSION = 1
+
+def _source_sig(path):
+    st = os.stat(path)
+    sig = {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if ERA5_CACHE_VALIDATE == "hash":
+        sig = {"path": sig["path"], "sha256": extract_cache.file_hash(path)}
+    return sig
+
+def _entry_dir(waves_csv, rain_csv, cache_dir):
+    name = hashlib.sha256(f"{os.path.abspath(waves_csv)}|{os.path.abspath(rain_csv)}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, name)
+
+def _write(df, sources, entry):
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    cols = []
+    for i, c in enumerate(df.columns):
+        s = df[c]
+        rec = {"name": str(c), "file": f"c{i}.npy", "dtype": str(s.dtype)}
+        if isinstance(s.dtype, pd.DatetimeTZDtype):
+            rec["tz"] = str(s.dt.tz)
+            arr = s.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+        elif s.dtype.kind in "biufcmM":
+            arr = s.to_numpy()
+        else:
+            # strings / objects: fixed-width unicode + null mask (no pickles, still mmap-able)
+            rec["nulls"] = f"c{i}_null.npy"
+            np.save(os.path.join(tmp, rec["nulls"]), s.isna().to_numpy())
+            arr = np.asarray(s.fillna("").astype(str).to_numpy(), dtype=str)
+        np.save(os.path.join(tmp, rec["file"]), arr, allow_pickle=False)
+        cols.append(rec)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "sources": sources, "rows": len(df), "columns": cols}, f, indent=2)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+
+def _read(entry, meta, columns=None):
+    by_name = {c["name"]: c for c in meta["columns"]}
+    names = list(by_name) if columns is None else list(columns)
+    missing = [n for n in names if n not in by_name]
+    if missing:
+        raise KeyError(f"Columns not in ERA5 cache: {missing}")
+    data = {}
+    for n in names:
+        rec = by_name[n]
+        arr = np.load(os.path.join(entry, rec["file"]), mmap_mode="r", allow_pickle=False)
+        if "tz" in rec:
+            data[n] = pd.Series(arr).dt.tz_localize("UTC").dt.tz_convert(rec["tz"])
+        elif "nulls" in rec:
+            s = pd.Series(arr).astype(rec["dtype"])
+            s[np.load(os.path.join(entry, rec["nulls"]))] = None
+            data[n] = s
+        else:
+            data[n] = arr
+    return pd.DataFrame(data, columns=names)
+
+def load(waves_csv, rain_csv, build, columns=None, cache_dir=ERA5_CACHE_DIR):
+    """
+    Cached build(waves_csv, rain_csv) -> DataFrame, restricted to `columns` (None = all).
+    A stale or missing entry is rebuilt from the CSVs first.
+    """
+    if not cache_dir:
+        df = build(waves_csv, rain_csv)
+        return df if columns is None else df[list(columns)]
+    entry = _entry_dir(waves_csv, rain_csv, cache_dir)
+    sources = [_source_sig(waves_csv), _source_sig(rain_csv)]
+    meta_path = os.path.join(entry, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") == FORMAT_VERSION and meta.get("sources") == sources:
+            return _read(entry, meta, columns)
+    df = build(waves_csv, rain_csv)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write(df, sources, entry)
+    return df if columns is None else df[list(columns)]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Manage the columnar ERA5 cache.")
+    ap.add_argument("cmd", choices=["build", "clear"])
+    ap.add_argument("--cache-dir", default=ERA5_CACHE_DIR)
+    args = ap.parse_args(argv)
+    if args.cmd == "clear":
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Removed {args.cache_dir}")
+        return
+    from train_model import load_hourly_drivers
+    df = load_hourly_drivers(WAVES_CSV, RAIN_CSV)
+    print(f"ERA5 cache ready: {len(df)} rows x {df.shape[1]} columns in {args.cache_dir}")
+
+if __name__ == "__main__":
+    sys.exit(main())
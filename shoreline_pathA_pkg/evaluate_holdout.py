@@ -1,32 +1,56 @@
 # evaluate_holdout.py
-import os, json, numpy as np, pandas as pd, joblib
+#   python evaluate_holdout.py                                   # score the trained model on 2020–2025
+#   python evaluate_holdout.py --backtest 2008,2011,2014,2017 --horizon 3 --workers 0
+#                                                                # rolling-origin backtest (refit per cutoff)
+import os, sys, json, argparse, numpy as np, pandas as pd, joblib
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_absolute_error
 
-from config import NDWI_DIR, WAVES_CSV, RAIN_CSV
-from train_model import build_labels, load_hourly_drivers, annual_features, build_training
+from config import NDWI_DIR, WAVES_CSV, RAIN_CSV, TRAIN_YEAR_START, HOLDOUT_YEAR_END, RIDGE_ALPHA, RIDGE_ALPHAS
+from train_model import load_hourly_drivers, build_training, trim_outliers, _resolve_workers, DRIVER_COLUMNS
+from incremental import positions_for_years, driver_features
+from ridge_cv import loo_year_mae, FEATURES
 
 ART_DIR = "./artifacts"
 os.makedirs(ART_DIR, exist_ok=True)
 
-OUT_CSV  = os.path.join(ART_DIR, "holdout_predictions_2020_2025.csv")
-OUT_JSON = os.path.join(ART_DIR, "holdout_metrics_2020_2025.json")
+HOLDOUT_YEAR_START = 2020
+OUT_CSV  = "holdout_predictions_2020_2025.csv"
+OUT_JSON = "holdout_metrics_2020_2025.json"
+BACKTEST_CSV = "backtest_rolling_origin.csv"
 
-def main():
+def load_inputs(y0, y1, workers=None, art_dir=ART_DIR, ndwi_dir=NDWI_DIR, waves_csv=WAVES_CSV, rain_csv=RAIN_CSV):
+    """Positions on the trained transects for y0..y1 + annual drivers (stores first, compute the rest; neither store is written)."""
+    positions, _ = positions_for_years(ndwi_dir, range(y0, y1 + 1), art_dir, workers)
+    hourly = load_hourly_drivers(waves_csv, rain_csv, columns=DRIVER_COLUMNS)
+    return positions, driver_features(hourly, art_dir)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Holdout evaluation / rolling-origin backtest.")
+    ap.add_argument("--backtest", default=None, help="comma-separated cutoff years (train <= cutoff, test after)")
+    ap.add_argument("--horizon", type=int, default=3, help="test years after each cutoff")
+    ap.add_argument("--workers", type=int, default=None, help="processes for extraction / backtest folds (0 = all CPUs; default EXTRACT_WORKERS)")
+    args = ap.parse_args(argv)
+    if args.backtest:
+        return backtest(sorted(int(c) for c in args.backtest.split(",")), args.horizon, args.workers)
+    holdout(workers=args.workers)
+
+def holdout(art_dir=ART_DIR, ndwi_dir=NDWI_DIR, waves_csv=WAVES_CSV, rain_csv=RAIN_CSV, workers=None):
+    """Score the model in art_dir on HOLDOUT_YEAR_START..HOLDOUT_YEAR_END; returns the metrics summary (None if no samples)."""
     # Load model + meta
-    model = joblib.load(os.path.join(ART_DIR, "model_ridge.pkl"))
-    meta  = json.load(open(os.path.join(ART_DIR, "model_features.json"), "r"))
+    model = joblib.load(os.path.join(art_dir, "model_ridge.pkl"))
+    meta  = json.load(open(os.path.join(art_dir, "model_features.json"), "r"))
     feats_used = meta["features"]
 
-    # Rebuild labels/features from your data
-    labels, _ = build_labels(NDWI_DIR)
-    hourly = load_hourly_drivers(WAVES_CSV, RAIN_CSV)
-    feats  = annual_features(hourly)
+    # Trained transects; positions from the label store, extracting only missing holdout years
+    positions, feats = load_inputs(HOLDOUT_YEAR_START, HOLDOUT_YEAR_END, workers, art_dir, ndwi_dir, waves_csv, rain_csv)
 
     # Build holdout: 2020–2025 (Sentinel-2 period)
-    hold = build_training(labels, feats, y0=2020, y1=2025)
+    hold = build_training(positions, feats, y0=HOLDOUT_YEAR_START, y1=HOLDOUT_YEAR_END)
     if hold.empty:
         print("No holdout samples found (2020–2025). Check NDWI & ERA5 coverage.")
-        return
+        return None
 
     X = hold[feats_used].values
     y = hold["delta_pos_m"].values
@@ -48,7 +72,8 @@ def main():
     pred_df = pred_df.rename(columns={"delta_pos_m":"delta_true_m"})
     pred_df["delta_pred_m"] = yhat
     pred_df["abs_err_m"] = np.abs(pred_df["delta_true_m"] - pred_df["delta_pred_m"])
-    pred_df.to_csv(OUT_CSV, index=False)
+    out_csv, out_json = os.path.join(art_dir, OUT_CSV), os.path.join(art_dir, OUT_JSON)
+    pred_df.to_csv(out_csv, index=False)
 
     # Save summary metrics
     summary = {
@@ -58,15 +83,48 @@ def main():
         "mae_by_year_m": {int(k): float(v) for k, v in by_year.to_dict().items()},
         "worst_10_transects_by_mae": [int(t) for t in by_transect.head(10).index.tolist()],
     }
-    with open(OUT_JSON, "w") as f:
+    with open(out_json, "w") as f:
         json.dump(summary, f, indent=2)
 
     # Print a concise report
     print(f"Holdout MAE 2020–2025: {mae_overall:.2f} m on {len(hold)} samples")
     print("MAE by year (m):")
     print(by_year.to_string())
-    print(f"\nSaved predictions: {OUT_CSV}")
-    print(f"Saved metrics:     {OUT_JSON}")
+    print(f"\nSaved predictions: {out_csv}")
+    print(f"Saved metrics:     {out_json}")
+    return summary
+
+def backtest_fold(cutoff, positions, feats, horizon, features=FEATURES):
+    """Tune alpha (LOO-Year) and fit on TRAIN_YEAR_START..cutoff, score deltas of cutoff+1..cutoff+horizon."""
+    train = trim_outliers(build_training(positions, feats, y0=TRAIN_YEAR_START, y1=cutoff)).dropna(subset=features)
+    test = build_training(positions, feats, y0=cutoff, y1=cutoff + horizon).dropna(subset=features)
+    rec = {"cutoff": cutoff, "test_years": f"{cutoff + 1}-{cutoff + horizon}", "n_train": len(train), "n_test": len(test)}
+    if len(train) < 5 or test.empty:
+        return rec
+    X, y, years = train[features].values, train["delta_pos_m"].values, train["year"].values
+    alpha = RIDGE_ALPHA
+    if np.unique(years).size >= 3:
+        alpha = RIDGE_ALPHAS[int(np.argmin(loo_year_mae(X, y, years, RIDGE_ALPHAS)))]
+    mdl = Ridge(alpha=alpha).fit(X, y)
+    err = np.abs(mdl.predict(test[features].values) - test["delta_pos_m"].values)
+    return {**rec, "alpha": alpha, "mae_m": float(err.mean()),
+            # reference: predict the training-period mean delta everywhere
+            "mae_mean_delta_m": float(np.abs(y.mean() - test["delta_pos_m"].values).mean())}
+
+def backtest(cutoffs, horizon, workers=None, art_dir=ART_DIR, ndwi_dir=NDWI_DIR, waves_csv=WAVES_CSV, rain_csv=RAIN_CSV):
+    positions, feats = load_inputs(TRAIN_YEAR_START, max(cutoffs) + horizon, workers, art_dir, ndwi_dir, waves_csv, rain_csv)
+    workers = min(_resolve_workers(workers), len(cutoffs))
+    if workers == 1:
+        rows = [backtest_fold(c, positions, feats, horizon) for c in cutoffs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            rows = list(ex.map(backtest_fold, cutoffs, [positions] * len(cutoffs),
+                               [feats] * len(cutoffs), [horizon] * len(cutoffs)))
+    res = pd.DataFrame(rows)
+    out = os.path.join(art_dir, BACKTEST_CSV)
+    res.to_csv(out, index=False)
+    print(res.round(2).to_string(index=False))
+    print(f"\nSaved backtest: {out}")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# extract_cache.py — content-addressed on-disk cache for coastlines & per-year positions
+#
+# Keys are sha256 digests of:
+#   - the NDWI file contents (not its path or mtime)
+#   - the NDWI settings that change extraction (threshold, rescale, water-high)
+#   - for positions: the transect set (ids + endpoints)
+# so reruns only re-extract scenes or parameters that actually changed.
+#
+# Usage:
+#   python extract_cache.py stats
+#   python extract_cache.py prune [--max-age-days N]   # drop entries for missing scenes / old settings
+#                                                      # (scenes of NDWI_DIR and every site in SITES_REGISTRY)
+#   python extract_cache.py clear
+import os, sys, json, time, hashlib, argparse, contextlib
+import numpy as np
+import joblib
+
+from config import (
+    NDWI_DIR, NDWI_THRESHOLD, NDWI_AUTO_RESCALE, NDWI_WATER_HIGH,
+    EXTRACT_CACHE, EXTRACT_CACHE_DIR, SITES_REGISTRY
+)
+
+# bump when extraction code changes in a way that alters outputs
+# (2: threshold records carry the scene's raw value range, as datacube.thresholds does)
+CACHE_VERSION = 2
+
+KINDS = ("coastline", "positions", "threshold")
+
+_HASH_MEMO: dict = {}   # (path, size, mtime_ns) -> sha256 (per process)
+_BYPASS = False         # inside bypass(): every read misses and nothing is written
+
+@contextlib.contextmanager
+def bypass():
+    """Force real extraction without touching the cache (profiling reruns)."""
+    global _BYPASS
+    prev, _BYPASS = _BYPASS, True
+    try:
+        yield
+    finally:
+        _BYPASS = prev
+
+def file_hash(path, chunk=1 << 20):
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    h = _HASH_MEMO.get(memo_key)
+    if h is None:
+        d = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk), b""):
+                d.update(block)
+        h = _HASH_MEMO[memo_key] = d.hexdigest()
+    return h
+
+def transects_hash(transects_df):
+    cols = transects_df[["transect_id", "x1", "y1", "x2", "y2"]]
+    d = hashlib.sha256()
+    d.update(np.ascontiguousarray(cols["transect_id"].to_numpy(np.int64)).tobytes())
+    d.update(np.ascontiguousarray(cols[["x1", "y1", "x2", "y2"]].to_numpy(np.float64)).tobytes())
+    return d.hexdigest()
+
+def ndwi_settings(thr=NDWI_THRESHOLD):
+    return {
+        "version": CACHE_VERSION,
+        "threshold": str(thr),
+        "auto_rescale": bool(NDWI_AUTO_RESCALE),
+        "water_high": bool(NDWI_WATER_HIGH),
+    }
+
+def _key(kind, file_sha, params):
+    blob = json.dumps({"kind": kind, "file": file_sha, "params": params}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _entry_path(kind, key, cache_dir):
+    return os.path.join(cache_dir, kind, key[:2], key + ".pkl")
+
+def _load(kind, key, cache_dir):
+    p = _entry_path(kind, key, cache_dir)
+    if _BYPASS or not os.path.exists(p):
+        return None
+    try:
+        entry = joblib.load(p)
+    except Exception:
+        # partial/corrupt entry (e.g. interrupted run) -> treat as a miss
+        return None
+    os.utime(p)   # last-used time drives --max-age-days pruning
+    return entry["data"]
+
+def _store(kind, key, data, meta, cache_dir):
+    if _BYPASS:
+        return
+    p = _entry_path(kind, key, cache_dir)
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = f"{p}.{os.getpid()}.tmp"
+    joblib.dump({"meta": meta, "data": data}, tmp)
+    os.replace(tmp, p)   # atomic: safe with parallel extraction workers
+
+# ------------------------------
+# Public get/put helpers
+# ------------------------------
+def coastline_key(ndwi_path, thr=NDWI_THRESHOLD, **extra):
+    params = {**ndwi_settings(thr), **extra}
+    return _key("coastline", file_hash(ndwi_path), params), params
+
+def positions_key(ndwi_path, transects_df, thr=NDWI_THRESHOLD, **extra):
+    params = {**ndwi_settings(thr), "transects": transects_hash(transects_df), **extra}
+    return _key("positions", file_hash(ndwi_path), params), params
+
+def get_coastline(ndwi_path, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR, **extra):
+    """(geom, crs) or None on miss."""
+    if not EXTRACT_CACHE:
+        return None
+    key, _ = coastline_key(ndwi_path, thr, **extra)
+    return _load("coastline", key, cache_dir)
+
+def put_coastline(ndwi_path, geom, crs, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR, **extra):
+    if not EXTRACT_CACHE:
+        return
+    key, params = coastline_key(ndwi_path, thr, **extra)
+    meta = {"source": os.path.abspath(ndwi_path), "file": file_hash(ndwi_path), "params": params}
+    _store("coastline", key, (geom, crs), meta, cache_dir)
+
+def get_threshold(ndwi_path, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR):
+    """Threshold audit record (dict) or None on miss."""
+    if not EXTRACT_CACHE:
+        return None
+    key, _ = _threshold_key(ndwi_path, thr)
+    return _load("threshold", key, cache_dir)
+
+def put_threshold(ndwi_path, record, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR):
+    if not EXTRACT_CACHE:
+        return
+    key, params = _threshold_key(ndwi_path, thr)
+    meta = {"source": os.path.abspath(ndwi_path), "file": file_hash(ndwi_path), "params": params}
+    _store("threshold", key, record, meta, cache_dir)
+
+def _threshold_key(ndwi_path, thr):
+    params = ndwi_settings(thr)
+    return _key("threshold", file_hash(ndwi_path), params), params
+
+def get_positions(ndwi_path, transects_df, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR, **extra):
+    """DataFrame[transect_id, position_m] or None on miss."""
+    if not EXTRACT_CACHE:
+        return None
+    key, _ = positions_key(ndwi_path, transects_df, thr, **extra)
+    df = _load("positions", key, cache_dir)
+    return None if df is None else df.copy()
+
+def put_positions(ndwi_path, transects_df, positions, thr=NDWI_THRESHOLD, cache_dir=EXTRACT_CACHE_DIR, **extra):
+    if not EXTRACT_CACHE:
+        return
+    key, params = positions_key(ndwi_path, transects_df, thr, **extra)
+    meta = {"source": os.path.abspath(ndwi_path), "file": file_hash(ndwi_path), "params": params}
+    _store("positions", key, positions, meta, cache_dir)
+
+# ------------------------------
+# Maintenance
+# ------------------------------
+def _iter_entries(cache_dir):
+    for kind in KINDS:
+        root = os.path.join(cache_dir, kind)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _, files in os.walk(root):
+            for f in files:
+                yield kind, os.path.join(dirpath, f)
+
+def cache_stats(cache_dir=EXTRACT_CACHE_DIR):
+    out = {}
+    for kind, p in _iter_entries(cache_dir):
+        s = out.setdefault(kind, {"entries": 0, "bytes": 0})
+        s["entries"] += 1
+        s["bytes"] += os.path.getsize(p)
+    return out
+
+def scene_dirs(ndwi_dir=NDWI_DIR, registry=SITES_REGISTRY):
+    """Every NDWI folder sharing this cache: ndwi_dir plus each site of the batch registry."""
+    dirs = [ndwi_dir] if ndwi_dir else []
+    if registry and os.path.exists(registry):
+        from batch_sites import load_registry
+        dirs += [s["ndwi_dir"] for s in load_registry(registry)]
+    return dirs
+
+def prune_cache(ndwi_dirs=None, max_age_days=None, cache_dir=EXTRACT_CACHE_DIR):
+    """
+    Remove stale entries:
+    - scene content no longer present in any of ndwi_dirs (file replaced/removed;
+      default: scene_dirs(), so one site's prune keeps the other sites' entries)
+    - NDWI settings or CACHE_VERSION differ from the current config
+    - (optional) not used for more than max_age_days
+    - leftover *.tmp files from interrupted writes
+    """
+    live = set()
+    for d in (scene_dirs() if ndwi_dirs is None else ndwi_dirs):
+        if os.path.isdir(d):
+            for f in os.listdir(d):
+                if f.lower().endswith(".tif"):
+                    live.add(file_hash(os.path.join(d, f)))
+    current = ndwi_settings()
+    now = time.time()
+    removed, kept = 0, 0
+    for kind, p in _iter_entries(cache_dir):
+        stale = p.endswith(".tmp")
+        if not stale and max_age_days is not None:
+            stale = (now - os.path.getmtime(p)) > max_age_days * 86400
+        if not stale:
+            try:
+                meta = joblib.load(p)["meta"]
+            except Exception:
+                meta = None
+            if meta is None:
+                stale = True
+            else:
+                params = meta["params"]
+                stale = (meta["file"] not in live
+                         or any(params.get(k) != v for k, v in current.items()))
+        if stale:
+            os.remove(p)
+            removed += 1
+        else:
+            kept += 1
+    return {"removed": removed, "kept": kept}
+
+def clear_cache(cache_dir=EXTRACT_CACHE_DIR):
+    n = 0
+    for _, p in list(_iter_entries(cache_dir)):
+        os.remove(p)
+        n += 1
+    return n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Manage the shoreline extraction cache.")
+    ap.add_argument("cmd", choices=["stats", "prune", "clear"])
+    ap.add_argument("--max-age-days", type=float, default=None, help="prune: also drop entries unused for N days")
+    ap.add_argument("--ndwi-dir", action="append", default=None,
+                    help="prune: scene folders to keep (repeatable; default NDWI_DIR + every registered site)")
+    ap.add_argument("--cache-dir", default=EXTRACT_CACHE_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "stats":
+        print(json.dumps(cache_stats(args.cache_dir), indent=2))
+    elif args.cmd == "prune":
+        res = prune_cache(args.ndwi_dir, args.max_age_days, args.cache_dir)
+        print(f"Pruned {res['removed']} entries ({res['kept']} kept) in {args.cache_dir}")
+    else:
+        print(f"Removed {clear_cache(args.cache_dir)} entries from {args.cache_dir}")
+
+if __name__ == "__main__":
+    sys.exit(main())
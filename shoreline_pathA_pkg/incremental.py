@@ -0,0 +1,227 @@
+# incremental.py — incremental label & driver artifact stores with a manifest of processed years
+#
+# artifacts/manifest.json records, per store, the settings it was built with and a
+# digest per year:
+#   labels : NDWI scene content hash per year (+ baseline scene, transect set, extraction settings)
+#   drivers: hash of each year's hourly ERA5 rows
+# A rerun extracts / recomputes only years that are new or whose digest changed and
+# appends them to the stored CSVs. storm_index is max-normalized over all years, so it
+# is always recomputed from the stored per-year components.
+import os, json, hashlib
+import numpy as np
+import pandas as pd
+
+import extract_cache
+import train_model as tm
+import transect_quality
+import position_matrix
+from position_matrix import PositionMatrix
+from config import (TRANSECT_SPACING_M, TRANSECT_LENGTH_M, TRANSECT_NORMAL_SMOOTH, QUALITY_PRUNE_EXTRACTION,
+                    QUALITY_RECHECK_YEARS)
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+LABELS_CSV = "shoreline_positions_annual.csv"
+TRANSECTS_CSV = "transects.csv"
+THRESHOLDS_CSV = "threshold_decisions_by_year.csv"
+FEATS_CSV = "annual_driver_features.csv"
+
+def load_manifest(art_dir):
+    p = os.path.join(art_dir, MANIFEST)
+    if not os.path.exists(p):
+        return {"version": MANIFEST_VERSION}
+    with open(p) as f:
+        m = json.load(f)
+    return m if m.get("version") == MANIFEST_VERSION else {"version": MANIFEST_VERSION}
+
+def save_manifest(art_dir, manifest):
+    p = os.path.join(art_dir, MANIFEST)
+    tmp = p + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, p)
+
+def _read_csv(path):
+    # round_trip: stored floats come back bit-identical, so reused years match a full rebuild
+    return pd.read_csv(path, float_precision="round_trip")
+
+# ------------------------------
+# Labels
+# ------------------------------
+def labels_params():
+    return {**extract_cache.ndwi_settings(), **tm._position_params(),
+            "spacing": float(TRANSECT_SPACING_M), "half_len": float(TRANSECT_LENGTH_M),
+            "smooth": int(TRANSECT_NORMAL_SMOOTH)}
+
+def update_labels(ndwi_dir, art_dir=tm.ART_DIR, workers=None, full=False):
+    """
+    Bring the label store up to date with ndwi_dir; returns (labels, transects, extracted_years).
+    Stored years whose scene content is unchanged are reused as-is. Everything is rebuilt when
+    the baseline scene, transect or extraction settings change (or full=True).
+    """
+    year2tif = tm.list_year_tifs(ndwi_dir)
+    if not year2tif:
+        raise RuntimeError(f"No .tif files found in NDWI_DIR: {ndwi_dir}")
+    years = [y for y in sorted(year2tif) if y >= 1970]
+    shas = {y: extract_cache.file_hash(year2tif[y]) for y in years}
+    base_tif = year2tif[tm.baseline_year(year2tif)]
+    base_sha = extract_cache.file_hash(base_tif)
+    params = labels_params()
+
+    manifest = load_manifest(art_dir)
+    entry = manifest.get("labels", {})
+    labels_csv, transects_csv = os.path.join(art_dir, LABELS_CSV), os.path.join(art_dir, TRANSECTS_CSV)
+    reuse = (not full and entry.get("params") == params and entry.get("baseline") == base_sha
+             and os.path.exists(labels_csv) and os.path.exists(transects_csv))
+    transects = _read_csv(transects_csv) if reuse else None
+    if reuse and entry.get("transects") != extract_cache.transects_hash(transects):
+        reuse = False
+
+    if reuse:
+        stored = _read_csv(labels_csv)
+        have = set(stored["year"].unique().tolist())
+        done = {int(y): s for y, s in entry.get("years", {}).items()}
+        todo = [y for y in years if done.get(y) != shas[y] or y not in have]
+        kept = stored[stored["year"].isin([y for y in years if y not in todo])]
+    else:
+        transects = tm.build_transects(base_tif, spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M)
+        todo, kept = years, None
+
+    print(f"Label store: {len(years) - len(todo)} years reused, {len(todo)} to extract")
+    # pruned extraction (never on a rebuild): dead transects are skipped except in census years, so
+    # the quality index, built from fully extracted years only, can bring a transect back
+    pruned_before = set(entry.get("pruned_years", [])) if reuse else set()
+    active = transect_quality.active_ids(art_dir, transects) if QUALITY_PRUNE_EXTRACTION and reuse else None
+    census = todo if active is None else _census_years(todo, [y for y in years if y not in todo and y not in pruned_before])
+    new = tm.extract_years(year2tif, todo, transects, workers, active, census)
+    parts = [p for p in (kept, new) if p is not None and not p.empty]
+    if not parts:
+        raise RuntimeError(f"Shoreline extraction failed for every year ({len(new.attrs['failed_years'])} scenes).")
+    labels = pd.concat(parts, ignore_index=True).sort_values("year", kind="stable").reset_index(drop=True)
+    labels.attrs = dict(new.attrs)
+
+    thr_csv = os.path.join(art_dir, THRESHOLDS_CSV)
+    thr_new = pd.DataFrame(new.attrs["thresholds"])
+    if reuse and os.path.exists(thr_csv):
+        thr_old = _read_csv(thr_csv)
+        thr_old = thr_old[thr_old["year"].isin(kept["year"].unique())]
+        thr_new = pd.concat([thr_old, thr_new], ignore_index=True)
+    if not thr_new.empty:
+        thr_new = thr_new.sort_values("year").reset_index(drop=True)
+    labels.attrs["thresholds"] = thr_new.to_dict(orient="records")
+
+    present = set(labels["year"].unique().tolist())
+    pruned = sorted(y for y in present if (y in pruned_before and y not in todo) or (y in todo and y not in census))
+    labels.to_csv(labels_csv, index=False)
+    pm = PositionMatrix.from_labels(labels)
+    pm.save(art_dir)
+    transect_quality.save_index(transect_quality.build_index(pm, exclude_years=pruned), transects, art_dir)
+    transects.to_csv(transects_csv, index=False)
+    thr_new.to_csv(thr_csv, index=False)
+    manifest["labels"] = {
+        "params": params,
+        "baseline": base_sha,
+        "transects": extract_cache.transects_hash(transects),
+        "years": {str(y): shas[y] for y in years if y in present},
+        "pruned_years": pruned,   # extracted on the active transects only
+    }
+    save_manifest(art_dir, manifest)
+    return labels, transects, [y for y in todo if y in present]
+
+def _census_years(todo, full_years, every=QUALITY_RECHECK_YEARS):
+    """Years of todo extracted on every transect: the first at least `every` years after the last full one."""
+    out, last = [], max(full_years, default=None)
+    for y in sorted(todo):
+        if last is None or y - last >= every:
+            out.append(y)
+            last = y
+    return out
+
+def pruned_years(art_dir):
+    """Label-store years extracted on the active transects only (excluded from the quality index)."""
+    return load_manifest(art_dir).get("labels", {}).get("pruned_years", [])
+
+def positions_for_years(ndwi_dir, years, art_dir=tm.ART_DIR, workers=None):
+    """
+    PositionMatrix for `years` on the trained transects (artifacts/transects.csv). Years in the
+    label store whose scene is unchanged are read from it; only the rest are extracted (through
+    the extraction cache). The store itself is left untouched. Returns (positions, transects).
+    """
+    transects_csv = os.path.join(art_dir, TRANSECTS_CSV)
+    if not os.path.exists(transects_csv):
+        raise RuntimeError(f"{transects_csv} not found; run train_model.py first.")
+    transects = _read_csv(transects_csv)
+    year2tif = tm.list_year_tifs(ndwi_dir)
+    years = [y for y in sorted(set(years)) if y in year2tif]
+
+    entry = load_manifest(art_dir).get("labels")
+    reuse = []
+    if os.path.exists(os.path.join(art_dir, LABELS_CSV)):
+        if entry is None:
+            # store written before the manifest existed: trust it, it was saved with transects.csv
+            reuse = years
+        elif entry.get("transects") == extract_cache.transects_hash(transects) and entry.get("params") == labels_params():
+            reuse = [y for y in years if entry["years"].get(str(y)) == extract_cache.file_hash(year2tif[y])]
+    stored = position_matrix.load(art_dir).select_years(reuse) if reuse else None
+    have = set() if stored is None else set(stored.years.tolist())
+    todo = [y for y in years if y not in have]
+
+    print(f"Positions: {len(have)} years from the label store, {len(todo)} to extract")
+    active = transect_quality.active_ids(art_dir, transects) if QUALITY_PRUNE_EXTRACTION else None
+    new = tm.extract_years(year2tif, todo, transects, workers, active)
+    mats = [stored] + ([PositionMatrix.from_labels(new)] if not new.empty else [])
+    if all(m is None or m.years.size == 0 for m in mats):
+        raise RuntimeError(f"No positions available for years {years}.")
+    return position_matrix.hstack(mats), transects
+
+# ------------------------------
+# Drivers
+# ------------------------------
+def year_digests(hourly):
+    """sha256 of each year's hourly driver rows (values, not file metadata)."""
+    h = pd.util.hash_pandas_object(hourly[tm.DRIVER_COLUMNS], index=False).to_numpy()
+    yrs = hourly["valid_time"].dt.year.to_numpy()
+    return {int(y): hashlib.sha256(h[yrs == y].tobytes()).hexdigest() for y in np.unique(yrs)}
+
+def _driver_features(hourly, art_dir, full):
+    """(features, recomputed_years, digests) from the driver store plus the years whose rows changed."""
+    digests = year_digests(hourly)
+    entry = load_manifest(art_dir).get("drivers", {})
+    feats_csv = os.path.join(art_dir, FEATS_CSV)
+    comp_cols = ["year", "storm_days", "wave_power", "rain_3d_max"]
+
+    kept = None
+    todo = sorted(digests)
+    if not full and os.path.exists(feats_csv) and entry.get("columns") == tm.DRIVER_COLUMNS:
+        stored = _read_csv(feats_csv)[comp_cols]
+        done = {int(y): s for y, s in entry.get("years", {}).items()}
+        have = set(stored["year"].tolist())
+        todo = [y for y in sorted(digests) if done.get(y) != digests[y] or y not in have]
+        kept = stored[stored["year"].isin([y for y in digests if y not in todo])]
+
+    print(f"Driver store: {len(digests) - len(todo)} years reused, {len(todo)} to compute")
+    parts = [kept] if kept is not None and not kept.empty else []
+    if todo:
+        parts.append(tm.annual_components(hourly[hourly["valid_time"].dt.year.isin(todo)]))
+    annual = pd.concat(parts, ignore_index=True).sort_values("year").reset_index(drop=True)
+    return tm.with_storm_index(annual), todo, digests
+
+def driver_features(hourly, art_dir=tm.ART_DIR):
+    """
+    Annual driver features for `hourly`: unchanged years are read from the driver store, the
+    rest are computed. The store itself is left untouched (evaluation reruns).
+    """
+    return _driver_features(hourly, art_dir, full=False)[0]
+
+def update_drivers(hourly, art_dir=tm.ART_DIR, full=False):
+    """
+    Bring the driver store up to date; returns (features, recomputed_years).
+    Only years whose hourly rows changed are recomputed; storm_index is then renormalized
+    over all years from the stored components.
+    """
+    feats, todo, digests = _driver_features(hourly, art_dir, full)
+    feats.to_csv(os.path.join(art_dir, FEATS_CSV), index=False)
+    manifest = load_manifest(art_dir)
+    manifest["drivers"] = {"columns": tm.DRIVER_COLUMNS, "years": {str(y): d for y, d in digests.items()}}
+    save_manifest(art_dir, manifest)
+    return feats, todo
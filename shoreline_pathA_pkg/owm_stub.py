@@ -0,0 +1,97 @@
+# owm_stub.py — local stand-in for the OpenWeatherMap One Call endpoint (no key, no network)
+#
+#   python owm_stub.py --port 8001 --delay 0.3
+#   OWM_ENDPOINT=http://127.0.0.1:8001/data/3.0/onecall OWM_API_KEY=stub uvicorn serve_api:app
+#
+# Any GET path returns a One Call-shaped payload (48 hourly + 8 daily entries from now,
+# deterministic per lat/lon), after --delay seconds. --fail-rate answers that share of calls
+# with HTTP 500. GET /stats returns {"calls", "max_concurrent", "by_location"}; POST /stats resets.
+import sys, json, time, random, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls, self.active, self.max_concurrent, self.by_location = 0, 0, 0, {}
+
+def onecall(lat, lon, now=None):
+    now = int(now or time.time())
+    rng = random.Random(f"{lat:.3f},{lon:.3f},{now // 3600}")
+    hourly = [{"dt": now + 3600 * i, "wind_speed": rng.gammavariate(3, 2), "wind_gust": rng.gammavariate(3, 3),
+               "rain": {"1h": rng.expovariate(2.0)} if rng.random() < 0.3 else None} for i in range(48)]
+    daily = [{"dt": now + 86400 * i, "wind_speed": rng.gammavariate(3, 2.5), "wind_gust": rng.gammavariate(3, 3.5),
+              "rain": rng.expovariate(0.5)} for i in range(8)]
+    for h in hourly:
+        if h["rain"] is None:
+            del h["rain"]
+    return {"lat": lat, "lon": lon, "timezone_offset": 36000, "hourly": hourly, "daily": daily}
+
+def make_handler(stats, delay, fail_rate):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                with stats.lock:
+                    return self._send(200, {"calls": stats.calls, "max_concurrent": stats.max_concurrent,
+                                            "by_location": stats.by_location})
+            q = parse_qs(url.query)
+            lat, lon = float(q.get("lat", ["-38.1"])[0]), float(q.get("lon", ["145.1"])[0])
+            loc = f"{lat:.3f},{lon:.3f}"
+            with stats.lock:
+                stats.calls += 1
+                stats.active += 1
+                stats.max_concurrent = max(stats.max_concurrent, stats.active)
+                stats.by_location[loc] = stats.by_location.get(loc, 0) + 1
+            try:
+                time.sleep(delay)
+                if fail_rate and random.random() < fail_rate:
+                    return self._send(500, {"cod": 500, "message": "stub failure"})
+                self._send(200, onecall(lat, lon))
+            finally:
+                with stats.lock:
+                    stats.active -= 1
+
+        def do_POST(self):
+            with stats.lock:
+                stats.reset()
+            self._send(200, {"reset": True})
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+def serve(port=8001, delay=0.0, fail_rate=0.0, host="127.0.0.1"):
+    """Start the stub in a daemon thread; returns (server, stats)."""
+    stats = Stats()
+    server = ThreadingHTTPServer((host, port), make_handler(stats, delay, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local OpenWeatherMap One Call stub.")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--delay", type=float, default=0.2, help="seconds before each response")
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    server, _ = serve(args.port, args.delay, args.fail_rate)
+    print(f"OWM stub on http://127.0.0.1:{args.port}/data/3.0/onecall (delay {args.delay}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
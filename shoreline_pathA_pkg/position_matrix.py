@@ -0,0 +1,95 @@
+# position_matrix.py — dense transect x year shoreline position matrix
+#
+# artifacts/positions/ holds positions.npy (float64 [n_transects, n_years], NaN = no
+# intersection), transect_ids.npy and years.npy. It is written next to
+# shoreline_positions_annual.csv and memory-mapped on load, so training, the validity
+# report and holdout evaluation get diffs / valid fractions / means as numpy reductions
+# instead of re-parsing and grouping the long CSV. Positions stay float64, as extracted, so
+# deltas (and models trained on them) are bit-identical to the CSV-derived ones.
+import os, json
+import numpy as np
+import pandas as pd
+
+MATRIX_DIR = "positions"
+LABELS_CSV = "shoreline_positions_annual.csv"
+
+class PositionMatrix:
+    def __init__(self, positions, transect_ids, years):
+        self.P = positions
+        self.transect_ids = np.asarray(transect_ids)
+        self.years = np.asarray(years)
+
+    @classmethod
+    def from_labels(cls, labels):
+        """Pivot long labels (transect_id, position_m, year) without a pandas groupby."""
+        tids, ti = np.unique(labels["transect_id"].to_numpy(), return_inverse=True)
+        years, yi = np.unique(labels["year"].to_numpy(), return_inverse=True)
+        P = np.full((tids.size, years.size), np.nan, dtype=np.float64)
+        P[ti, yi] = labels["position_m"].to_numpy()
+        return cls(P, tids, years)
+
+    def save(self, art_dir):
+        out = os.path.join(art_dir, MATRIX_DIR)
+        os.makedirs(out, exist_ok=True)
+        for name, arr in (("positions", self.P), ("transect_ids", self.transect_ids), ("years", self.years)):
+            tmp = os.path.join(out, f"{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp, np.ascontiguousarray(arr), allow_pickle=False)
+            os.replace(tmp, os.path.join(out, f"{name}.npy"))
+        with open(os.path.join(out, "meta.json"), "w") as f:
+            json.dump({"shape": list(self.P.shape), "years": [int(self.years.min()), int(self.years.max())]}, f)
+
+    def between(self, y0, y1):
+        keep = (self.years >= y0) & (self.years <= y1)
+        return PositionMatrix(self.P[:, keep], self.transect_ids, self.years[keep])
+
+    def select_years(self, years):
+        keep = np.isin(self.years, years)
+        return PositionMatrix(self.P[:, keep], self.transect_ids, self.years[keep])
+
+    def deltas(self):
+        """Year-on-year change [n_transects, n_years - 1] (NaN where either year is missing)."""
+        return np.diff(self.P, axis=1)
+
+    def valid_fraction(self, axis):
+        """Share of finite positions per year (axis=0) or per transect (axis=1)."""
+        return np.isfinite(self.P).mean(axis=axis)
+
+    def mean_delta_by_transect(self):
+        D = self.deltas()
+        n = np.isfinite(D).sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            return np.where(n > 0, np.nansum(D, axis=1) / np.maximum(n, 1), np.nan)
+
+    def delta_frame(self):
+        """Long (transect_id, position_m, year, delta_pos_m) rows with a finite delta, by transect then year."""
+        D = self.deltas()
+        ti, yi = np.nonzero(np.isfinite(D))
+        return pd.DataFrame({
+            "transect_id": self.transect_ids[ti],
+            "position_m": self.P[ti, yi + 1],
+            "year": self.years[yi + 1],
+            "delta_pos_m": D[ti, yi],
+        })
+
+def hstack(mats):
+    """Join matrices over the same transects (disjoint years), columns ordered by year."""
+    mats = [m for m in mats if m is not None and m.years.size]
+    tids = mats[0].transect_ids
+    if any(not np.array_equal(m.transect_ids, tids) for m in mats[1:]):
+        raise ValueError("Position matrices cover different transect sets.")
+    years = np.concatenate([m.years for m in mats])
+    order = np.argsort(years, kind="stable")
+    return PositionMatrix(np.hstack([np.asarray(m.P) for m in mats])[:, order], tids, years[order])
+
+def load(art_dir, mmap=True):
+    """Memory-mapped matrix; built (and saved) from the long CSV if missing or older than it."""
+    d = os.path.join(art_dir, MATRIX_DIR)
+    csv = os.path.join(art_dir, LABELS_CSV)
+    mat = os.path.join(d, "positions.npy")
+    if os.path.exists(mat) and (not os.path.exists(csv) or os.path.getmtime(mat) >= os.path.getmtime(csv)):
+        mode = "r" if mmap else None
+        return PositionMatrix(*(np.load(os.path.join(d, f"{n}.npy"), mmap_mode=mode, allow_pickle=False)
+                                for n in ("positions", "transect_ids", "years")))
+    pm = PositionMatrix.from_labels(pd.read_csv(csv, float_precision="round_trip"))
+    pm.save(art_dir)
+    return pm
@@ -0,0 +1,137 @@
+# profiling.py — opt-in stage timing (wall / CPU / peak traced memory) for the training pipeline
+#
+#   python train_model.py --profile             # -> artifacts/profile_report.json
+#   python train_model.py --profile --cprofile  # + cProfile of the slowest scene, re-extracted uncached
+#
+# Instrumented code wraps work in `with profiling.stage(name, ndwi_path):`; with no active
+# session that is a no-op. Stages nest (a stage's numbers include its children). Extraction
+# workers collect their own records and return them with the year's result, so per-year
+# rows are complete with EXTRACT_WORKERS > 1. Peak memory is Python/numpy allocations seen by
+# tracemalloc (PROFILE_MEMORY), above the level at stage entry; it slows pure-Python code.
+import os, re, io, sys, json, time, contextlib, cProfile, pstats, tracemalloc
+try:
+    import resource          # POSIX only: process peak RSS in the report
+except ImportError:
+    resource = None
+
+from config import PROFILE_MEMORY
+
+REPORT_JSON = "profile_report.json"
+
+class _Session:
+    def __init__(self, memory):
+        self.records = []
+        self.stack = []      # open stages: [start_traced, peak_traced_so_far]
+        self.memory = memory
+
+_SESSIONS: list = []   # innermost last (per process)
+
+def active():
+    return bool(_SESSIONS)
+
+def scene_year(path):
+    m = re.search(r"(\d{4})", os.path.basename(path)) if path else None
+    return int(m.group(1)) if m else None
+
+@contextlib.contextmanager
+def stage(name, ndwi_path=None):
+    """Time a block; yields a dict for extra fields (e.g. cached=True). No-op without a session."""
+    if not _SESSIONS:
+        yield {}
+        return
+    s = _SESSIONS[-1]
+    rec = {"stage": name, "year": scene_year(ndwi_path), "scene": ndwi_path, "pid": os.getpid()}
+    if s.memory:
+        cur, peak = tracemalloc.get_traced_memory()
+        if s.stack:
+            s.stack[-1][1] = max(s.stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        s.stack.append([cur, cur])
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield rec
+    finally:
+        rec["wall_s"] = time.perf_counter() - w0
+        rec["cpu_s"] = time.process_time() - c0
+        if s.memory:
+            start, peak = s.stack.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            rec["peak_mb"] = (peak - start) / 2**20
+            tracemalloc.reset_peak()
+            if s.stack:
+                s.stack[-1][1] = max(s.stack[-1][1], peak)
+        s.records.append(rec)
+
+@contextlib.contextmanager
+def collect(enabled=True, memory=PROFILE_MEMORY):
+    """Open a session; yields its record list (filled when the block exits)."""
+    if not enabled:
+        yield []
+        return
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    s = _Session(memory)
+    _SESSIONS.append(s)
+    try:
+        yield s.records
+    finally:
+        _SESSIONS.remove(s)
+        if started:
+            tracemalloc.stop()
+
+def merge(records):
+    """Add records gathered elsewhere (e.g. a worker process) to the active session."""
+    if _SESSIONS:
+        _SESSIONS[-1].records.extend(records)
+
+def summarize(records):
+    """Per-stage totals: calls, wall/CPU seconds, max peak MB, slowest year."""
+    out = {}
+    for r in records:
+        s = out.setdefault(r["stage"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": 0.0,
+                                         "cached": 0, "slowest_year": None, "slowest_wall_s": 0.0})
+        s["calls"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["cpu_s"] += r["cpu_s"]
+        s["peak_mb"] = max(s["peak_mb"], r.get("peak_mb", 0.0))
+        s["cached"] += bool(r.get("cached"))
+        if r["year"] is not None and r["wall_s"] > s["slowest_wall_s"]:
+            s["slowest_year"], s["slowest_wall_s"] = r["year"], r["wall_s"]
+    return {k: {f: round(v, 4) if isinstance(v, float) else v for f, v in s.items()}
+            for k, s in sorted(out.items(), key=lambda kv: -kv[1]["wall_s"])}
+
+def slowest_scene(records, stage_name="shoreline_position"):
+    """Scene path of the slowest uncached extraction (largest file when every year was a cache hit)."""
+    rows = [r for r in records if r["stage"] == stage_name and r["scene"]]
+    fresh = [r for r in rows if not r.get("cached")]
+    if fresh:
+        return max(fresh, key=lambda r: r["wall_s"])["scene"]
+    return max((r["scene"] for r in rows), key=os.path.getsize, default=None)
+
+def profile_call(fn, out_prefix, top=25):
+    """Run fn() under cProfile; writes <out_prefix>.prof and a cumulative-time text summary."""
+    prof = cProfile.Profile()
+    prof.runcall(fn)
+    prof.dump_stats(out_prefix + ".prof")
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    with open(out_prefix + ".txt", "w") as f:
+        f.write(buf.getvalue())
+    return out_prefix + ".prof"
+
+def write_report(records, art_dir, **extra):
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "memory_traced": bool(PROFILE_MEMORY),
+        "stages": summarize(records),
+        **extra,
+        "records": [{k: (round(v, 4) if isinstance(v, float) else v) for k, v in r.items()} for r in records],
+    }
+    if resource is not None:
+        ru = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["process_peak_rss_mb"] = round(ru / (2**20 if sys.platform == "darwin" else 1024), 1)
+    p = os.path.join(art_dir, REPORT_JSON)
+    with open(p, "w") as f:
+        json.dump(report, f, indent=2)
+    return p
@@ -0,0 +1,112 @@
+# ridge_cv.py — closed-form leave-one-year-out (LOO-Year) ridge tuning
+#
+# Ridge with an intercept fits (XcᵀXc + αI) w = Xcᵀyc on the centred training fold. The
+# per-year sums (n, Σx, Σy, XᵀX, Xᵀy) are computed once; each fold's statistics are the
+# totals minus the held-out year, and every (fold, alpha) system is solved in one batched
+# np.linalg.solve. Same fits as sklearn Ridge(alpha).fit per fold, without refitting.
+#
+#   python ridge_cv.py                                   # config alpha grid, model features
+#   python ridge_cv.py --alphas 0.01:1000:51 --workers 0 \
+#       --features storm_days,wave_power --features storm_index,rain_3d_max
+import os, sys, argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import position_matrix
+from config import RIDGE_ALPHAS
+
+FEATURES = ["storm_days", "wave_power", "rain_3d_max", "storm_index"]
+
+def year_stats(X, y, years):
+    """Per-year sufficient statistics of (X, y), rows grouped by year."""
+    X, y, years = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64), np.asarray(years)
+    # centring is shift-invariant; shifting by the global mean first keeps the
+    # fold-wise Gram subtraction well conditioned (wave_power is ~1e3-1e4)
+    X, y = X - X.mean(axis=0), y - y.mean()
+    order = np.argsort(years, kind="stable")
+    X, y, years = X[order], y[order], years[order]
+    uy, start = np.unique(years, return_index=True)
+    return {
+        "years": uy, "start": np.append(start, len(y)), "X": X, "y": y,
+        "n": np.diff(np.append(start, len(y))).astype(np.float64),
+        "sx": np.add.reduceat(X, start, axis=0),
+        "sy": np.add.reduceat(y, start),
+        "xx": np.add.reduceat(X[:, :, None] * X[:, None, :], start, axis=0),
+        "xy": np.add.reduceat(X * y[:, None], start, axis=0),
+    }
+
+def fold_coefs(st, alphas):
+    """Ridge (coef [k, a, p], intercept [k, a]) for every held-out year k and alpha a."""
+    N = st["n"].sum() - st["n"]
+    xbar = (st["sx"].sum(axis=0) - st["sx"]) / N[:, None]
+    ybar = (st["sy"].sum() - st["sy"]) / N
+    C = (st["xx"].sum(axis=0) - st["xx"]) - N[:, None, None] * xbar[:, :, None] * xbar[:, None, :]
+    c = (st["xy"].sum(axis=0) - st["xy"]) - N[:, None] * xbar * ybar[:, None]
+    p = C.shape[-1]
+    A = C[:, None] + np.asarray(alphas, dtype=np.float64)[None, :, None, None] * np.eye(p)
+    W = np.linalg.solve(A, np.broadcast_to(c[:, None, :, None], A.shape[:-1] + (1,)))[..., 0]
+    return W, ybar[:, None] - np.einsum("kp,kap->ka", xbar, W)
+
+def loo_year_mae(X, y, years, alphas):
+    """Mean over held-out years of the per-year MAE, for each alpha (array [len(alphas)])."""
+    st = year_stats(X, y, years)
+    W, b = fold_coefs(st, alphas)
+    s = st["start"]
+    fold_mae = np.empty((len(st["years"]), len(alphas)))
+    for k in range(len(st["years"])):
+        Xk, yk = st["X"][s[k]:s[k + 1]], st["y"][s[k]:s[k + 1]]
+        fold_mae[k] = np.abs(Xk @ W[k].T + b[k] - yk[:, None]).mean(axis=0)
+    return fold_mae.mean(axis=0)
+
+def _grid_task(args):
+    feats, X, y, years, alphas = args
+    return feats, alphas, loo_year_mae(X, y, years, alphas)
+
+def tune(train, feature_sets=(FEATURES,), alphas=RIDGE_ALPHAS, workers=1, chunk=64):
+    """LOO-Year MAE for every (feature set, alpha); large grids/feature sets split across processes."""
+    years = train["year"].to_numpy()
+    y = train["delta_pos_m"].to_numpy()
+    alphas = list(alphas)
+    tasks = [(list(fs), train[list(fs)].to_numpy(), y, years, alphas[i:i + chunk])
+             for fs in feature_sets for i in range(0, len(alphas), chunk)]
+    workers = min((os.cpu_count() or 1) if workers <= 0 else workers, len(tasks))
+    if workers == 1:
+        results = [_grid_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(_grid_task, tasks))
+    rows = [{"features": ",".join(fs), "alpha": a, "loo_year_mae": float(m)}
+            for fs, al, maes in results for a, m in zip(al, maes)]
+    return pd.DataFrame(rows)
+
+def _parse_alphas(s):
+    if ":" in s:   # lo:hi:n, log-spaced
+        lo, hi, n = s.split(":")
+        return np.logspace(np.log10(float(lo)), np.log10(float(hi)), int(n)).tolist()
+    return [float(a) for a in s.split(",")]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LOO-Year ridge tuning over an alpha grid and feature sets.")
+    ap.add_argument("--alphas", default=None, help="comma list or lo:hi:n (log-spaced); default config.RIDGE_ALPHAS")
+    ap.add_argument("--features", action="append", help="comma-separated feature set (repeatable)")
+    ap.add_argument("--workers", type=int, default=1, help="processes (0 = all CPUs)")
+    ap.add_argument("--art-dir", default="./artifacts")
+    args = ap.parse_args(argv)
+
+    from train_model import build_training, trim_outliers
+    labels = position_matrix.load(args.art_dir)
+    feats = pd.read_csv(os.path.join(args.art_dir, "annual_driver_features.csv"))
+    train = trim_outliers(build_training(labels, feats))
+    sets = [f.split(",") for f in args.features] if args.features else [FEATURES]
+    alphas = _parse_alphas(args.alphas) if args.alphas else RIDGE_ALPHAS
+
+    res = tune(train, sets, alphas, args.workers)
+    best = res.loc[res.groupby("features")["loo_year_mae"].idxmin()].sort_values("loo_year_mae")
+    out = os.path.join(args.art_dir, "ridge_cv_grid.csv")
+    res.to_csv(out, index=False)
+    print(f"{len(res)} fits on {len(train)} samples / {train['year'].nunique()} years -> {out}")
+    print(best.to_string(index=False))
+
+if __name__ == "__main__":
+    sys.exit(main())
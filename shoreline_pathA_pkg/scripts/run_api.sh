@@ -1,5 +1,9 @@
-
 #!/usr/bin/env bash
 set -euo pipefail
 # export OWM_API_KEY=YOUR_KEY  # or set in config.py
-uvicorn serve_api:app --host 0.0.0.0 --port 8000
+# WORKERS=4 bash scripts/run_api.sh   # several processes sharing one SQLite cache (CACHE_BACKEND / CACHE_DB)
+WORKERS="${WORKERS:-1}"
+if [ "$WORKERS" -gt 1 ]; then
+  export CACHE_BACKEND="${CACHE_BACKEND:-sqlite}"
+fi
+uvicorn serve_api:app --host 0.0.0.0 --port 8000 --workers "$WORKERS"
@@ -1,17 +1,22 @@
 # serve_api.py — Path A API with caching + per-transect scaling + NaN-safe JSON + summary + scale clamp + WGS84 lat/lon
-import os, json, time
+import os, json, time, asyncio, hashlib
+from contextlib import asynccontextmanager, suppress
 import numpy as np
 import pandas as pd
 import pytz, datetime as dt
-import joblib, requests
+import joblib, httpx
 from threading import RLock
 from typing import Dict, Any
 from math import radians, sin, cos, atan2, sqrt
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from config import (TZ, FORECAST_DAYS, OWM_ENDPOINT, OWM_WIND_STORM_THRES, OWM_API_KEY)
+from config import (TZ, FORECAST_DAYS, OWM_ENDPOINT, OWM_WIND_STORM_THRES, OWM_API_KEY,
+                    QUALITY_SERVE_ACTIVE_ONLY)
+import transect_quality
+from ttl_cache import TTLCache, SqliteTTLCache, json_size
 
 # ------------------------------
 # Locate & validate artifacts
@@ -39,6 +44,12 @@ TYPICAL = pd.read_csv(os.path.join(ART_DIR, "typical_annual_delta_by_transect.cs
 if "transect_id" in TYPICAL:   TYPICAL["transect_id"] = TYPICAL["transect_id"].astype(int)
 if "transect_id" in TRANSECTS: TRANSECTS["transect_id"] = TRANSECTS["transect_id"].astype(int)
 
+# Optionally serve only transects the quality index marks active (transect_quality.py)
+SERVE_ACTIVE_ONLY = os.getenv("SERVE_ACTIVE_ONLY", "1" if QUALITY_SERVE_ACTIVE_ONLY else "0") == "1"
+ACTIVE_IDS = transect_quality.active_ids(ART_DIR) if SERVE_ACTIVE_ONLY else None
+if ACTIVE_IDS is not None:
+    TRANSECTS = TRANSECTS[TRANSECTS["transect_id"].isin(ACTIVE_IDS)].reset_index(drop=True)
+
 FEATS = FEATURE_META["features"]
 GLOBAL_MEAN_DELTA = float(FEATURE_META.get("global_mean_delta", 0.0))
 
@@ -48,7 +59,20 @@ GEO_KEEP = ["transect_id","mid_lat","mid_lon","lat1","lon1","lat2","lon2"]
 # ------------------------------
 # FastAPI + CORS
 # ------------------------------
-app = FastAPI(title="Frankston Shoreline 7-day API (Path A)")
+@asynccontextmanager
+async def lifespan(app):
+    tasks = [asyncio.create_task(_sweep_loop())]
+    if REWARM_TOP_N > 0:
+        tasks.append(asyncio.create_task(_rewarm_loop()))
+    yield
+    for t in tasks:
+        t.cancel()
+        with suppress(asyncio.CancelledError):
+            await t
+    if _LOOP_STATE is not None:
+        await _LOOP_STATE.client.aclose()
+
+app = FastAPI(title="Frankston Shoreline 7-day API (Path A)", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # tighten in prod
@@ -67,26 +91,56 @@ def to_local(utc_sec, tz=TZ):
     return dt.datetime.fromtimestamp(utc_sec, pytz.UTC).astimezone(pytz.timezone(tz)).date()
 
 # ------------------------------
-# Simple in-memory TTL cache
+# LRU + TTL cache (soft / hard expiry; in memory or shared SQLite, ttl_cache.py)
 # ------------------------------
+# An entry is fresh for OWM_CACHE_TTL_MIN. After that and until OWM_CACHE_HARD_TTL_MIN it is stale:
+# still served at once while a background task refreshes it. Past the hard TTL it is dropped.
 OWM_CACHE_TTL_MIN = int(os.getenv("OWM_CACHE_TTL_MIN", "45"))
 OWM_CACHE_TTL_SEC = OWM_CACHE_TTL_MIN * 60
-_OWM_CACHE: dict[str, dict] = {}        # (lat,lon)-> json
-_FORECAST_CACHE: dict[str, dict] = {}   # (lat,lon)-> payload
-_CACHE_LOCK = RLock()
+OWM_CACHE_HARD_TTL_MIN = max(int(os.getenv("OWM_CACHE_HARD_TTL_MIN", str(2 * OWM_CACHE_TTL_MIN))), OWM_CACHE_TTL_MIN)
+OWM_CACHE_HARD_TTL_SEC = OWM_CACHE_HARD_TTL_MIN * 60
+OWM_CACHE_MAX_ENTRIES = int(os.getenv("OWM_CACHE_MAX_ENTRIES", "2000"))
+OWM_CACHE_MAX_MB = float(os.getenv("OWM_CACHE_MAX_MB", "32"))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "200"))
+FORECAST_CACHE_MAX_MB = float(os.getenv("FORECAST_CACHE_MAX_MB", "256"))   # a payload is ~0.3 kB per transect-day
+CACHE_SWEEP_SEC = float(os.getenv("CACHE_SWEEP_SEC", "60"))                  # drop hard-expired entries this often
+_CACHE_LOCK = RLock()   # guards _HOT; the stores lock themselves
+_CACHE_STATS = {"stale_served": 0, "background_refreshes": 0, "background_errors": 0, "rewarmed": 0}
 _now = time.time
 
-def _cache_get(store: dict, key: str):
-    with _CACHE_LOCK:
-        e = store.get(key)
-        if e and e["expires"] > _now():
-            return e["data"]
-        if e: store.pop(key, None)
-    return None
-
-def _cache_put(store: dict, key: str, data, ttl_sec: int):
-    with _CACHE_LOCK:
-        store[key] = {"data": data, "expires": _now() + ttl_sec}
+def _payload_size(out):
+    # JSON size of a forecast payload, extrapolated from its first rows (dumping ~7000 rows costs ~70 ms)
+    rows = out["data"]
+    head = rows[:64]
+    return json_size(out["meta"]) + (json_size(head) * len(rows) // len(head) if head else 2)
+
+# CACHE_BACKEND=sqlite: one cache file (CACHE_DB) shared by all uvicorn workers (scripts/run_api.sh WORKERS=N)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_DB = os.getenv("CACHE_DB", os.path.join(BASE_DIR, "cache", "api_cache.sqlite"))
+CACHE_LOCAL_ENTRIES = int(os.getenv("CACHE_LOCAL_ENTRIES", "4"))   # decoded payloads each worker keeps (sqlite)
+
+def _store(name, max_entries, max_mb, sizeof=json_size, namespace=None):
+    if CACHE_BACKEND == "sqlite":
+        return SqliteTTLCache(CACHE_DB, name, OWM_CACHE_TTL_SEC, OWM_CACHE_HARD_TTL_SEC, max_entries, int(max_mb * 2**20),
+                              clock=lambda: _now(), namespace=namespace, local_entries=CACHE_LOCAL_ENTRIES)
+    if CACHE_BACKEND == "memory":
+        return TTLCache(name, OWM_CACHE_TTL_SEC, OWM_CACHE_HARD_TTL_SEC, max_entries, int(max_mb * 2**20),
+                        sizeof=sizeof, clock=lambda: _now())
+    raise RuntimeError(f"CACHE_BACKEND must be 'memory' or 'sqlite', not {CACHE_BACKEND!r}")
+
+# forecasts depend on the served model / transect set, so sites sharing CACHE_DB get their own namespace
+_SITE_NS = hashlib.sha1(f"{os.path.abspath(ART_DIR)}|{ACTIVE_IDS is not None}".encode()).hexdigest()[:10]
+_OWM_CACHE = _store("owm", OWM_CACHE_MAX_ENTRIES, OWM_CACHE_MAX_MB)                      # (lat,lon)-> json
+_FORECAST_CACHE = _store("forecast", FORECAST_CACHE_MAX_ENTRIES, FORECAST_CACHE_MAX_MB,
+                         sizeof=_payload_size, namespace=f"forecast:{_SITE_NS}")          # (lat,lon)-> payload
+
+async def _cache_call(store, method, *args, **kw):
+    """store.method(*args). The SQLite store can wait on its busy_timeout and (de)codes whole payloads,
+    so its calls run in a worker thread; the in-memory store is called inline."""
+    fn = getattr(store, method)
+    if store.shared:
+        return await asyncio.to_thread(fn, *args, **kw)
+    return fn(*args, **kw)
 
 def _loc_key(lat: float, lon: float) -> str:
     return f"{round(lat,3)},{round(lon,3)}"
@@ -113,12 +167,66 @@ def _haversine(lon1, lat1, lon2, lat2):
     return 2*R*atan2(sqrt(a), sqrt(1-a))
 
 # ------------------------------
-# OWM fetch & feature proxy
+# OWM fetch (async, pooled) & feature proxy
 # ------------------------------
-def fetch_owm(lat: float, lon: float, api_key: str):
+OWM_ENDPOINT = os.getenv("OWM_ENDPOINT", OWM_ENDPOINT)              # e.g. a local stub (owm_stub.py)
+OWM_TIMEOUT_SEC = float(os.getenv("OWM_TIMEOUT_SEC", "30"))
+OWM_MAX_CONNECTIONS = int(os.getenv("OWM_MAX_CONNECTIONS", "20"))   # pooled keep-alive connections
+OWM_MAX_INFLIGHT = int(os.getenv("OWM_MAX_INFLIGHT", "8"))          # concurrent upstream calls
+_UPSTREAM_STATS = {"owm_calls": 0, "owm_errors": 0, "single_flight_joined": 0}
+
+class _LoopState:
+    """Pooled HTTP client, upstream semaphore and in-flight tasks; bound to one event loop."""
+    def __init__(self, loop):
+        self.loop = loop
+        self.client = httpx.AsyncClient(
+            timeout=OWM_TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=OWM_MAX_CONNECTIONS, max_keepalive_connections=OWM_MAX_CONNECTIONS))
+        self.upstream = asyncio.Semaphore(OWM_MAX_INFLIGHT)
+        self.inflight: dict = {}
+
+_LOOP_STATE = None
+
+def _loop_state():
+    # one state per running loop (uvicorn has one; test clients may start a new loop per request)
+    global _LOOP_STATE
+    loop = asyncio.get_running_loop()
+    if _LOOP_STATE is None or _LOOP_STATE.loop is not loop:
+        _LOOP_STATE = _LoopState(loop)
+    return _LOOP_STATE
+
+def _flight(key, make):
+    """(task, joined): the running task for key, or a new one started from make()."""
+    st = _loop_state()
+    task = st.inflight.get(key)
+    if task is not None:
+        return task, True
+    task = st.inflight[key] = asyncio.ensure_future(make())
+    task.add_done_callback(lambda t: st.inflight.pop(key, None) if st.inflight.get(key) is t else None)
+    return task, False
+
+async def single_flight(key, make):
+    """
+    Run make() at most once per key at a time: concurrent callers await the same task and get its
+    result or exception. The task is shielded, so a cancelled caller does not cancel the others.
+    """
+    task, joined = _flight(key, make)
+    if joined:
+        _UPSTREAM_STATS["single_flight_joined"] += 1
+    return await asyncio.shield(task)
+
+async def fetch_owm(lat: float, lon: float, api_key: str):
     params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric", "exclude": "minutely"}
-    r = requests.get(OWM_ENDPOINT, params=params, timeout=30)
+    st = _loop_state()
+    async with st.upstream:
+        _UPSTREAM_STATS["owm_calls"] += 1
+        try:
+            r = await st.client.get(OWM_ENDPOINT, params=params)
+        except httpx.HTTPError as e:
+            _UPSTREAM_STATS["owm_errors"] += 1
+            raise HTTPException(502, f"OWM unreachable: {type(e).__name__}")
     if r.status_code >= 400:
+        _UPSTREAM_STATS["owm_errors"] += 1
         raise HTTPException(502, f"OWM {r.status_code}: {r.text[:400]}")
     return r.json()
 
@@ -170,23 +278,160 @@ def proxy_to_feature_row(proxy_df: pd.DataFrame):
 # Core forecast (shared by GET/POST)
 # ------------------------------
 SCALE_CLAMP = float(os.getenv("SCALE_CLAMP", "3.0"))  # ±3x by default
+JSON_FLOAT_COLS = ["mid_lat","mid_lon","lat1","lon1","lat2","lon2","typical_annual_delta_m"]
+
+def _transect_table():
+    """
+    Forecast-invariant per-transect parts, in output order (sorted transect_id):
+    ids, clamped scale vs the global mean delta (1.0 without a typical), and the JSON-safe
+    typical/geo fields appended to every row of that transect.
+    """
+    tids = np.sort(TRANSECTS["transect_id"].astype(int).to_numpy())
+    base = pd.DataFrame({"transect_id": tids}).merge(TYPICAL, on="transect_id", how="left", indicator=True)
+    scale = np.ones(len(tids))
+    if abs(GLOBAL_MEAN_DELTA) > 1e-9:
+        has = (base["_merge"] == "both").to_numpy()
+        typ = base["typical_annual_delta_m"].to_numpy(dtype=float)
+        # clamp extreme scaling to keep things sane
+        scale[has] = np.clip(typ[has] / GLOBAL_MEAN_DELTA, -SCALE_CLAMP, SCALE_CLAMP)
+    static = base.drop(columns="_merge")
+    geo_cols = [c for c in GEO_KEEP if c in TRANSECTS.columns]
+    if geo_cols:
+        static = static.merge(TRANSECTS[geo_cols], on="transect_id", how="left")
+    # NaN -> None on object arrays (a float column would turn None back into NaN)
+    cols = {}
+    for c in static.columns.drop("transect_id"):
+        v = static[c].to_numpy()
+        if c in JSON_FLOAT_COLS or v.dtype.kind == "f":
+            v = pd.to_numeric(static[c], errors="coerce").to_numpy(dtype=float)
+            obj = v.astype(object)
+            obj[~np.isfinite(v)] = None
+            v = obj
+        else:
+            v = np.where(pd.isna(v), None, v)
+        cols[c] = v.tolist()
+    rows = [dict(zip(cols, vals)) for vals in zip(*cols.values())] if cols else [{} for _ in tids]
+    return tids.tolist(), scale, rows
+
+FORECAST_TIDS, FORECAST_SCALE, FORECAST_STATIC = _transect_table()
+
+# Hottest locations, re-warmed before their forecast goes stale (REWARM_TOP_N = 0 turns it off)
+REWARM_TOP_N = int(os.getenv("REWARM_TOP_N", "20"))
+REWARM_INTERVAL_SEC = float(os.getenv("REWARM_INTERVAL_SEC", "60"))
+REWARM_LEAD_SEC = float(os.getenv("REWARM_LEAD_SEC", "300"))   # refresh this long before the soft TTL
+_HOT: dict[str, list] = {}   # key -> [lat, lon, hits]; hits halve every REWARM_INTERVAL_SEC
+_HOT_MAX = 50 * REWARM_TOP_N  # new keys are not tracked beyond this (crawlers) until counts decay
 
-def compute_forecast(lat: float, lon: float):
-    api_key = OWM_API_KEY or os.getenv("OWM_API_KEY")
+def _api_key():
+    return OWM_API_KEY or os.getenv("OWM_API_KEY")
+
+async def compute_forecast(lat: float, lon: float):
+    api_key = _api_key()
     if not api_key:
         raise HTTPException(500, "OWM_API_KEY not set (in config.py or environment).")
 
     key = _loc_key(lat, lon)
+    if REWARM_TOP_N > 0:
+        with _CACHE_LOCK:
+            if key in _HOT or len(_HOT) < _HOT_MAX:
+                _HOT.setdefault(key, [lat, lon, 0.0])[2] += 1
 
-    cached = _cache_get(_FORECAST_CACHE, key)
+    cached = await _cache_call(_FORECAST_CACHE, "get", key)
     if cached is not None:
-        return cached
-
-    owm = _cache_get(_OWM_CACHE, key)
-    if owm is None:
-        owm = fetch_owm(lat, lon, api_key)
-        _cache_put(_OWM_CACHE, key, owm, OWM_CACHE_TTL_SEC)
+        if cached["fresh_until"] <= _now():
+            _CACHE_STATS["stale_served"] += 1
+            refresh_in_background(key, lat, lon, api_key)
+        return cached["data"]
+    # one OWM call + assembly per key, however many requests miss at the same time
+    return await single_flight(key, lambda: _refresh_forecast(lat, lon, key, api_key))
+
+async def _refresh_forecast(lat: float, lon: float, key: str, api_key: str, force=False):
+    if _FORECAST_CACHE.shared:
+        return await _refresh_shared(lat, lon, key, api_key, force)
+    return await _build_forecast(lat, lon, key, api_key, force)
+
+async def _build_forecast(lat: float, lon: float, key: str, api_key: str, force: bool):
+    # the forecast is aged from its OWM data, so one built from a stale OWM entry is stale too
+    e = None if force else await _cache_call(_OWM_CACHE, "get", key)
+    if e is None:
+        e = await _cache_call(_OWM_CACHE, "put", key, await fetch_owm(lat, lon, api_key))
+    out = await asyncio.to_thread(assemble_forecast, e["data"])   # ~7000 rows of CPU work, off the loop
+    await _cache_call(_FORECAST_CACHE, "put", key, out, fetched=e["fetched"])
+    return out
 
+async def _refresh_shared(lat: float, lon: float, key: str, api_key: str, force: bool):
+    # shared cache: one worker refreshes a key (lease); the others wait for its entry to land
+    t0 = _now()
+    async def landed():
+        e = await _cache_call(_FORECAST_CACHE, "peek", key, with_data=True)
+        return e["data"] if e is not None and (not force or e["fetched"] >= t0) else None
+    while not await _cache_call(_FORECAST_CACHE, "acquire", key, OWM_TIMEOUT_SEC + 10):
+        await asyncio.sleep(0.05)
+        out = await landed()
+        if out is not None:
+            return out
+    try:
+        out = await landed()   # finished by another worker just before we got the lease
+        return out if out is not None else await _build_forecast(lat, lon, key, api_key, force)
+    finally:
+        await _cache_call(_FORECAST_CACHE, "release", key)
+
+def refresh_in_background(key: str, lat: float, lon: float, api_key: str):
+    """Re-fetch and re-assemble key without waiting; no-op if a refresh is already running.
+    On failure the current (stale) entry stays in place until its hard TTL. True if a refresh was started."""
+    task, joined = _flight(key, lambda: _refresh_forecast(lat, lon, key, api_key, force=True))
+    if not joined:
+        _CACHE_STATS["background_refreshes"] += 1
+        task.add_done_callback(_background_done)
+    return not joined
+
+def _background_done(task):
+    if not task.cancelled() and task.exception() is not None:
+        _CACHE_STATS["background_errors"] += 1
+
+def _rewarm_due():
+    """Decay the hit counts; (key, lat, lon) of the REWARM_TOP_N hottest locations whose forecast is
+    missing or due within REWARM_LEAD_SEC."""
+    now = _now()
+    with _CACHE_LOCK:
+        hot = sorted(_HOT.items(), key=lambda kv: -kv[1][2])[:REWARM_TOP_N]
+        for k in list(_HOT):
+            _HOT[k][2] /= 2
+            if _HOT[k][2] < 0.25:
+                del _HOT[k]
+        due = []
+        for k, (lat, lon, _) in hot:
+            e = _FORECAST_CACHE.peek(k)
+            if e is None or e["fresh_until"] - now <= REWARM_LEAD_SEC:
+                due.append((k, lat, lon))
+    return due
+
+async def rewarm_once():
+    """Start background refreshes for the hot locations that are due. Returns how many were started."""
+    api_key = _api_key()
+    due = await asyncio.to_thread(_rewarm_due) if _FORECAST_CACHE.shared else _rewarm_due()
+    if not api_key:
+        return 0
+    started = sum(refresh_in_background(k, lat, lon, api_key) for k, lat, lon in due)
+    _CACHE_STATS["rewarmed"] += started
+    return started
+
+async def _sweep_loop():
+    while True:
+        await asyncio.sleep(CACHE_SWEEP_SEC)
+        for c in (_OWM_CACHE, _FORECAST_CACHE):
+            await _cache_call(c, "sweep")
+
+async def _rewarm_loop():
+    while True:
+        await asyncio.sleep(REWARM_INTERVAL_SEC)
+        try:
+            await rewarm_once()
+        except Exception as e:   # keep the scheduler alive
+            print(f"rewarm failed: {type(e).__name__}: {e}")
+
+def assemble_forecast(owm):
+    """Forecast payload ({meta, data}) from an OWM One Call response."""
     proxy7 = owm_to_proxy(owm)
     if proxy7.empty:
         raise HTTPException(503, "No forecast data from OWM for the requested location/time.")
@@ -199,44 +444,23 @@ def compute_forecast(lat: float, lon: float):
     if np.sum(weights) <= 0:
         weights = None
 
-    results = []
-    for tid in sorted(TRANSECTS["transect_id"].astype(int).tolist()):
-        row = TYPICAL.loc[TYPICAL["transect_id"] == tid]
-        scale = 1.0
-        if not row.empty and abs(GLOBAL_MEAN_DELTA) > 1e-9:
-            scale = float(row["typical_annual_delta_m"].values[0]) / GLOBAL_MEAN_DELTA
-            # clamp extreme scaling to keep things sane
-            scale = float(np.clip(scale, -SCALE_CLAMP, SCALE_CLAMP))
-
-        delta_week = delta_week_base * scale
-
-        if weights is None:
-            per_day = np.repeat(delta_week / len(proxy7), len(proxy7))
-        else:
-            w = weights / weights.sum()
-            per_day = delta_week * w
-
-        for i, r in proxy7.iterrows():
-            results.append({
-                "transect_id": int(tid),
-                "date": r["date"].isoformat(),
-                "pred_daily_delta_m": jfloat(per_day[i]),
-                "wind_max_ms": jfloat(r["wind_max"]),
-                "gust_max_ms": jfloat(r["gust_max"]),
-                "rain_sum_mm": jfloat(r["rain_sum"]),
-            })
-
-    # Attach typicals and geo (if available)
-    pred = pd.DataFrame(results).merge(TYPICAL, on="transect_id", how="left")
-    geo_cols = [c for c in GEO_KEEP if c in TRANSECTS.columns]
-    if geo_cols:
-        pred = pred.merge(TRANSECTS[geo_cols], on="transect_id", how="left")
-
-    # JSON-safe replacements
-    pred = pred.replace({np.nan: None})
-    for c in ["mid_lat","mid_lon","lat1","lon1","lat2","lon2","typical_annual_delta_m"]:
-        if c in pred.columns:
-            pred[c] = pred[c].apply(jfloat)
+    # transect x day deltas in one shot: weekly delta per transect spread over the days by storm weight
+    delta_week = delta_week_base * FORECAST_SCALE
+    n_days = len(proxy7)
+    if weights is None:
+        per_day = np.repeat((delta_week / n_days)[:, None], n_days, axis=1)
+    else:
+        per_day = delta_week[:, None] * (weights / weights.sum())[None, :]
+    cells = per_day.astype(object)
+    cells[~np.isfinite(per_day)] = None
+    cells = cells.tolist()
+
+    days = [(d.isoformat(), jfloat(w), jfloat(g), jfloat(r)) for d, w, g, r in
+            zip(proxy7["date"], proxy7["wind_max"], proxy7["gust_max"], proxy7["rain_sum"])]
+    data = [{"transect_id": tid, "date": d, "pred_daily_delta_m": v,
+             "wind_max_ms": w, "gust_max_ms": g, "rain_sum_mm": r, **static}
+            for tid, static, row in zip(FORECAST_TIDS, FORECAST_STATIC, cells)
+            for (d, w, g, r), v in zip(days, row)]
 
     meta = {
         "timezone": TZ,
@@ -247,11 +471,10 @@ def compute_forecast(lat: float, lon: float):
         "global_mean_delta": GLOBAL_MEAN_DELTA,
         "scale_clamp": SCALE_CLAMP,
         "cache_ttl_min": OWM_CACHE_TTL_MIN,
+        "active_transects_only": ACTIVE_IDS is not None,
         "pathA": True,
     }
-    out = {"meta": meta, "data": pred.to_dict(orient="records")}
-    _cache_put(_FORECAST_CACHE, key, out, OWM_CACHE_TTL_SEC)
-    return out
+    return {"meta": meta, "data": data}
 
 # ------------------------------
 # Endpoints
@@ -267,6 +490,7 @@ def health():
         "scale_clamp": SCALE_CLAMP,
         "transects": int(TRANSECTS["transect_id"].nunique()) if "transect_id" in TRANSECTS else len(TRANSECTS),
         "cache_ttl_min": OWM_CACHE_TTL_MIN,
+        "active_transects_only": ACTIVE_IDS is not None,
         "pathA": True,
         "enriched_geo": bool(all(col in TRANSECTS.columns for col in ["mid_lat","mid_lon"]))
     }
@@ -278,23 +502,36 @@ def cache_stats():
             "owm_cache_entries": len(_OWM_CACHE),
             "forecast_cache_entries": len(_FORECAST_CACHE),
             "ttl_min": OWM_CACHE_TTL_MIN,
+            "hard_ttl_min": OWM_CACHE_HARD_TTL_MIN,
+            "stores": {c.name: c.stats() for c in (_OWM_CACHE, _FORECAST_CACHE)},
+            "hot_locations": len(_HOT),
+            "rewarm_top_n": REWARM_TOP_N,
+            **_CACHE_STATS,
+            "owm_inflight": len(_LOOP_STATE.inflight) if _LOOP_STATE is not None else 0,
+            "owm_max_inflight": OWM_MAX_INFLIGHT,
+            **_UPSTREAM_STATS,
         }
 
+# payloads are JSON-native already (assemble_forecast), so skip jsonable_encoder's walk over ~7000 rows
 @app.post("/forecast-7d")
-def forecast_7d(payload: dict):
+async def forecast_7d(payload: dict):
     lat = float(payload.get("lat", -38.5))
     lon = float(payload.get("lon", 145.0))
-    return compute_forecast(lat, lon)
+    return JSONResponse(await compute_forecast(lat, lon))
 
 # Convenience GET (avoid JSON body)
 @app.get("/forecast-7d")
-def forecast_7d_get(lat: float = -38.5, lon: float = 145.0):
-    return compute_forecast(lat, lon)
+async def forecast_7d_get(lat: float = -38.5, lon: float = 145.0):
+    return JSONResponse(await compute_forecast(lat, lon))
 
 # Compact summary for frontend charts/tables
 @app.get("/forecast-7d/summary")
-def forecast_summary(lat: float = -38.5, lon: float = 145.0, k: int = 10):
-    out = compute_forecast(lat, lon)   # cached
+async def forecast_summary(lat: float = -38.5, lon: float = 145.0, k: int = 10):
+    out = await compute_forecast(lat, lon)   # cached
+    return await asyncio.to_thread(summarize_forecast, out, k)
+
+def summarize_forecast(out, k=10):
+    """Daily totals and the k most negative / positive weekly transects of a forecast payload."""
     df = pd.DataFrame(out["data"])
     if df.empty:
         return {"meta": out["meta"], "daily_totals": [], "top_transects": [], "bottom_transects": []}
@@ -0,0 +1,66 @@
+import os, sys
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+PKG = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PKG not in sys.path:
+    sys.path.insert(0, PKG)
+
+ORIGIN = (16_150_000.0, -4_590_000.0)   # EPSG:3857, Port Phillip Bay
+
+def write_scenes(out_dir, years, size=128, shape="sine", noise=0.05, nodata_frac=0.0, seed=0, pixel_m=10.0,
+                 drift_m=-5.0):
+    """
+    Yearly NDWI GeoTIFFs {year: path}: land to the west, sea to the east, a tanh step across a beach
+    3% of the width wide, white noise and NaN cloud blocks covering ~nodata_frac. The shore ("straight",
+    "sine", "bay" or "jagged") moves drift_m a year plus a random jitter; ~42% of a scene is water.
+    """
+    rng = np.random.default_rng(seed)
+    h = w = size
+    y = np.arange(h) * pixel_m
+    span = h * pixel_m
+    if shape == "straight":
+        profile = np.zeros(h)
+    elif shape == "sine":
+        profile = 0.06 * w * pixel_m * np.sin(4 * np.pi * y / span)
+    elif shape == "bay":
+        profile = -0.25 * w * pixel_m * np.exp(-((y - span / 2) / (span / 6)) ** 2)
+    else:
+        k = np.arange(1, 9)
+        amp = 0.05 * w * pixel_m / k * rng.uniform(0.5, 1.0, k.size)
+        phase = rng.uniform(0, 2 * np.pi, k.size)
+        profile = (amp[:, None] * np.sin(2 * np.pi * k[:, None] * y[None, :] / span + phase[:, None])).sum(axis=0)
+    x = (np.arange(w) + 0.5) * pixel_m
+    beach = max(3.0, 0.03 * w) * pixel_m
+    shore0 = 0.58 * w * pixel_m - profile.mean()
+    os.makedirs(out_dir, exist_ok=True)
+    out = {}
+    for i, yr in enumerate(years):
+        shore = shore0 + profile + drift_m * i + rng.normal(0, 2 * pixel_m)
+        ndwi = 0.1 + 0.4 * np.tanh((x[None, :] - shore[:, None]) / beach) + rng.normal(0, noise, (h, w))
+        ndwi = ndwi.astype(np.float32)
+        clouds = np.zeros((h, w), bool)
+        while nodata_frac > 0 and clouds.mean() < nodata_frac:
+            ch, cw = rng.integers(h // 20 + 1, h // 5 + 2), rng.integers(w // 20 + 1, w // 5 + 2)
+            r, c = rng.integers(0, h - ch + 1), rng.integers(0, w - cw + 1)
+            clouds[r:r + ch, c:c + cw] = True
+        ndwi[clouds] = np.nan
+        out[yr] = os.path.join(out_dir, f"Synthetic_{yr}_NDWI.tif")
+        with rasterio.open(out[yr], "w", driver="GTiff", height=h, width=w, count=1, dtype="float32",
+                           crs="EPSG:3857", transform=from_origin(*ORIGIN, pixel_m, pixel_m), nodata=np.nan) as dst:
+            dst.write(ndwi, 1)
+    return out
+
+@pytest.fixture(scope="session")
+def scenes(tmp_path_factory):
+    """write_scenes into a fresh directory: scenes(years, **spec) -> {year: path}."""
+    return lambda years, **spec: write_scenes(str(tmp_path_factory.mktemp("ndwi")), years, **spec)
+
+@pytest.fixture(autouse=True)
+def no_extract_cache(monkeypatch):
+    """Extract for real: the on-disk cache (EXTRACT_CACHE_DIR) is only used through its own API in tests."""
+    import extract_cache
+    monkeypatch.setattr(extract_cache, "EXTRACT_CACHE", False)
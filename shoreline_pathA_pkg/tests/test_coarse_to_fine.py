@@ -0,0 +1,41 @@
+# Coarse-to-fine returns the shore located on the overview, traced in a window around it without
+# reading the full scene; when the window's line is not that shore it falls back to the full scene.
+import numpy as np
+import pytest
+import shapely
+from shapely import affinity
+
+import train_model as tm
+
+@pytest.fixture(scope="module")
+def scene(scenes):
+    return scenes([2000], size=512, noise=0.05, shape="sine", seed=3)[2000]
+
+def _no_full_read(*a, **k):
+    raise AssertionError("full-scene read")
+
+def test_window_traces_the_full_scene_shore(scene, monkeypatch):
+    monkeypatch.setattr(tm, "COASTLINE_BACKEND", "contour")
+    full, _ = tm.contour_coastline(scene)
+    monkeypatch.setattr(tm, "read_ndwi", _no_full_read)
+    monkeypatch.setattr(tm, "threshold_decision", _no_full_read)
+    res = tm.coarse_to_fine_coastline(scene)
+    assert res is not None
+    coast = res[0]
+    # same shore as the full-scene contour backend, up to the overview's slightly different threshold
+    d = shapely.distance(shapely.points(shapely.get_coordinates(coast)), full)
+    assert np.median(d) < 5.0 and np.percentile(d, 95) < 20.0
+    assert 0.8 * full.length <= coast.length <= 1.2 * full.length
+
+def test_polygon_backend_drops_the_window_frame(scene):
+    res = tm.coarse_to_fine_coastline(scene)
+    assert res is not None
+    xy = shapely.get_coordinates(res[0])
+    # a shore running south to north, not a ring along the window frame
+    assert np.ptp(xy[:, 1]) > 0.9 * 5120 and np.ptp(xy[:, 0]) < 0.5 * 5120
+
+def test_falls_back_when_the_window_line_is_not_the_located_shore(scene, monkeypatch):
+    res = tm.coarse_to_fine_coastline(scene)
+    off = affinity.translate(res[0], xoff=5 * tm.COARSE_FACTOR * 10.0)
+    monkeypatch.setattr(tm, "_coarse_roi", lambda *a, **k: off)
+    assert tm.coarse_to_fine_coastline(scene) is None
@@ -0,0 +1,50 @@
+# The contour backend traces the iso-line around the largest connected water body, with water on
+# its right, without polygonizing the mask.
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from affine import Affine
+from rasterio.features import shapes
+from shapely.geometry import shape
+
+import contours
+import train_model as tm
+
+@pytest.fixture(scope="module", params=["sine", "jagged"])
+def scene(request, scenes):
+    return scenes([2000], size=256, noise=0.15, nodata_frac=0.15, shape=request.param, seed=5)[2000]
+
+def _water(tif):
+    with rasterio.open(tif) as src:
+        raw, transform = src.read(1), src.transform
+    arr, v = tm.prepare_ndwi(raw)
+    return arr, tm.water_mask(arr, *tm.water_rule(arr, v)).view(bool), transform
+
+def test_contour_runs_along_the_water_component(scene):
+    contour, _ = tm.contour_coastline(scene)
+    _, water, transform = _water(scene)
+    sea = contours.largest_component(water)
+    ring = shape(next(s for s, _ in shapes(sea.view(np.uint8), mask=sea, connectivity=8, transform=transform))).boundary
+    px = 10.0
+    assert not contour.is_empty
+    # every vertex sits on a cell edge between a pixel of that component and one outside it
+    assert shapely.distance(shapely.points(shapely.get_coordinates(contour)), ring).max() <= 0.5 * px + 1e-6
+
+def test_water_is_on_the_right(scene):
+    contour, _ = tm.contour_coastline(scene)
+    # synthetic sea lies east of the land, so the shore runs from the south edge to the north edge
+    (x0, y0), (x1, y1) = shapely.get_coordinates(contour)[[0, -1]]
+    with rasterio.open(scene) as src:
+        assert abs(y0 - src.bounds.bottom) < 10.0 and abs(y1 - src.bounds.top) < 10.0
+
+def test_longer_lake_is_not_traced():
+    arr = np.full((100, 100), -1.0, dtype=np.float32)
+    arr[:, 70:] = 1.0          # sea, 100 px of shore
+    arr[2:98, 10:13] = 1.0     # narrow lake: smaller, but its iso-line is about twice as long
+    t = Affine(10.0, 0, 0, 0, -10.0, 1000.0)
+    assert contours.longest_line(contours.iso_segments(arr, 0.0), t).length > 1500
+    line = tm.shore_line(arr, 0.0, True, t)
+    xs, ys = shapely.get_coordinates(line).T
+    np.testing.assert_allclose(xs, 10.0 * 69.5 + 5.0)
+    assert ys[0] < ys[-1]      # northwards: the sea (east) is on the right
@@ -0,0 +1,58 @@
+# Scenes read from the NDWI cube must give the thresholds and coastlines the GeoTIFFs give, and
+# the cube's one-pass products must agree with the per-scene decisions.
+import os
+
+import numpy as np
+import pytest
+import rasterio
+import shapely
+
+import datacube
+import train_model as tm
+
+@pytest.fixture(scope="module")
+def site(scenes):
+    return scenes(range(2010, 2014), size=96, shape="bay", noise=0.1, nodata_frac=0.1, seed=7)
+
+@pytest.fixture
+def cube(site, tmp_path, monkeypatch):
+    """Cube of the site, served to train_model as if NDWI_CUBE_DIR pointed at it; .hits counts scenes read from it."""
+    cube_dir = str(tmp_path / "cube")
+    cube = datacube.build(os.path.dirname(site[2010]), cube_dir)
+    read_scene, cube.hits = datacube.read_scene, []
+    def from_cube(ndwi_path):
+        hit = read_scene(ndwi_path, cube_dir)
+        cube.hits.append(hit is not None)
+        return hit
+    monkeypatch.setattr(datacube, "read_scene", from_cube)
+    return cube
+
+@pytest.mark.parametrize("backend", ["polygon", "contour"])
+def test_cube_reads_match_the_geotiffs(site, backend, monkeypatch, request):
+    monkeypatch.setattr(tm, "COASTLINE_BACKEND", backend)
+    plain = {y: (tm.threshold_decision(t), tm.coastline_from_ndwi(t)[0]) for y, t in site.items()}
+    cube = request.getfixturevalue("cube")
+    for y, t in site.items():
+        rec, coast = plain[y]
+        assert tm.threshold_decision(t) == rec
+        np.testing.assert_array_equal(shapely.get_coordinates(tm.coastline_from_ndwi(t)[0]),
+                                      shapely.get_coordinates(coast))
+    assert cube.hits and all(cube.hits)
+
+def test_one_pass_thresholds_match_threshold_decision(site, cube):
+    recs = cube.thresholds().set_index("year")
+    for y, t in site.items():
+        ref = tm.threshold_decision(t)
+        assert {k: recs.loc[y, k] for k in ref} == ref
+
+def test_water_frequency_counts_each_years_mask(site, cube):
+    water = valid = 0
+    for t in site.values():
+        with rasterio.open(t) as src:
+            arr, v = tm.prepare_ndwi(src.read(1))
+        water = water + tm.water_mask(arr, *tm.water_rule(arr, v)) * np.isfinite(arr)
+        valid = valid + np.isfinite(arr)
+    freq, n, _ = cube.water_frequency()
+    np.testing.assert_array_equal(n, valid)
+    with np.errstate(invalid="ignore"):
+        np.testing.assert_allclose(freq, np.where(valid > 0, water / valid, np.nan).astype(np.float32))
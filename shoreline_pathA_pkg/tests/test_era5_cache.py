@@ -0,0 +1,61 @@
+# The columnar ERA5 cache returns the merged frame unchanged and rebuilds when a source CSV changes.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import era5_cache
+import train_model as tm
+
+@pytest.fixture
+def csvs(tmp_path):
+    t = pd.date_range("2010-01-01", periods=24 * 400, freq="h")
+    rng = np.random.default_rng(0)
+    waves, rain = tmp_path / "waves.csv", tmp_path / "rain.csv"
+    pd.DataFrame({"valid_time": t, "swh": rng.gamma(2, 0.4, t.size), "mwp": rng.normal(6, 1, t.size),
+                  "latitude": -38.1, "longitude": 145.1}).to_csv(waves, index=False)
+    pd.DataFrame({"valid_time": t[::2] + pd.Timedelta("2min"), "tp": rng.gamma(0.3, 1e-3, t.size // 2),
+                  "expver": np.where(np.arange(t.size // 2) % 9, "0001", None)}).to_csv(rain, index=False)
+    return str(waves), str(rain)
+
+class _Build:
+    def __init__(self):
+        self.calls = 0
+    def __call__(self, waves_csv, rain_csv):
+        self.calls += 1
+        return tm._merge_hourly_drivers(waves_csv, rain_csv)
+
+def test_cached_frame_matches_the_csv_merge(csvs, tmp_path):
+    build, cache = _Build(), str(tmp_path / "era5")
+    first = era5_cache.load(*csvs, build, cache_dir=cache)
+    again = era5_cache.load(*csvs, build, cache_dir=cache)
+    assert build.calls == 1
+    ref = tm._merge_hourly_drivers(*csvs)
+    pd.testing.assert_frame_equal(first, ref, check_exact=True)
+    pd.testing.assert_frame_equal(again, ref, check_exact=True)
+    cols = era5_cache.load(*csvs, build, columns=tm.DRIVER_COLUMNS, cache_dir=cache)
+    pd.testing.assert_frame_equal(cols, ref[tm.DRIVER_COLUMNS], check_exact=True)
+    assert build.calls == 1
+
+def test_changed_source_rebuilds(csvs, tmp_path):
+    build, cache = _Build(), str(tmp_path / "era5")
+    era5_cache.load(*csvs, build, cache_dir=cache)
+    df = pd.read_csv(csvs[1])
+    df.loc[5, "tp"] = 1.0
+    df.to_csv(csvs[1], index=False)
+    out = era5_cache.load(*csvs, build, cache_dir=cache)
+    assert build.calls == 2
+    pd.testing.assert_frame_equal(out, tm._merge_hourly_drivers(*csvs), check_exact=True)
+
+def test_touched_source_rebuilds_only_on_mtime(csvs, tmp_path, monkeypatch):
+    build, cache = _Build(), str(tmp_path / "era5")
+    era5_cache.load(*csvs, build, cache_dir=cache)
+    os.utime(csvs[0], ns=(0, 0))
+    era5_cache.load(*csvs, build, cache_dir=cache)
+    assert build.calls == 2
+    monkeypatch.setattr(era5_cache, "ERA5_CACHE_VALIDATE", "hash")
+    era5_cache.load(*csvs, build, cache_dir=cache)
+    os.utime(csvs[0], ns=(10**9, 10**9))        # same content: still valid
+    era5_cache.load(*csvs, build, cache_dir=cache)
+    assert build.calls == 3
@@ -0,0 +1,91 @@
+# Cache entries are keyed on scene content, NDWI settings, extraction parameters and (for positions)
+# the transect set: any change is a miss, a renamed or touched but identical scene is a hit.
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString
+
+import extract_cache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_cache, "EXTRACT_CACHE", True)
+    return str(tmp_path / "cache")
+
+@pytest.fixture
+def site(scenes):
+    return scenes([2010, 2011], size=32, seed=4)
+
+def _transects(n=5):
+    x = np.arange(n, dtype=float) * 50
+    return pd.DataFrame({"transect_id": np.arange(n), "x1": x, "y1": 0.0, "x2": x, "y2": 600.0})
+
+def test_identical_content_hits_changed_content_misses(cache, site, tmp_path):
+    line = LineString([(0, 0), (1, 1)])
+    extract_cache.put_coastline(site[2010], line, "EPSG:3857", cache_dir=cache)
+    assert extract_cache.get_coastline(site[2010], cache_dir=cache) == (line, "EPSG:3857")
+
+    moved = tmp_path / "renamed.tif"
+    shutil.copy(site[2010], moved)
+    os.utime(moved, ns=(0, 0))
+    assert extract_cache.get_coastline(str(moved), cache_dir=cache) == (line, "EPSG:3857")
+    assert extract_cache.get_coastline(site[2011], cache_dir=cache) is None
+
+    shutil.copy(site[2011], moved)          # same path, new content
+    assert extract_cache.get_coastline(str(moved), cache_dir=cache) is None
+
+def test_settings_and_parameters_are_part_of_the_key(cache, site, monkeypatch):
+    extract_cache.put_coastline(site[2010], "polygon", None, thr="auto", cache_dir=cache, backend="polygon")
+    assert extract_cache.get_coastline(site[2010], thr="auto", cache_dir=cache, backend="polygon") == ("polygon", None)
+    assert extract_cache.get_coastline(site[2010], thr=-0.1, cache_dir=cache, backend="polygon") is None
+    assert extract_cache.get_coastline(site[2010], thr="auto", cache_dir=cache, backend="contour") is None
+    assert extract_cache.get_coastline(site[2010], thr="auto", cache_dir=cache) is None
+    monkeypatch.setattr(extract_cache, "CACHE_VERSION", extract_cache.CACHE_VERSION + 1)
+    assert extract_cache.get_coastline(site[2010], thr="auto", cache_dir=cache, backend="polygon") is None
+
+def test_positions_are_keyed_on_the_transect_set(cache, site):
+    tr = _transects()
+    pos = pd.DataFrame({"transect_id": tr["transect_id"], "position_m": np.linspace(250, 350, len(tr))})
+    extract_cache.put_positions(site[2010], tr, pos, cache_dir=cache)
+    pd.testing.assert_frame_equal(extract_cache.get_positions(site[2010], tr.copy(), cache_dir=cache), pos)
+    moved = tr.copy()
+    moved.loc[2, "x2"] += 1e-6
+    assert extract_cache.get_positions(site[2010], moved, cache_dir=cache) is None
+    assert extract_cache.get_positions(site[2010], tr.iloc[:-1], cache_dir=cache) is None
+
+def test_corrupt_entries_are_misses(cache, site):
+    extract_cache.put_coastline(site[2010], "x", None, cache_dir=cache)
+    key, _ = extract_cache.coastline_key(site[2010])
+    with open(extract_cache._entry_path("coastline", key, cache), "wb") as f:
+        f.write(b"truncated")
+    assert extract_cache.get_coastline(site[2010], cache_dir=cache) is None
+
+def test_prune_drops_missing_scenes_and_old_settings(cache, site, monkeypatch):
+    for tif in site.values():
+        extract_cache.put_coastline(tif, "x", None, cache_dir=cache)
+    extract_cache.put_coastline(site[2010], "y", None, thr=-0.3, cache_dir=cache)
+    os.remove(site[2011])
+    ndwi_dir = os.path.dirname(site[2010])
+    assert extract_cache.prune_cache([ndwi_dir], cache_dir=cache) == {"removed": 2, "kept": 1}
+    assert extract_cache.get_coastline(site[2010], cache_dir=cache) == ("x", None)
+
+    path = extract_cache._entry_path("coastline", extract_cache.coastline_key(site[2010])[0], cache)
+    os.utime(path, (0, 0))
+    assert extract_cache.prune_cache([ndwi_dir], max_age_days=1, cache_dir=cache) == {"removed": 1, "kept": 0}
+    assert extract_cache.cache_stats(cache) == {}
+
+def test_prune_keeps_every_registered_sites_scenes(cache, scenes, tmp_path):
+    here, there = scenes([2010], size=32, seed=4)[2010], scenes([2010], size=32, seed=5)[2010]
+    registry = tmp_path / "sites.json"
+    registry.write_text(json.dumps({"sites": [{"name": "there", "ndwi_dir": os.path.dirname(there),
+                                               "waves_csv": "waves.csv", "rain_csv": "rain.csv"}]}))
+    for tif in (here, there):
+        extract_cache.put_coastline(tif, "x", None, cache_dir=cache)
+    dirs = extract_cache.scene_dirs(os.path.dirname(here), registry=str(registry))
+    assert dirs == [os.path.dirname(here), os.path.dirname(there)]
+    assert extract_cache.prune_cache(dirs, cache_dir=cache) == {"removed": 0, "kept": 2}
+    assert extract_cache.prune_cache(dirs[:1], cache_dir=cache) == {"removed": 1, "kept": 1}
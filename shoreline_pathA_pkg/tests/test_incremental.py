@@ -0,0 +1,66 @@
+# The manifest-driven stores re-extract / recompute only new or changed years, and what they
+# return is exactly what build_labels / annual_features compute from scratch.
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import incremental
+import train_model as tm
+
+def test_labels_extract_only_new_or_changed_years(tmp_path, scenes, monkeypatch):
+    tifs = scenes(range(2010, 2015), size=64, shape="bay", seed=5)
+    other = scenes([2012], size=64, shape="bay", seed=6)[2012]
+    ndwi, art = tmp_path / "ndwi", tmp_path / "art"
+    ndwi.mkdir()
+    art.mkdir()
+    for y in range(2010, 2014):
+        shutil.copy(tifs[y], ndwi)
+
+    first, _, extracted = incremental.update_labels(str(ndwi), str(art), workers=1)
+    assert extracted == [2010, 2011, 2012, 2013]
+    again, _, extracted = incremental.update_labels(str(ndwi), str(art), workers=1)
+    assert extracted == []
+    pd.testing.assert_frame_equal(again, first, check_exact=True)
+
+    shutil.copy(tifs[2014], ndwi)
+    shutil.copy(other, ndwi / "Synthetic_2012_NDWI.tif")      # replaced scene, same name
+    labels, transects, extracted = incremental.update_labels(str(ndwi), str(art), workers=1)
+    assert extracted == [2012, 2014]
+    ref, ref_tr = tm.build_labels(str(ndwi), workers=1)
+    pd.testing.assert_frame_equal(transects, ref_tr, check_exact=True)
+    pd.testing.assert_frame_equal(labels, ref, check_exact=True)
+    assert not labels[labels["year"] == 2012]["position_m"].equals(first[first["year"] == 2012]["position_m"])
+
+    monkeypatch.setattr(incremental, "TRANSECT_SPACING_M", 5.0)   # new transects: everything again
+    _, transects, extracted = incremental.update_labels(str(ndwi), str(art), workers=1)
+    assert extracted == [2010, 2011, 2012, 2013, 2014]
+    assert len(transects) > len(ref_tr)
+
+def _hourly(years, seed=0):
+    t = pd.date_range(f"{years[0]}-01-01", f"{years[-1]}-12-31 23:00", freq="h")
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"valid_time": t, "swh": rng.gamma(2, 0.4, t.size), "mwp": rng.normal(6, 1, t.size),
+                         "tp": rng.gamma(0.3, 1e-3, t.size)})
+
+def test_drivers_recompute_only_changed_years(tmp_path):
+    hourly = _hourly([2010, 2013])
+    feats, todo = incremental.update_drivers(hourly, str(tmp_path))
+    assert todo == [2010, 2011, 2012, 2013]
+    # the stored year column comes back int64 (computed: int32); the values are what matters
+    pd.testing.assert_frame_equal(incremental.update_drivers(hourly, str(tmp_path))[0], feats, check_exact=True,
+                                  check_dtype=False)
+
+    changed = hourly.copy()
+    changed.loc[changed["valid_time"].dt.year == 2011, "swh"] *= 3   # raises every year's storm_index denominator
+    feats, todo = incremental.update_drivers(changed, str(tmp_path))
+    assert todo == [2011]
+    pd.testing.assert_frame_equal(feats, tm.annual_features(changed), check_exact=True, check_dtype=False)
+
+def test_driver_features_leave_the_store_alone(tmp_path):
+    incremental.update_drivers(_hourly([2010, 2012]), str(tmp_path))
+    stored = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+    changed = _hourly([2010, 2013], seed=1)
+    feats = incremental.driver_features(changed, str(tmp_path))
+    pd.testing.assert_frame_equal(feats, tm.annual_features(changed), check_exact=True, check_dtype=False)
+    assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == stored
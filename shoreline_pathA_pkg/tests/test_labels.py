@@ -0,0 +1,65 @@
+# Labels must not depend on how they are computed: the process pool, the batched intersection and
+# the vectorized transects give exactly what the original per-year / per-transect loops gave.
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString, MultiPoint
+
+import train_model as tm
+
+@pytest.fixture(scope="module")
+def site(scenes):
+    return scenes(range(2008, 2012), size=96, shape="jagged", noise=0.1, nodata_frac=0.1, seed=2)
+
+def _reference_positions(coast, transects):
+    """The original shoreline_position loop: one shapely intersection per transect."""
+    out = []
+    for _, r in transects.iterrows():
+        line = LineString([(r["x1"], r["y1"]), (r["x2"], r["y2"])])
+        inter = line.intersection(coast)
+        if inter.is_empty:
+            out.append(np.nan)
+        elif isinstance(inter, MultiPoint):
+            mid = line.interpolate(line.length / 2)
+            out.append(line.project(min(inter.geoms, key=lambda p: mid.distance(p))))
+        elif inter.geom_type == "Point":
+            out.append(line.project(inter))
+        else:
+            out.append(line.project(coast.interpolate(coast.length / 2)))
+    return np.array(out)
+
+def _reference_transects(coast, spacing, half_len):
+    """The original build_transects loop: interpolate and normalise station by station."""
+    rows = []
+    for i, d in enumerate(np.linspace(0, coast.length, max(50, int(coast.length // spacing)))):
+        pt = coast.interpolate(d)
+        p1, p2 = coast.interpolate(max(0, d - 1.0)), coast.interpolate(min(coast.length, d + 1.0))
+        nx, ny = -(p2.y - p1.y), p2.x - p1.x
+        norm = math.hypot(nx, ny) + 1e-9
+        nx, ny = nx / norm, ny / norm
+        rows.append({"transect_id": i, "x1": pt.x - nx * half_len, "y1": pt.y - ny * half_len,
+                     "x2": pt.x + nx * half_len, "y2": pt.y + ny * half_len})
+    return pd.DataFrame(rows)
+
+def test_parallel_labels_match_the_serial_loop(site):
+    labels, transects = tm.build_labels(os.path.dirname(site[2008]), workers=2)
+    ref = pd.concat([tm.shoreline_position(site[y], transects).assign(year=y) for y in sorted(site)],
+                    ignore_index=True)
+    pd.testing.assert_frame_equal(labels, ref, check_exact=True)
+
+def test_batched_intersection_matches_the_per_transect_loop(site):
+    transects = tm.build_transects(site[2008], spacing=20.0, half_len=300.0)
+    for tif in site.values():
+        coast = tm.to_3857(*tm.coastline_from_ndwi(tif))
+        ref = _reference_positions(coast, transects)
+        assert np.isfinite(ref).sum() > 0.3 * len(ref)
+        np.testing.assert_array_equal(tm.intersect_transects(coast, transects), ref)
+
+def test_vectorized_transects_match_the_station_loop(site):
+    coast = tm.to_3857(*tm.coastline_from_ndwi(site[2008]))
+    for spacing, half_len in ((20.0, 300.0), (7.5, 50.0)):
+        ref = _reference_transects(coast, spacing, half_len)
+        pd.testing.assert_frame_equal(tm.transects_along(coast, spacing, half_len, smooth=1), ref, check_exact=True)
@@ -0,0 +1,33 @@
+# Training rows taken from the position matrix must be the ones the original groupby over the
+# long label CSV produced, value for value.
+import numpy as np
+import pandas as pd
+
+import position_matrix
+import train_model as tm
+
+def _labels(seed=0, n_transects=40, years=(2000, 2001, 2002, 2004, 2005, 2006)):
+    """Long labels with missing intersections and a year without a scene (2003)."""
+    rng = np.random.default_rng(seed)
+    tid, yr = np.meshgrid(np.arange(n_transects), years, indexing="ij")
+    pos = rng.normal(300.0, 40.0, tid.size)
+    pos[rng.random(tid.size) < 0.2] = np.nan
+    return pd.DataFrame({"transect_id": tid.ravel(), "position_m": pos, "year": yr.ravel()}) \
+        .sort_values(["year", "transect_id"], ignore_index=True)
+
+def _reference_training(labels, feats, y0, y1):
+    """The original build_training: groupby diff over the long frame."""
+    s = labels[labels["year"].between(y0, y1)].sort_values(["transect_id", "year"])
+    s = s.assign(delta_pos_m=s.groupby("transect_id")["position_m"].diff()).dropna(subset=["delta_pos_m"])
+    return s.merge(feats, on="year", how="left").reset_index(drop=True)
+
+def test_training_rows_match_the_groupby(tmp_path):
+    labels = _labels()
+    feats = pd.DataFrame({"year": np.arange(2000, 2007), "storm_index": np.linspace(0, 1, 7)})
+    labels.to_csv(tmp_path / position_matrix.LABELS_CSV, index=False)
+    pm = position_matrix.load(str(tmp_path))                  # built from the CSV, then memory-mapped
+    assert isinstance(position_matrix.load(str(tmp_path)).P, np.memmap)
+    for y0, y1 in ((2000, 2006), (2001, 2005)):
+        ref = _reference_training(labels, feats, y0, y1)
+        pd.testing.assert_frame_equal(tm.build_training(pm, feats, y0, y1), ref, check_exact=True)
+        pd.testing.assert_frame_equal(tm.build_training(labels, feats, y0, y1), ref, check_exact=True)
@@ -0,0 +1,50 @@
+# The closed-form LOO-Year tuning must score every alpha as the original per-fold sklearn Ridge loop did.
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+import ridge_cv
+
+def _training_set(seed, n_years=12):
+    """Training rows on the model's scales (wave_power ~1e3-1e4), a different count per year."""
+    rng = np.random.default_rng(seed)
+    years = np.repeat(np.arange(2000, 2000 + n_years), rng.integers(20, 80, n_years))
+    rng.shuffle(years)
+    n = years.size
+    X = np.column_stack([rng.integers(0, 40, n), rng.lognormal(8.0, 0.6, n), rng.gamma(2.0, 8.0, n),
+                         rng.random(n)]).astype(np.float64)
+    y = X @ np.array([-0.4, -2e-4, -0.05, -3.0]) + rng.normal(0, 4.0, n) + (years - 2000) * 0.3
+    return X, y, years
+
+def _reference_mae(X, y, years, alphas):
+    """The original loop: one sklearn Ridge fit per (alpha, held-out year)."""
+    out = []
+    for a in alphas:
+        fold_mae = []
+        for yr in np.unique(years):
+            tr, te = years != yr, years == yr
+            mdl = Ridge(alpha=a).fit(X[tr], y[tr])
+            fold_mae.append(np.mean(np.abs(mdl.predict(X[te]) - y[te])))
+        out.append(float(np.mean(fold_mae)))
+    return np.array(out)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_loo_year_mae_matches_sklearn(seed):
+    X, y, years = _training_set(seed)
+    alphas = [0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 1e4]
+    ref = _reference_mae(X, y, years, alphas)
+    got = ridge_cv.loo_year_mae(X, y, years, alphas)
+    np.testing.assert_allclose(got, ref, rtol=1e-10)
+    assert np.argmin(got) == np.argmin(ref)
+
+def test_fold_coefficients_match_sklearn():
+    X, y, years = _training_set(3, n_years=5)
+    alphas = [0.3, 30.0]
+    st = ridge_cv.year_stats(X, y, years)
+    W, b = ridge_cv.fold_coefs(st, alphas)
+    shift_x, shift_y = X.mean(axis=0), y.mean()   # year_stats works on globally centred data
+    for k, yr in enumerate(st["years"]):
+        for j, a in enumerate(alphas):
+            mdl = Ridge(alpha=a).fit(X[years != yr], y[years != yr])
+            np.testing.assert_allclose(W[k, j], mdl.coef_, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(b[k, j] + shift_y - shift_x @ W[k, j], mdl.intercept_, rtol=1e-9)
@@ -0,0 +1,169 @@
+# serve_api against a small artifact set: the vectorized forecast gives the original loop's rows,
+# concurrent misses share one upstream call, and stale entries are served while they refresh.
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+FEATS = ["storm_days", "wave_power", "rain_3d_max", "storm_index"]
+
+def _write_artifacts(art, n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(0, 7, 50), rng.gamma(2, 20, 50), rng.gamma(2, 10, 50), rng.random(50)])
+    joblib.dump(Ridge(alpha=1.0).fit(X, X @ [-0.3, -0.01, -0.02, -1.0] + rng.normal(0, 0.5, 50)),
+                art / "model_ridge.pkl")
+    with open(art / "model_features.json", "w") as f:
+        json.dump({"features": FEATS, "train_years": [2000, 2019], "alpha": 1.0, "global_mean_delta": -1.25}, f)
+    tids = rng.permutation(n)   # unsorted on disk
+    x, y = 16_150_000.0 + 50.0 * tids, np.full(n, -4_590_000.0)
+    tr = pd.DataFrame({"transect_id": tids, "x1": x, "y1": y - 600, "x2": x, "y2": y + 600})
+    tr.to_csv(art / "transects.csv", index=False)
+    lat, lon = -38.14 + 1e-4 * tids, 145.12 + np.zeros(n)
+    tr.assign(mid_lat=lat, mid_lon=lon, lat1=lat - 0.005, lon1=lon, lat2=lat + 0.005, lon2=lon).to_csv(
+        art / "transects_enriched.csv", index=False)
+    typ = rng.normal(-1.0, 3.0, n)
+    typ[3] = np.nan          # a transect whose typical is NaN
+    pd.DataFrame({"transect_id": np.arange(n), "typical_annual_delta_m": typ}).drop(index=[5, 6]).to_csv(
+        art / "typical_annual_delta_by_transect.csv", index=False)   # and two without one
+
+@pytest.fixture(scope="module")
+def sa(tmp_path_factory):
+    art = tmp_path_factory.mktemp("art")
+    _write_artifacts(art)
+    prev = os.environ.get("ART_DIR")
+    os.environ["ART_DIR"] = str(art)
+    try:
+        yield importlib.reload(sys.modules["serve_api"]) if "serve_api" in sys.modules else importlib.import_module("serve_api")
+    finally:
+        if prev is None:
+            os.environ.pop("ART_DIR")
+        else:
+            os.environ["ART_DIR"] = prev
+
+def _owm(storm=True, t0=None):
+    """One Call response: 48 hourly and 8 daily records starting now."""
+    t0 = int(time.time()) if t0 is None else t0
+    wind = 14.0 if storm else 4.0
+    hourly = [{"dt": t0 + 3600 * h, "wind_speed": wind + 3 * np.sin(h / 5), "wind_gust": wind + 6,
+               **({"rain": {"1h": 0.4 * (h % 7)}} if storm else {})} for h in range(48)]
+    daily = [{"dt": t0 + 86400 * d, "wind_speed": wind + d % 3, "wind_gust": wind + 8,
+              **({"rain": 2.5 * d} if storm else {})} for d in range(8)]
+    return {"hourly": hourly, "daily": daily}
+
+def _reference_data(sa, owm):
+    """The original compute_forecast rows: per-transect loop, iterrows and pandas merges."""
+    proxy7 = sa.owm_to_proxy(owm)
+    delta_week_base = float(sa.MODEL.predict(sa.proxy_to_feature_row(proxy7)[sa.FEATS].values)[0])
+    weights = proxy7["storm_proxy"].to_numpy()
+    if np.sum(weights) <= 0:
+        weights = None
+    results = []
+    for tid in sorted(sa.TRANSECTS["transect_id"].astype(int).tolist()):
+        row = sa.TYPICAL.loc[sa.TYPICAL["transect_id"] == tid]
+        scale = 1.0
+        if not row.empty and abs(sa.GLOBAL_MEAN_DELTA) > 1e-9:
+            scale = float(np.clip(float(row["typical_annual_delta_m"].values[0]) / sa.GLOBAL_MEAN_DELTA,
+                                  -sa.SCALE_CLAMP, sa.SCALE_CLAMP))
+        delta_week = delta_week_base * scale
+        per_day = (np.repeat(delta_week / len(proxy7), len(proxy7)) if weights is None
+                   else delta_week * (weights / weights.sum()))
+        for i, r in proxy7.iterrows():
+            results.append({"transect_id": int(tid), "date": r["date"].isoformat(),
+                            "pred_daily_delta_m": sa.jfloat(per_day[i]), "wind_max_ms": sa.jfloat(r["wind_max"]),
+                            "gust_max_ms": sa.jfloat(r["gust_max"]), "rain_sum_mm": sa.jfloat(r["rain_sum"])})
+    pred = pd.DataFrame(results).merge(sa.TYPICAL, on="transect_id", how="left")
+    geo_cols = [c for c in sa.GEO_KEEP if c in sa.TRANSECTS.columns]
+    pred = pred.merge(sa.TRANSECTS[geo_cols], on="transect_id", how="left").replace({np.nan: None})
+    for c in ["mid_lat", "mid_lon", "lat1", "lon1", "lat2", "lon2", "typical_annual_delta_m"]:
+        pred[c] = pred[c].apply(sa.jfloat)
+    # the loop left NaN in float columns (which the JSON response then rejected); the rows are otherwise the same
+    return [{k: None if isinstance(v, float) and np.isnan(v) else v for k, v in r.items()}
+            for r in pred.to_dict(orient="records")]
+
+@pytest.mark.parametrize("storm", [True, False])
+def test_forecast_matches_the_original_loop(sa, storm):
+    owm = _owm(storm)
+    data = sa.assemble_forecast(owm)["data"]
+    ref = _reference_data(sa, owm)
+    assert data == ref
+    assert [list(r) for r in data] == [list(r) for r in ref]    # same key order
+    assert len(data) == len(sa.TRANSECTS) * 7
+    json.dumps(data, allow_nan=False)
+
+class _Upstream:
+    """Stands in for fetch_owm: counts calls, answers after `delay`, or raises `fail`."""
+    def __init__(self, delay=0.05):
+        self.calls, self.delay, self.fail, self.storm = 0, delay, None, True
+
+    async def __call__(self, lat, lon, api_key):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail is not None:
+            raise self.fail
+        return _owm(self.storm)
+
+@pytest.fixture
+def upstream(sa, monkeypatch):
+    up = _Upstream()
+    monkeypatch.setattr(sa, "fetch_owm", up)
+    monkeypatch.setattr(sa, "_api_key", lambda: "test-key")
+    return up
+
+def test_concurrent_misses_share_one_upstream_call(sa, upstream):
+    async def burst():
+        return await asyncio.gather(*[sa.compute_forecast(-38.101, 145.101) for _ in range(25)])
+    outs = asyncio.run(burst())
+    assert upstream.calls == 1
+    assert all(o is outs[0] for o in outs)
+
+    upstream.fail = sa.HTTPException(502, "OWM 500")
+    async def failing():
+        return await asyncio.gather(*[sa.compute_forecast(-38.102, 145.102) for _ in range(10)],
+                                    return_exceptions=True)
+    errs = asyncio.run(failing())
+    assert upstream.calls == 2 and all(isinstance(e, sa.HTTPException) for e in errs)
+    upstream.fail = None
+    asyncio.run(sa.compute_forecast(-38.102, 145.102))   # a failure is not cached: the next call retries
+    assert upstream.calls == 3
+
+def test_stale_forecasts_are_served_while_refreshing(sa, upstream, monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(sa, "_now", lambda: clock[0])
+    lat, lon = -38.103, 145.103
+
+    async def get_and_settle():
+        out = await sa.compute_forecast(lat, lon)
+        while sa._loop_state().inflight:        # let a background refresh finish
+            await asyncio.sleep(0.01)
+        return out
+
+    first = asyncio.run(get_and_settle())
+    assert upstream.calls == 1
+    clock[0] += sa.OWM_CACHE_TTL_SEC + 1      # stale, not yet hard-expired
+    upstream.storm = False
+    stale = sa._CACHE_STATS["stale_served"]
+    assert asyncio.run(get_and_settle()) is first    # answered from the stale entry ...
+    assert sa._CACHE_STATS["stale_served"] == stale + 1
+    assert upstream.calls == 2                       # ... while one refresh ran behind it
+    fresh = asyncio.run(get_and_settle())
+    assert fresh is not first and fresh["data"] != first["data"] and upstream.calls == 2
+
+    clock[0] += sa.OWM_CACHE_TTL_SEC + 1
+    upstream.fail = sa.HTTPException(502, "OWM 500")
+    errors = sa._CACHE_STATS["background_errors"]
+    assert asyncio.run(get_and_settle()) is fresh    # a failed refresh keeps the stale entry
+    assert sa._CACHE_STATS["background_errors"] == errors + 1
+    assert asyncio.run(get_and_settle()) is fresh
+
+    clock[0] += sa.OWM_CACHE_HARD_TTL_SEC          # past the hard TTL: a miss that waits for upstream
+    upstream.fail = None
+    calls = upstream.calls
+    assert asyncio.run(get_and_settle()) is not fresh and upstream.calls == calls + 1
@@ -0,0 +1,75 @@
+# The histogram engine must take the decisions the original raster_to_water took with np.nanpercentile
+# and full-mask fractions: same threshold, same orientation, same water mask, for every rule.
+import numpy as np
+import pytest
+
+import train_model as tm
+from config import NDWI_AUTO_RESCALE, NDWI_WATER_HIGH
+
+def _reference_mask(arr, thr):
+    """The original raster_to_water mask (before polygonizing)."""
+    arr = arr.astype(np.float32)
+    arr[~np.isfinite(arr)] = np.nan
+    v = arr[np.isfinite(arr)]
+    vmin, vmax = float(np.nanmin(v)), float(np.nanmax(v))
+    if NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0:
+        arr = (arr - vmin) / (vmax - vmin + 1e-9)
+        v = arr[np.isfinite(arr)]
+    thr_val = float(np.nanpercentile(v, 60.0)) if thr == "auto" else float(thr)
+    water = (arr >= thr_val).astype(np.uint8) if NDWI_WATER_HIGH else (arr <= thr_val).astype(np.uint8)
+    valid = np.isfinite(arr)
+    frac = float(water[valid].mean())
+    if frac > 0.98 or frac < 0.02:
+        alt = (arr <= thr_val).astype(np.uint8) if NDWI_WATER_HIGH else (arr >= thr_val).astype(np.uint8)
+        alt_frac = float(alt[valid].mean())
+        if 0.02 < alt_frac < 0.98:
+            water = alt
+        else:
+            mid = 0.5 * (float(np.nanpercentile(v, 35.0)) + float(np.nanpercentile(v, 65.0)))
+            cand1 = (arr >= mid).astype(np.uint8); f1 = float(cand1[valid].mean())
+            cand2 = (arr <= mid).astype(np.uint8); f2 = float(cand2[valid].mean())
+            if 0.05 < f1 < 0.95: water = cand1
+            elif 0.05 < f2 < 0.95: water = cand2
+            else: water = alt if abs(alt_frac-0.5) < abs(frac-0.5) else water
+    return water
+
+def _scene(kind, rng, shape=(120, 150)):
+    n = shape[0] * shape[1]
+    if kind == "bimodal":
+        v = np.where(rng.random(n) < 0.4, rng.normal(0.4, 0.1, n), rng.normal(-0.3, 0.1, n))
+    elif kind == "ties":        # p60 on a plateau with 99% of the scene at or above it
+        u = rng.random(n)
+        v = np.where(u < 0.01, -0.5, np.where(u < 0.76, 0.25, rng.uniform(0.3, 1.0, n)))
+    elif kind == "plateau":     # p35..p65 on one value with 98% of the scene at or above it
+        u = rng.random(n)
+        v = np.where(u < 0.02, -0.5, np.where(u < 0.62, 0.1, rng.uniform(0.2, 1.0, n)))
+    elif kind == "constant":    # a degenerate scene nothing separates
+        v = np.where(rng.random(n) < 0.995, 0.0, 1.0)
+    elif kind == "byte":        # 0..255 scaled NDWI, rescaled first
+        v = np.round(rng.uniform(0, 255, n))
+    else:                       # float32 values sitting right at float64 thresholds
+        v = np.round(rng.normal(0.0, 0.3, n), 2)
+    arr = v.reshape(shape).astype(np.float32)
+    arr[rng.random(shape) < 0.1] = np.nan
+    return arr
+
+KINDS = ["bimodal", "ties", "plateau", "constant", "byte", "rounded"]
+THRESHOLDS = ["auto", 0.1, 5.0, -5.0]
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("thr", THRESHOLDS)
+def test_decisions_match_the_percentile_rule(kind, thr):
+    raw = _scene(kind, np.random.default_rng(len(kind)))
+    arr, v = tm.prepare_ndwi(raw)
+    thr_val, water_high, audit = tm.decide_threshold(v, thr)
+    assert np.array_equal(tm.water_mask(arr, thr_val, water_high), _reference_mask(raw, thr)), audit["rule"]
+    if thr == "auto":
+        assert audit["thr_initial"] == float(np.percentile(v, 60.0))
+
+def test_every_rule_is_covered():
+    rules = set()
+    for kind in KINDS:
+        for thr in THRESHOLDS:
+            raw = _scene(kind, np.random.default_rng(len(kind)))
+            rules.add(tm.decide_threshold(tm.prepare_ndwi(raw)[1], thr)[2]["rule"])
+    assert rules == {"initial", "flipped", "mid_high", "mid_low", "fallback_initial", "fallback_flipped"}
@@ -0,0 +1,45 @@
+# With QUALITY_PRUNE_EXTRACTION, dead transects are skipped for new years except in census
+# years, and the quality index only counts fully extracted years, so they can become active again.
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import incremental
+import transect_quality
+
+def test_census_years():
+    assert incremental._census_years([2015, 2016, 2019, 2020, 2024], [2010, 2014], every=5) == [2019, 2024]
+    assert incremental._census_years([2001, 2002], [], every=5) == [2001]
+
+def test_pruned_transects_recover(tmp_path, monkeypatch, scenes):
+    tifs = scenes(range(2011, 2023), size=128, noise=0.02, shape="straight", seed=1)
+    ndwi, art = tmp_path / "ndwi", tmp_path / "art"
+    ndwi.mkdir()
+    art.mkdir()
+    for y in range(2011, 2015):
+        shutil.copy(tifs[y], ndwi)
+
+    incremental.update_labels(str(ndwi), str(art), workers=1)
+    index = pd.read_csv(art / transect_quality.INDEX_CSV)
+    dead = index.loc[index["n_valid"] == 4, "transect_id"].to_numpy()[:5]
+    assert dead.size == 5
+    index.loc[index["transect_id"].isin(dead), "active"] = False
+    index.to_csv(art / transect_quality.INDEX_CSV, index=False)
+
+    for y in range(2015, 2023):
+        shutil.copy(tifs[y], ndwi)
+    monkeypatch.setattr(incremental, "QUALITY_PRUNE_EXTRACTION", True)
+    labels, _, extracted = incremental.update_labels(str(ndwi), str(art), workers=1)
+
+    assert extracted == list(range(2015, 2023))
+    with open(art / incremental.MANIFEST) as f:
+        pruned = json.load(f)["labels"]["pruned_years"]
+    assert pruned == [2015, 2016, 2017, 2018, 2020, 2021, 2022]   # 2019 is the census year
+    pos = labels[labels["transect_id"].isin(dead)].pivot(index="transect_id", columns="year", values="position_m")
+    assert pos[pruned].isna().all().all()
+    assert np.isfinite(pos[2019]).all()
+    index = pd.read_csv(art / transect_quality.INDEX_CSV).set_index("transect_id")
+    assert (index["n_years"] == 5).all()
+    assert index.loc[dead, "active"].all()
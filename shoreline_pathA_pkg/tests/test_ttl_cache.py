@@ -0,0 +1,68 @@
+# The API stores evict least-recently-used entries beyond their entry / byte bounds and age entries
+# from their fetch time: fresh, then stale (still returned), then gone.
+import pytest
+
+from ttl_cache import TTLCache, SqliteTTLCache, json_size
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    clock = [1_000.0]
+    def make(max_entries=0, max_bytes=0, name="t"):
+        if request.param == "memory":
+            c = TTLCache(name, 60, 120, max_entries, max_bytes, clock=lambda: clock[0])
+        else:
+            c = SqliteTTLCache(str(tmp_path / "c.sqlite"), name, 60, 120, max_entries, max_bytes,
+                               clock=lambda: clock[0], local_entries=2)
+        return c, clock
+    return make
+
+def _tick(clock, dt=2.0):   # the SQLite store keeps LRU order to the second
+    clock[0] += dt
+
+def test_least_recently_used_entry_is_evicted(make):
+    c, clock = make(max_entries=3)
+    for k in "abc":
+        c.put(k, {"v": k})
+        _tick(clock)
+    assert c.get("a")["data"] == {"v": "a"}     # a is now the most recent; b the least
+    _tick(clock)
+    c.put("d", {"v": "d"})
+    assert c.get("b") is None
+    assert [c.get(k)["data"]["v"] for k in "acd"] == ["a", "c", "d"]
+    assert len(c) == 3 and c.stats()["evictions"] == 1
+
+def test_peek_does_not_refresh_recency(make):
+    c, clock = make(max_entries=2)
+    c.put("a", 1); _tick(clock)
+    c.put("b", 2); _tick(clock)
+    assert c.peek("a", with_data=True)["data"] == 1
+    c.put("c", 3)
+    assert c.get("a") is None and c.get("b")["data"] == 2
+
+def test_byte_bound_evicts_oldest_but_keeps_the_newest(make):
+    blob = {"x": "y" * 100}
+    c, clock = make(max_bytes=3 * json_size(blob) + 10)
+    for k in "abcd":
+        c.put(k, blob)
+        _tick(clock)
+    assert c.get("a") is None and all(c.get(k) is not None for k in "bcd")
+    c.put("big", {"x": "y" * 10_000})            # alone over the bound: stays, everything else goes
+    assert len(c) == 1 and c.get("big") is not None
+
+def test_soft_and_hard_ttl(make):
+    c, clock = make()
+    e = c.put("k", 1, fetched=clock[0] - 30)     # aged from its fetch time, not the put
+    assert e["fresh_until"] == clock[0] + 30 and e["expires"] == clock[0] + 90
+    _tick(clock, 45)
+    stale = c.get("k")
+    assert stale is not None and stale["fresh_until"] <= clock[0]
+    _tick(clock, 50)
+    assert c.get("k") is None and len(c) == 0
+
+def test_sweep_drops_hard_expired_entries(make):
+    c, clock = make()
+    c.put("old", 1)
+    _tick(clock, 100)
+    c.put("new", 2)
+    _tick(clock, 30)
+    assert c.sweep() == 1 and c.get("old") is None and c.get("new")["data"] == 2
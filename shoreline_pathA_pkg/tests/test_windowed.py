@@ -0,0 +1,51 @@
+# Windowed (RASTER_MEMORY_MB) extraction must give the same coastline, in the same direction,
+# and the same transects as the whole-array path.
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from shapely.ops import linemerge, unary_union
+
+import train_model as tm
+import windowed
+
+BUDGET_MB = 0.1   # ~30-row strips on a 256 px scene
+
+@pytest.fixture(scope="module", params=[("bay", 0.05, 0.1), ("jagged", 0.05, 0.1), ("straight", 0.0, 0.0)])
+def scene(request, scenes):
+    shape, noise, nodata_frac = request.param    # a clean straight shore is one water polygon
+    return scenes([2000], size=256, noise=noise, nodata_frac=nodata_frac, shape=shape, seed=3)[2000]
+
+def _coastline(polys):
+    """Longest merged boundary, as _extract_coastline takes it."""
+    lines = unary_union([p.boundary for p in getattr(polys, "geoms", [polys])])
+    merged = lines if lines.geom_type == "LineString" else linemerge(lines)
+    return max(getattr(merged, "geoms", [merged]), key=lambda g: g.length)
+
+def _windowed_polys(tif):
+    with rasterio.open(tif) as src:
+        assert windowed.needs_windowing(src, BUDGET_MB)
+        return windowed.water_polygons(src, budget_mb=BUDGET_MB), src.crs
+
+def test_water_polygons_match_whole_array(scene):
+    whole, _ = tm.raster_to_water(scene)
+    win, _ = _windowed_polys(scene)
+    assert win.equals(whole)
+    ccw = lambda polys: {p.exterior.is_ccw for p in getattr(polys, "geoms", [polys])}
+    assert ccw(win) == ccw(whole)
+
+def test_coastline_and_transects_keep_direction(scene):
+    whole, crs = tm.raster_to_water(scene)
+    win, _ = _windowed_polys(scene)
+    a, b = _coastline(whole), _coastline(win)
+    np.testing.assert_array_equal(shapely.get_coordinates(a), shapely.get_coordinates(b))
+    ta = tm.transects_along(tm.to_3857(a, crs))
+    tb = tm.transects_along(tm.to_3857(b, crs))
+    np.testing.assert_allclose(tb[["x1", "y1", "x2", "y2"]].values, ta[["x1", "y1", "x2", "y2"]].values)
+
+def test_contour_line_matches_whole_array(scene):
+    whole, _ = tm.contour_coastline(scene)
+    with rasterio.open(scene) as src:
+        win = windowed.contour_line(src, budget_mb=BUDGET_MB)
+    assert not whole.is_empty
+    np.testing.assert_allclose(shapely.get_coordinates(win), shapely.get_coordinates(whole))
@@ -0,0 +1,96 @@
+# thresholds.py — NDWI water threshold engine (one histogram per scene)
+#
+# The rules are the ones raster_to_water has always used:
+#   - thr == "auto": 60th percentile of valid NDWI, else the fixed value
+#   - water = NDWI >= thr (NDWI_WATER_HIGH) or <= thr
+#   - all-water / no-water (>98% or <2%): flip orientation, else midpoint of the
+#     35th/65th percentiles in whichever orientation gives 5..95% water
+# but every percentile and water-fraction question is answered from one histogram
+# of the scene (exact values: only the bins a query lands in are sorted), and the
+# caller materializes just the final mask.
+import numpy as np
+
+from config import NDWI_THRESHOLD, NDWI_WATER_HIGH
+
+HIST_BINS = 4096
+
+def percentile_ranks(n, q):
+    """Order statistics np.percentile(..., method="linear") interpolates for q: (k, k_next, weight of k_next)."""
+    vi = (n - 1) * (q / 100.0)
+    k = int(np.floor(vi))
+    return k, min(k + 1, n - 1), vi - k
+
+def lerp_percentile(kth, n, q):
+    """np.percentile(..., method="linear") from an order-statistic accessor kth(k) -> value."""
+    k, k_next, g = percentile_ranks(n, q)
+    a, b = kth(k), kth(k_next)
+    d = b - a
+    return float(b - d * (1 - g) if g >= 0.5 else a + d * g)
+
+def hist_binner(lo, hi, bins=HIST_BINS):
+    """bin_of(x) -> bin index for a fixed-width histogram over [lo, hi], clipped at both ends."""
+    # monotonic in x, so bins order the values; the same function bins the counts and every later query
+    scale = bins / (hi - lo) if hi > lo else 0.0
+    dtype = np.min_scalar_type(bins - 1)
+    return lambda x: np.clip(np.floor((x - lo) * scale), 0, bins - 1).astype(dtype)
+
+class NDWIHistogram:
+    """Fixed-width histogram over the valid values of one scene, with exact rank/count queries."""
+
+    def __init__(self, v, bins=HIST_BINS):
+        self.v = v
+        self.n = int(v.size)
+        self.bins = bins
+        self._bin = hist_binner(float(v.min()), float(v.max()), bins)
+        self.idx = self._bin(v)
+        self.cum = np.concatenate([[0], np.cumsum(np.bincount(self.idx, minlength=bins))])
+        self._sorted = {}
+
+    def _values(self, b):
+        vals = self._sorted.get(b)
+        if vals is None:
+            vals = self._sorted[b] = np.sort(self.v[self.idx == b])
+        return vals
+
+    def kth(self, k):
+        b = int(np.searchsorted(self.cum, k, side="right") - 1)
+        return self._values(b)[k - self.cum[b]]
+
+    def percentile(self, q):
+        return lerp_percentile(self.kth, self.n, q)
+
+    def fraction(self, t, water_high):
+        """Fraction of valid values with v >= t (water_high) or v <= t."""
+        t = np.float32(t)   # compare as the float32 mask does, not in float64
+        b = int(self._bin(t))
+        vals = self._values(b)
+        if water_high:
+            hits = (self.n - self.cum[b + 1]) + (vals.size - np.searchsorted(vals, t, side="left"))
+        else:
+            hits = self.cum[b] + np.searchsorted(vals, t, side="right")
+        return float(hits / self.n)
+
+def decide(percentile, fraction, thr=NDWI_THRESHOLD):
+    """
+    Apply the threshold rules given percentile(q) and fraction(t, water_high) callables.
+    Returns (thr_val, water_high, audit dict).
+    """
+    thr_val = percentile(60.0) if thr == "auto" else float(thr)
+    audit = {"thr": str(thr), "thr_initial": thr_val}
+    frac = fraction(thr_val, NDWI_WATER_HIGH)
+    audit["frac_initial"] = frac
+    if not (frac > 0.98 or frac < 0.02):
+        return thr_val, NDWI_WATER_HIGH, {**audit, "rule": "initial"}
+
+    alt_frac = fraction(thr_val, not NDWI_WATER_HIGH)
+    audit["frac_flipped"] = alt_frac
+    if 0.02 < alt_frac < 0.98:
+        return thr_val, not NDWI_WATER_HIGH, {**audit, "rule": "flipped"}
+    mid = 0.5 * (percentile(35.0) + percentile(65.0))
+    f1, f2 = fraction(mid, True), fraction(mid, False)
+    audit.update(thr_mid=mid, frac_mid_high=f1, frac_mid_low=f2)
+    if 0.05 < f1 < 0.95: return mid, True, {**audit, "rule": "mid_high"}
+    if 0.05 < f2 < 0.95: return mid, False, {**audit, "rule": "mid_low"}
+    if abs(alt_frac-0.5) < abs(frac-0.5):
+        return thr_val, not NDWI_WATER_HIGH, {**audit, "rule": "fallback_flipped"}
+    return thr_val, NDWI_WATER_HIGH, {**audit, "rule": "fallback_initial"}
@@ -1,20 +1,37 @@
-import os, re, json, math
+import os, re, sys, json, math
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import rasterio
 from rasterio.features import shapes
+from rasterio.enums import Resampling
+import rasterio.windows
+from affine import Affine
 from shapely.geometry import shape, LineString, Point, Polygon, MultiPoint
-from shapely.ops import unary_union, linemerge, transform as shp_transform
+from shapely.ops import unary_union, linemerge
 from pyproj import Transformer
 from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_absolute_error
 import joblib
-
+import shapely
+
+import datacube
+import era5_cache
+import extract_cache
+import profiling
+import windowed
+from contours import iso_segments, largest_component, touching_cells, longest_line, nan_as_land
+from thresholds import NDWIHistogram, decide
+from ridge_cv import loo_year_mae
+from position_matrix import PositionMatrix
 from config import (
     NDWI_DIR, WAVES_CSV, RAIN_CSV,
     TRAIN_YEAR_START, TRAIN_YEAR_END, NDWI_THRESHOLD,
-    NDWI_AUTO_RESCALE, NDWI_WATER_HIGH,
-    TRANSECT_SPACING_M, TRANSECT_LENGTH_M, RIDGE_ALPHA
+    NDWI_AUTO_RESCALE,
+    TRANSECT_SPACING_M, TRANSECT_LENGTH_M, RIDGE_ALPHA, RIDGE_ALPHAS, EXTRACT_WORKERS,
+    EXTRACT_MODE, PROFILE_STEP_M, COASTLINE_BACKEND, INTERSECT_NATIVE_CRS,
+    TRANSECT_NORMAL_SMOOTH, INCREMENTAL_ARTIFACTS, PROFILE_STAGES, PROFILE_CPROFILE,
+    COARSE_TO_FINE, COARSE_FACTOR, COARSE_ROI_BUFFER_M, COARSE_ROI_SOURCE, COARSE_MAX_WINDOW_FRAC, COARSE_MIN_OVERLAP
 )
 
 ART_DIR = "./artifacts"
@@ -29,61 +46,161 @@ def list_year_tifs(ndwi_dir):
                 out[int(m.group(1))] = os.path.join(ndwi_dir, f)
     return dict(sorted(out.items()))
 
-def raster_to_water(ndwi_path, thr=NDWI_THRESHOLD):
+def read_ndwi(ndwi_path):
     """
-    Binary water mask from NDWI.
-    - auto-rescales if dynamic range >> 1 (e.g., 0..255)
-    - adaptive threshold when thr == "auto" (60th percentile)
-    - robustness for all-water / no-water masks
+    Band 1 as stored + (crs, transform): from the NDWI cube (NDWI_CUBE_DIR, datacube.py) when it holds
+    this scene unchanged, else decoded from the GeoTIFF. None when the scene needs windowed processing.
     """
+    hit = datacube.read_scene(ndwi_path)
+    if hit is not None and not windowed.exceeds_budget(*hit[0].shape):
+        return hit
     with rasterio.open(ndwi_path) as src:
-        arr = src.read(1).astype(np.float32)
-        crs = src.crs
-        arr[~np.isfinite(arr)] = np.nan
+        if windowed.needs_windowing(src):
+            return None
+        return src.read(1), src.crs, src.transform
+
+def prepare_ndwi(arr):
+    """Float32 NDWI with non-finite -> NaN, auto-rescaled to 0..1 if the range looks like 0..255 etc.
+    Returns (arr, valid values); valid is empty when the scene has no data."""
+    arr = arr.astype(np.float32)
+    arr[~np.isfinite(arr)] = np.nan
+    v = arr[np.isfinite(arr)]
+    if v.size == 0:
+        return arr, v
+    vmin, vmax = float(np.nanmin(v)), float(np.nanmax(v))
+    if NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0:
+        arr = (arr - vmin) / (vmax - vmin + 1e-9)
         v = arr[np.isfinite(arr)]
-        if v.size == 0:
-            return None, crs
+    return arr, v
 
-        vmin, vmax = float(np.nanmin(v)), float(np.nanmax(v))
-        if NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0:
-            arr = (arr - vmin) / (vmax - vmin + 1e-9)
-            v = arr[np.isfinite(arr)]
+def water_rule(arr, v, thr=NDWI_THRESHOLD):
+    """
+    Threshold + orientation for the water mask: water = arr >= thr_val if water_high else arr <= thr_val.
+    - adaptive threshold when thr == "auto" (60th percentile)
+    - robustness for all-water / no-water masks (flip, then 35/65th percentile midpoint)
+    All questions are answered from one histogram of the valid values (see thresholds.py).
+    """
+    thr_val, water_high, _ = decide_threshold(v, thr)
+    return thr_val, water_high
+
+def decide_threshold(v, thr=NDWI_THRESHOLD):
+    hist = NDWIHistogram(v)
+    return decide(hist.percentile, hist.fraction, thr)
+
+def threshold_decision(ndwi_path, thr=NDWI_THRESHOLD):
+    """Audit record of the threshold chosen for one scene (cached alongside extraction results)."""
+    hit = extract_cache.get_threshold(ndwi_path, thr)
+    if hit is not None:
+        return hit
+    scene = read_ndwi(ndwi_path)
+    if scene is None:
+        with rasterio.open(ndwi_path) as src:
+            nd = windowed.WindowedNDWI(src)
+            n, rescaled, vmin, vmax = nd.n, nd.rescale, nd.vmin, nd.vmax
+            res = nd.decide(thr) if n else None
+    else:
+        raw = np.asarray(scene[0], dtype=np.float32)
+        finite = raw[np.isfinite(raw)]
+        vmin, vmax = (float(finite.min()), float(finite.max())) if finite.size else (np.inf, -np.inf)
+        rescaled = finite.size > 0 and NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0
+        _, v = prepare_ndwi(raw)
+        n = int(v.size)
+        res = decide_threshold(v, thr) if n else None
+    rec = {"n_valid": int(n), "rescaled": bool(rescaled)}
+    if n:
+        rec.update(vmin=vmin, vmax=vmax)
+    if res is not None:
+        thr_val, water_high, audit = res
+        rec.update(audit, thr_val=thr_val, water_high=bool(water_high))
+    else:
+        rec.update(thr=str(thr), rule="no_data")
+    extract_cache.put_threshold(ndwi_path, rec, thr)
+    return rec
 
-        if thr == "auto":
-            thr_val = float(np.nanpercentile(v, 60.0))
-        else:
-            thr_val = float(thr)
+def water_mask(arr, thr_val, water_high):
+    return (arr >= thr_val).astype(np.uint8) if water_high else (arr <= thr_val).astype(np.uint8)
 
-        water = (arr >= thr_val).astype(np.uint8) if NDWI_WATER_HIGH else (arr <= thr_val).astype(np.uint8)
-        valid = np.isfinite(arr)
-        if valid.sum() == 0:
+def raster_to_water(ndwi_path, thr=NDWI_THRESHOLD):
+    """
+    Binary water mask from NDWI, polygonized and unioned.
+    - auto-rescales if dynamic range >> 1 (e.g., 0..255)
+    - adaptive threshold when thr == "auto" (see water_rule)
+    - scenes larger than RASTER_MEMORY_MB are processed in windows (see windowed.py)
+    """
+    with profiling.stage("raster_to_water", ndwi_path):
+        scene = read_ndwi(ndwi_path)
+        if scene is None:
+            with rasterio.open(ndwi_path) as src:
+                return windowed.water_polygons(src, thr), src.crs
+        raw, crs, transform = scene
+        arr, v = prepare_ndwi(raw)
+        if v.size == 0:
             return None, crs
-        frac = float(water[valid].mean())
-
-        if frac > 0.98 or frac < 0.02:
-            alt = (arr <= thr_val).astype(np.uint8) if NDWI_WATER_HIGH else (arr >= thr_val).astype(np.uint8)
-            alt_frac = float(alt[valid].mean())
-            if 0.02 < alt_frac < 0.98:
-                water = alt
-            else:
-                lo = float(np.nanpercentile(v, 35.0))
-                hi = float(np.nanpercentile(v, 65.0))
-                mid = 0.5 * (lo + hi)
-                cand1 = (arr >= mid).astype(np.uint8); f1 = float(cand1[valid].mean())
-                cand2 = (arr <= mid).astype(np.uint8); f2 = float(cand2[valid].mean())
-                if 0.05 < f1 < 0.95: water = cand1
-                elif 0.05 < f2 < 0.95: water = cand2
-                else: water = alt if abs(alt_frac-0.5) < abs(frac-0.5) else water
+        water = water_mask(arr, *water_rule(arr, v, thr))
 
         geoms = []
-        for shp, val in shapes(water, transform=src.transform):
+        for shp, val in shapes(water, transform=transform):
             if int(val) == 1:
                 geoms.append(shape(shp))
-    if not geoms:
-        return None, crs
-    return unary_union(geoms), crs
+        if not geoms:
+            return None, crs
+        return unary_union(geoms), crs
 
 def coastline_from_ndwi(ndwi_path, thr=NDWI_THRESHOLD):
+    """Longest NDWI water boundary as (LineString, crs); served from the extraction cache when possible."""
+    params = _coastline_params()
+    with profiling.stage("coastline_from_ndwi", ndwi_path) as st:
+        hit = extract_cache.get_coastline(ndwi_path, thr, **params)
+        if hit is not None:
+            st["cached"] = True
+            return hit
+        res = coarse_to_fine_coastline(ndwi_path, thr) if COARSE_TO_FINE else None
+        if res is not None:
+            coast, crs = res
+        elif COASTLINE_BACKEND == "contour":
+            coast, crs = contour_coastline(ndwi_path, thr)
+        else:
+            coast, crs = _extract_coastline(ndwi_path, thr)
+        extract_cache.put_coastline(ndwi_path, coast, crs, thr, **params)
+        return coast, crs
+
+def _coastline_params():
+    params = {"backend": COASTLINE_BACKEND}
+    if COARSE_TO_FINE:
+        params.update(coarse=int(COARSE_FACTOR), roi_m=float(COARSE_ROI_BUFFER_M), roi=COARSE_ROI_SOURCE,
+                      overlap=float(COARSE_MIN_OVERLAP))
+    return params
+
+def contour_coastline(ndwi_path, thr=NDWI_THRESHOLD):
+    """
+    Sub-pixel coastline: marching-squares iso-line of NDWI at the water_rule threshold around the
+    largest connected water body (see shore_line). No polygonizing: the mask is only labelled.
+    """
+    scene = read_ndwi(ndwi_path)
+    if scene is None:
+        with rasterio.open(ndwi_path) as src:
+            return windowed.contour_line(src, thr), src.crs
+    raw, crs, transform = scene
+    arr, v = prepare_ndwi(raw)
+    if v.size == 0:
+        return LineString(), crs
+    return shore_line(arr, *water_rule(arr, v, thr), transform), crs
+
+def shore_line(arr, thr_val, water_high, transform):
+    """
+    Longest iso-line bounding the largest 8-connected water component, water on its right (the
+    polygon backend's clockwise shells run the same way). NaN counts as land, as in water_mask,
+    so the line follows cloud edges like the pixel-edge boundary; lakes and specks off that
+    component are not traced at all.
+    """
+    sea = largest_component(water_mask(arr, thr_val, water_high).view(bool))
+    if not sea.any():
+        return LineString()
+    segs = iso_segments(nan_as_land(arr, thr_val, water_high), thr_val, cells=touching_cells(sea))
+    line = longest_line(segs, transform)
+    return line if water_high or line.is_empty else line.reverse()
+
+def _extract_coastline(ndwi_path, thr=NDWI_THRESHOLD):
     polys, crs = raster_to_water(ndwi_path, thr)
     if polys is None or polys.is_empty:
         return LineString(), crs
@@ -96,92 +213,554 @@ def coastline_from_ndwi(ndwi_path, thr=NDWI_THRESHOLD):
         except Exception:
             lines = polys.boundary
 
-    if isinstance(lines, LineString):
-        return lines, crs
+    return _longest_line(lines), crs
 
+def _longest_line(lines):
+    if isinstance(lines, LineString):
+        return lines
     try:
         merged = linemerge(lines)
         if isinstance(merged, LineString):
-            return merged, crs
-        longest = max(list(merged.geoms), key=lambda g: g.length)
-        return longest, crs
+            return merged
+        return max(list(merged.geoms), key=lambda g: g.length)
     except Exception:
         geoms = list(getattr(lines, "geoms", []))
         if not geoms:
-            return LineString(), crs
-        longest = max(geoms, key=lambda g: g.length)
-        return longest, crs
+            return LineString()
+        return max(geoms, key=lambda g: g.length)
+
+# ------------------------------
+# Coarse-to-fine coastline (COARSE_TO_FINE)
+# ------------------------------
+def coarse_to_fine_coastline(ndwi_path, thr=NDWI_THRESHOLD, factor=COARSE_FACTOR, buffer_m=COARSE_ROI_BUFFER_M):
+    """
+    Two-level coastline: threshold and shore located on a decimated overview (or the shore taken
+    from the previous year's cached coastline), then traced at full resolution only in the window
+    around it. The full-resolution scene is never read.
+
+    This is the located shore, not the full-scene line: the boundary of the largest water body in
+    the window without the window frame (the contour backend's shore_line, or its pixel edges), at
+    the overview's threshold. The full-scene polygon rule keeps the longest boundary of all water,
+    which on clean scenes is mostly the scene frame, so the two differ; _coastline_params keeps
+    them apart in the cache. Returns None (caller falls back to full extraction) when the overview
+    has no water, the window is most of the scene, or the fine line does not follow the located one.
+    """
+    with rasterio.open(ndwi_path) as src:
+        crs = src.crs
+        px, coarse_px = min(abs(src.res[0]), abs(src.res[1])), factor * max(abs(src.res[0]), abs(src.res[1]))
+        overview, coarse_t, rec = _overview(src, factor)
+        v = overview[np.isfinite(overview)]
+        if v.size == 0:
+            return None
+        thr_val, water_high, _ = decide_threshold(v, thr)
+        ref = _coarse_roi(src, ndwi_path, thr, water_mask(overview, thr_val, water_high), coarse_t)
+        if ref is None:
+            return None
+        pad = buffer_m + coarse_px
+        if src.crs is not None and src.crs.is_geographic:
+            pad = buffer_m / 111320.0 + coarse_px
+        x0, y0, x1, y1 = ref.bounds
+        win = rasterio.windows.from_bounds(x0 - pad, y0 - pad, x1 + pad, y1 + pad, transform=src.transform)
+        c0, r0 = max(0, int(math.floor(win.col_off))), max(0, int(math.floor(win.row_off)))
+        c1 = min(src.width, int(math.ceil(win.col_off + win.width)))
+        r1 = min(src.height, int(math.ceil(win.row_off + win.height)))
+        if c1 - c0 < 2 or r1 - r0 < 2 or (c1 - c0) * (r1 - r0) > COARSE_MAX_WINDOW_FRAC * src.width * src.height:
+            return None
+        win = rasterio.windows.Window(c0, r0, c1 - c0, r1 - r0)
+        arr = _rescale_like_scene(src.read(1, window=win), rec)
+        transform = src.window_transform(win)
+        frame = rasterio.windows.bounds(win, src.transform)
+
+    if COASTLINE_BACKEND == "contour":
+        coast = shore_line(arr, thr_val, water_high, transform)
+    else:
+        edges = _component_boundary(water_mask(arr, thr_val, water_high), transform)
+        coast = _longest_line(_drop_frame_edges(edges, frame, px * 0.25))
+    if coast.is_empty or not _follows(coast, ref, 2 * coarse_px):
+        return None
+    return coast, crs
+
+def _follows(line, ref, tol, min_share=COARSE_MIN_OVERLAP):
+    """At least min_share of ref (sampled every tol along it) lies within tol of line."""
+    n = max(2, int(ref.length / tol) + 1)
+    pts = shapely.line_interpolate_point(ref, np.linspace(0.0, ref.length, n))
+    shapely.prepare(line)
+    return shapely.dwithin(line, pts, tol).mean() >= min_share
+
+def _drop_frame_edges(lines, bounds, tol):
+    """
+    Remove boundary segments lying on the window frame (they only exist because the window cuts
+    the water polygons). Rings are split at those segments without noding, so pieces stay as long
+    as the corresponding stretch of the full-scene boundary.
+    """
+    x0, y0, x1, y1 = min(bounds[0], bounds[2]), min(bounds[1], bounds[3]), max(bounds[0], bounds[2]), max(bounds[1], bounds[3])
+    pieces = []
+    for ring in shapely.get_parts(lines):
+        xy = np.asarray(ring.coords)
+        sides = [np.abs(xy[:, 0] - x0) < tol, np.abs(xy[:, 0] - x1) < tol,
+                 np.abs(xy[:, 1] - y0) < tol, np.abs(xy[:, 1] - y1) < tol]
+        on = np.zeros(len(xy) - 1, dtype=bool)
+        for side in sides:                  # both ends of the segment on the same frame side
+            on |= side[:-1] & side[1:]
+        if not on.any():
+            pieces.append(ring)
+            continue
+        if ring.is_closed:                  # start the walk on a frame segment so no run wraps around
+            k = int(np.argmax(on))
+            xy = np.vstack([xy[k:-1], xy[:k + 1]])
+            on = np.roll(on, -k)
+        keep = np.flatnonzero(~on)
+        if keep.size == 0:
+            continue
+        runs = np.split(keep, np.flatnonzero(np.diff(keep) > 1) + 1)
+        pieces += [LineString(xy[r[0]:r[-1] + 2]) for r in runs]
+    return shapely.multilinestrings(pieces) if pieces else LineString()
+
+def _component_boundary(water, transform):
+    """Pixel-edge rings of the largest 8-connected water component; the rest of the mask is not polygonized."""
+    sea = largest_component(water.view(bool))
+    if not sea.any():
+        return LineString()
+    polys = [shape(shp) for shp, _ in shapes(sea.view(np.uint8), mask=sea, connectivity=8, transform=transform)]
+    return shapely.multilinestrings([LineString(r.coords) for p in polys for r in (p.exterior, *p.interiors)])
+
+def _overview(src, factor):
+    """
+    Band decimated by factor (block averages), its transform, and the rescale record
+    (_rescale_like_scene) taken from the overview's own value range.
+    """
+    h, w = max(2, src.height // factor), max(2, src.width // factor)
+    raw = src.read(1, out_shape=(h, w), resampling=Resampling.average).astype(np.float32)
+    finite = raw[np.isfinite(raw)]
+    rec = {"rescaled": False}
+    if finite.size:
+        vmin, vmax = float(finite.min()), float(finite.max())
+        rec = {"rescaled": NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0, "vmin": vmin, "vmax": vmax}
+    return _rescale_like_scene(raw, rec), src.transform * Affine.scale(src.width / w, src.height / h), rec
+
+def _rescale_like_scene(raw, rec):
+    """prepare_ndwi's NaN/rescale step with a given value range (rec: rescaled, vmin, vmax)."""
+    arr = raw.astype(np.float32)
+    arr[~np.isfinite(arr)] = np.nan
+    if rec["rescaled"]:
+        arr = (arr - rec["vmin"]) / (rec["vmax"] - rec["vmin"] + 1e-9)
+    return arr
+
+def _coarse_roi(src, ndwi_path, thr, water, transform):
+    """
+    Located shore: the previous year's coastline, or the overview's largest water component
+    boundary; without scene-frame edges, longest piece. None if there is none.
+    """
+    line = _previous_coastline(ndwi_path, thr, src.crs) if COARSE_ROI_SOURCE == "previous" else None
+    if line is None:
+        line = _component_boundary(water, transform)
+    line = _longest_line(_drop_frame_edges(line, src.bounds, min(abs(src.res[0]), abs(src.res[1])) * 0.25))
+    return None if line.is_empty else line
+
+def _previous_coastline(ndwi_path, thr, crs):
+    """Cached coastline of the nearest earlier scene in the same folder (None if not extracted yet)."""
+    m = re.search(r"(\d{4})", os.path.basename(ndwi_path))
+    if not m:
+        return None
+    year2tif = list_year_tifs(os.path.dirname(ndwi_path) or ".")
+    prev = [y for y in year2tif if y < int(m.group(1))]
+    if not prev:
+        return None
+    hit = extract_cache.get_coastline(year2tif[max(prev)], thr, **_coastline_params())
+    if hit is None or hit[0].is_empty:
+        return None
+    geom, prev_crs = hit
+    return geom if str(prev_crs) == str(crs) else reproject(geom, prev_crs, crs)
+
+_TRANSFORMERS: dict = {}   # (src, dst) CRS strings -> Transformer, per process
+
+def get_transformer(src_crs, dst_crs):
+    """Cached always_xy Transformer; a missing CRS is treated as EPSG:4326."""
+    key = (str(src_crs or "EPSG:4326"), str(dst_crs or "EPSG:4326"))
+    t = _TRANSFORMERS.get(key)
+    if t is None:
+        t = _TRANSFORMERS[key] = Transformer.from_crs(key[0], key[1], always_xy=True)
+    return t
+
+def _is_3857(crs):
+    return bool(crs) and "3857" in str(crs).upper()
+
+def reproject(geom, src_crs, dst_crs):
+    """All vertices of `geom` in one vectorized transform call."""
+    t = get_transformer(src_crs, dst_crs)
+    return shapely.transform(geom, lambda xy: np.column_stack(t.transform(xy[:, 0], xy[:, 1])))
 
 def to_3857(geom, src_crs):
-    if not src_crs:
-        transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
-        return shp_transform(lambda x, y, z=None: transformer.transform(x, y), geom)
-    s = str(src_crs).upper()
-    if "3857" in s:
+    if _is_3857(src_crs):
         return geom
-    transformer = Transformer.from_crs(src_crs, "EPSG:3857", always_xy=True)
-    return shp_transform(lambda x, y, z=None: transformer.transform(x, y), geom)
+    return reproject(geom, src_crs, "EPSG:3857")
 
-def build_transects(baseline_tif, spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M):
+def build_transects(baseline_tif, spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M,
+                    smooth=TRANSECT_NORMAL_SMOOTH):
     coast, crs = coastline_from_ndwi(baseline_tif)
     coast = to_3857(coast, crs)
     if coast.is_empty:
         raise RuntimeError("Baseline coastline extraction failed.")
+    return transects_along(coast, spacing, half_len, smooth)
+
+def transects_along(coast, spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M,
+                    smooth=TRANSECT_NORMAL_SMOOTH):
+    """
+    Shore-normal transects at regular stations along `coast` (EPSG:3857), as array operations:
+    - stations and +-1 m neighbours interpolated in one batched call
+    - unit normals from the central difference, optionally averaged over `smooth` stations
+    """
+    eps = 1.0
     n = max(50, int(coast.length // spacing))
     dists = np.linspace(0, coast.length, n)
-    rows = []
-    for i, dcur in enumerate(dists):
-        pt = coast.interpolate(dcur)
-        eps = 1.0
-        p1 = coast.interpolate(max(0, dcur - eps))
-        p2 = coast.interpolate(min(coast.length, dcur + eps))
-        dx, dy = p2.x - p1.x, p2.y - p1.y
-        nx, ny = -dy, dx
-        norm = math.hypot(nx, ny) + 1e-9
-        nx, ny = nx / norm, ny / norm
-        a = (pt.x - nx * half_len, pt.y - ny * half_len)
-        b = (pt.x + nx * half_len, pt.y + ny * half_len)
-        rows.append({"transect_id": i, "x1": a[0], "y1": a[1], "x2": b[0], "y2": b[1]})
-    return pd.DataFrame(rows)
+    probe = np.concatenate([dists, np.maximum(0, dists - eps), np.minimum(coast.length, dists + eps)])
+    xy = _interpolate_along(coast, probe)
+    pt, p1, p2 = xy[:n], xy[n:2 * n], xy[2 * n:]
+    nx, ny = -(p2[:, 1] - p1[:, 1]), p2[:, 0] - p1[:, 0]
+    norm = np.hypot(nx, ny) + 1e-9
+    nx, ny = nx / norm, ny / norm
+    if smooth and smooth > 1:
+        nx, ny = _smooth_normals(nx, ny, int(smooth), closed=coast.is_closed)
+    return pd.DataFrame({
+        "transect_id": np.arange(n),
+        "x1": pt[:, 0] - nx * half_len, "y1": pt[:, 1] - ny * half_len,
+        "x2": pt[:, 0] + nx * half_len, "y2": pt[:, 1] + ny * half_len,
+    })
+
+def _interpolate_along(line, d):
+    """
+    Points at distances `d` along a LineString, like line.interpolate(d) for each d but in
+    O((n + vertices) log vertices): cumulative segment lengths + searchsorted. Follows GEOS's
+    segment walk (a distance on a vertex starts the next segment; the end is the last vertex),
+    so coordinates are identical.
+    """
+    xy = shapely.get_coordinates(line)
+    seg = np.diff(xy, axis=0)
+    seglen = np.sqrt(seg[:, 0] * seg[:, 0] + seg[:, 1] * seg[:, 1])
+    cum = np.concatenate([[0.0], np.cumsum(seglen)])
+    i = np.clip(np.searchsorted(cum, d, side="right") - 1, 0, len(seg) - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(seglen[i] > 0, (d - cum[i]) / seglen[i], 0.0)
+    out = np.column_stack([xy[i, 0] + frac * seg[i, 0], xy[i, 1] + frac * seg[i, 1]])
+    out[d >= cum[-1]] = xy[-1]
+    return out
+
+def _smooth_normals(nx, ny, window, closed=False):
+    """Moving average of unit normals over `window` stations (wrapping on closed lines), renormalized."""
+    k = np.ones(window) / window
+    left, right = window // 2, window - 1 - window // 2
+    mode = "wrap" if closed else "edge"
+    sx = np.convolve(np.pad(nx, (left, right), mode=mode), k, mode="valid")
+    sy = np.convolve(np.pad(ny, (left, right), mode=mode), k, mode="valid")
+    norm = np.hypot(sx, sy)
+    ok = norm > 1e-9   # opposing normals cancelled out: keep the raw one
+    return np.where(ok, sx / np.where(ok, norm, 1), nx), np.where(ok, sy / np.where(ok, norm, 1), ny)
 
 def shoreline_position(ndwi_path, transects_df):
+    """Per-transect position_m for one scene; served from the extraction cache when possible."""
+    params = _position_params()
+    with profiling.stage("shoreline_position", ndwi_path) as st:
+        hit = extract_cache.get_positions(ndwi_path, transects_df, **params)
+        if hit is not None:
+            st["cached"] = True
+            return hit
+        pos = _extract_positions(ndwi_path, transects_df)
+        extract_cache.put_positions(ndwi_path, transects_df, pos, **params)
+        return pos
+
+def _position_params():
+    """Extraction settings that change positions (beyond NDWI settings) -> part of the cache key."""
+    params = {"mode": EXTRACT_MODE}
+    if EXTRACT_MODE == "profile":
+        params["step"] = float(PROFILE_STEP_M)
+    else:
+        params.update(_coastline_params())
+        params["native_crs"] = bool(INTERSECT_NATIVE_CRS)
+    return params
+
+def _extract_positions(ndwi_path, transects_df):
+    if EXTRACT_MODE == "profile":
+        return profile_positions(ndwi_path, transects_df)
+    return _intersect_positions(ndwi_path, transects_df)
+
+def _intersect_positions(ndwi_path, transects_df):
     coast, crs = coastline_from_ndwi(ndwi_path)
-    coast = to_3857(coast, crs)
-    out = []
-    for _, r in transects_df.iterrows():
-        line = LineString([(r["x1"], r["y1"]), (r["x2"], r["y2"])])
-        inter = line.intersection(coast)
-        if inter.is_empty:
-            pos = np.nan
-        elif isinstance(inter, MultiPoint):
-            pts = list(inter.geoms)
-            mid = line.interpolate(line.length / 2)
-            best = min(pts, key=lambda p: mid.distance(p))
-            pos = line.project(best)
-        elif inter.geom_type == "Point":
-            pos = line.project(inter)
-        else:
-            pos = line.project(coast.interpolate(coast.length / 2))
-        out.append(pos)
-    return pd.DataFrame({"transect_id": transects_df["transect_id"].astype(int), "position_m": out})
+    if INTERSECT_NATIVE_CRS and not _is_3857(crs):
+        with profiling.stage("intersect_transects", ndwi_path):
+            pos = intersect_native(coast, crs, transects_df)
+    else:
+        with profiling.stage("reproject", ndwi_path):
+            coast = to_3857(coast, crs)
+        with profiling.stage("intersect_transects", ndwi_path):
+            pos = intersect_transects(coast, transects_df)
+    return pd.DataFrame({"transect_id": transects_df["transect_id"].astype(int), "position_m": pos})
+
+_NATIVE_TRANSECTS: dict = {}   # (transect set hash, CRS) -> projected transects, per process
+
+def transects_in_crs(transects_df, crs):
+    """EPSG:3857 transect endpoints projected into `crs`, once per (transect set, CRS)."""
+    key = (extract_cache.transects_hash(transects_df), str(crs or "EPSG:4326"))
+    df = _NATIVE_TRANSECTS.get(key)
+    if df is None:
+        t = get_transformer("EPSG:3857", crs)
+        df = transects_df[["transect_id"]].copy()
+        df["x1"], df["y1"] = t.transform(transects_df["x1"].to_numpy(), transects_df["y1"].to_numpy())
+        df["x2"], df["y2"] = t.transform(transects_df["x2"].to_numpy(), transects_df["y2"].to_numpy())
+        df = _NATIVE_TRANSECTS[key] = df
+    return df
 
-def build_labels(ndwi_dir):
+def intersect_native(coast, crs, transects_df):
+    """
+    Intersect in the raster's own CRS: transects are projected once, the coastline is never
+    reprojected. Only the chosen crossings go back to EPSG:3857, so positions are still
+    metres along the EPSG:3857 transect.
+    """
+    native = transects_in_crs(transects_df, crs)
+    pos = intersect_transects(coast, native)
+    out = np.full(pos.size, np.nan)
+    hit = np.isfinite(pos)
+    if hit.any():
+        ends = ["x1", "y1", "x2", "y2"]
+        lines_n = shapely.linestrings(native[ends].to_numpy(np.float64).reshape(-1, 2, 2)[hit])
+        xy = shapely.get_coordinates(shapely.line_interpolate_point(lines_n, pos[hit]))
+        x, y = get_transformer(crs, "EPSG:3857").transform(xy[:, 0], xy[:, 1])
+        lines_m = shapely.linestrings(transects_df[ends].to_numpy(np.float64).reshape(-1, 2, 2)[hit])
+        out[hit] = shapely.line_locate_point(lines_m, shapely.points(x, y))
+    return out
+
+def _position_on_transect(line, coast):
+    """Scalar reference rule: crossing nearest the transect midpoint, as distance along the transect."""
+    inter = line.intersection(coast)
+    if inter.is_empty:
+        return np.nan
+    if isinstance(inter, MultiPoint):
+        pts = list(inter.geoms)
+        mid = line.interpolate(line.length / 2)
+        best = min(pts, key=lambda p: mid.distance(p))
+        return line.project(best)
+    if inter.geom_type == "Point":
+        return line.project(inter)
+    return line.project(coast.interpolate(coast.length / 2))
+
+def intersect_transects(coast, transects_df):
+    """
+    Batched transect x coastline intersection (both in the same CRS).
+    - coastline exploded into 2-point segments indexed by an STRtree
+    - one vectorized intersection over all (transect, segment) candidate pairs
+    - per transect keep the crossing nearest the transect midpoint (MultiPoint rule)
+    - transects touching a collinear overlap fall back to the scalar rule
+    Returns float64 positions (m along transect from x1,y1; NaN = no crossing).
+    """
+    n = len(transects_df)
+    out = np.full(n, np.nan)
+    if n == 0 or coast is None or coast.is_empty:
+        return out
+
+    ends = transects_df[["x1", "y1", "x2", "y2"]].to_numpy(np.float64).reshape(n, 2, 2)
+    lines = shapely.linestrings(ends)
+
+    parts = shapely.get_parts(coast)
+    segs = []
+    for part in parts:
+        xy = shapely.get_coordinates(part)
+        if len(xy) >= 2:
+            segs.append(np.stack([xy[:-1], xy[1:]], axis=1))
+    if not segs:
+        return out
+    segs = shapely.linestrings(np.concatenate(segs))
+
+    tree = shapely.STRtree(segs)
+    li, si = tree.query(lines, predicate="intersects")
+    if li.size == 0:
+        return out
+
+    inter = shapely.intersection(lines[li], segs[si])
+    is_pt = shapely.get_type_id(inter) == 0
+    # collinear overlaps (or other non-point results): defer to the reference implementation
+    odd = np.unique(li[~is_pt])
+    li, inter = li[is_pt], inter[is_pt]
+
+    lengths = shapely.length(lines)
+    mids = shapely.line_interpolate_point(lines, lengths / 2)
+    d_mid = shapely.distance(mids[li], inter)
+
+    # nearest-to-mid per transect: sort by (transect, distance) and take the first of each run
+    order = np.lexsort((d_mid, li))
+    li_s, d_s = li[order], d_mid[order]
+    first = np.ones(li_s.size, dtype=bool)
+    first[1:] = li_s[1:] != li_s[:-1]
+    best_li = li_s[first]
+    best_pt = inter[order][first]
+    out[best_li] = shapely.line_locate_point(lines[best_li], best_pt)
+
+    # equidistant crossings: the reference picks by GEOS MultiPoint order, so let it decide
+    tie = ~first[1:] & np.isclose(d_s[1:], d_s[:-1], rtol=0.0, atol=1e-6)
+    odd = np.union1d(odd, li_s[1:][tie])
+
+    for i in odd:
+        out[i] = _position_on_transect(lines[i], coast)
+    return out
+
+def _bilinear(arr, rows, cols):
+    """Bilinear sample at fractional pixel-centre coords; NaN outside the grid or next to NaN pixels."""
+    h, w = arr.shape
+    r0, c0 = np.floor(rows), np.floor(cols)
+    inside = (r0 >= 0) & (c0 >= 0) & (r0 < h - 1) & (c0 < w - 1)
+    r0 = np.where(inside, r0, 0).astype(np.intp)
+    c0 = np.where(inside, c0, 0).astype(np.intp)
+    fr, fc = rows - r0, cols - c0
+    top = arr[r0, c0] * (1 - fc) + arr[r0, c0 + 1] * fc
+    bot = arr[r0 + 1, c0] * (1 - fc) + arr[r0 + 1, c0 + 1] * fc
+    out = top * (1 - fr) + bot * fr
+    return np.where(inside, out, np.nan)
+
+def profile_positions(ndwi_path, transects_df, thr=NDWI_THRESHOLD, step=PROFILE_STEP_M):
+    """
+    Shoreline positions without polygonization: sample NDWI along each transect every `step` m
+    (bilinear), find sub-sample threshold crossings and keep the one nearest the transect midpoint.
+    Uses the same rescale/threshold rules as raster_to_water. Cost is O(transects x samples).
+    """
+    tids = transects_df["transect_id"].astype(int)
+    n = len(transects_df)
+    out = np.full(n, np.nan)
+    scene = read_ndwi(ndwi_path)
+    if scene is None:
+        with rasterio.open(ndwi_path) as src:
+            scene = src.read(1), src.crs, src.transform
+    raw, crs, transform = scene
+    arr, v = prepare_ndwi(raw)
+    if v.size == 0 or n == 0:
+        return pd.DataFrame({"transect_id": tids, "position_m": out})
+    thr_val, water_high = water_rule(arr, v, thr)
+
+    x1, y1, x2, y2 = (transects_df[c].to_numpy(np.float64) for c in ("x1", "y1", "x2", "y2"))
+    length = np.hypot(x2 - x1, y2 - y1)
+    n_s = int(np.ceil(length.max() / step)) + 1
+    t = np.linspace(0.0, 1.0, n_s)
+    xs = x1[:, None] + (x2 - x1)[:, None] * t
+    ys = y1[:, None] + (y2 - y1)[:, None] * t
+    if not _is_3857(crs):
+        back = get_transformer("EPSG:3857", crs)
+        xs, ys = back.transform(xs, ys)
+    cols, rows = ~transform * (xs, ys)
+    z = _bilinear(arr, rows - 0.5, cols - 0.5)
+
+    # crossing between consecutive valid samples whose water/land class differs
+    wet = (z >= thr_val) if water_high else (z <= thr_val)
+    ok = np.isfinite(z[:, :-1]) & np.isfinite(z[:, 1:])
+    cross = ok & (wet[:, :-1] != wet[:, 1:])
+    if not cross.any():
+        return pd.DataFrame({"transect_id": tids, "position_m": out})
+    ti, k = np.nonzero(cross)
+    z0, z1 = z[ti, k], z[ti, k + 1]
+    frac = np.clip((thr_val - z0) / (z1 - z0), 0.0, 1.0)
+    s_cross = (t[k] + frac * (t[1] - t[0])) * length[ti]
+
+    d_mid = np.abs(s_cross - length[ti] / 2)
+    order = np.lexsort((d_mid, ti))
+    ti_s = ti[order]
+    first = np.ones(ti_s.size, dtype=bool)
+    first[1:] = ti_s[1:] != ti_s[:-1]
+    out[ti_s[first]] = s_cross[order][first]
+    return pd.DataFrame({"transect_id": tids, "position_m": out})
+
+def _extract_year(year, tif, transects, profile=False):
+    """
+    Worker entry point: (year, positions or None, threshold audit or None, error message or None,
+    stage records). Records are collected here so pool workers report them back with the result.
+    """
+    with profiling.collect(profile) as records:
+        try:
+            with profiling.stage("extract_year", tif):
+                pos = shoreline_position(tif, transects)
+                pos["year"] = year
+                thr_rec = threshold_decision(tif)
+            res = year, pos, thr_rec, None
+        except Exception as e:
+            res = year, None, None, f"{type(e).__name__}: {e}"
+    return (*res, records)
+
+def _resolve_workers(workers):
+    if workers is None:
+        workers = EXTRACT_WORKERS
+    workers = int(workers)
+    return (os.cpu_count() or 1) if workers <= 0 else workers
+
+def baseline_year(year2tif):
+    return 2010 if 2010 in year2tif else min([y for y in year2tif if y >= 2000] or year2tif.keys())
+
+def build_labels(ndwi_dir, workers=None):
+    """
+    Per-year shoreline positions on transects built from the baseline scene.
+    - workers > 1 extracts years in a process pool (0 = all CPUs)
+    - output is ordered by year regardless of completion order
+    - a failing year is reported and skipped; the other years are kept
+    """
     year2tif = list_year_tifs(ndwi_dir)
     if not year2tif:
         raise RuntimeError(f"No .tif files found in NDWI_DIR: {ndwi_dir}")
-    base_year = 2010 if 2010 in year2tif else min([y for y in year2tif if y >= 2000] or year2tif.keys())
-    transects = build_transects(year2tif[base_year], spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M)
-    rows = []
-    for y in sorted(year2tif):
-        if y < 1970:
+    transects = build_transects(year2tif[baseline_year(year2tif)], spacing=TRANSECT_SPACING_M, half_len=TRANSECT_LENGTH_M)
+    years = [y for y in sorted(year2tif) if y >= 1970]
+    labels = extract_years(year2tif, years, transects, workers)
+    if labels.empty:
+        raise RuntimeError(f"Shoreline extraction failed for every year ({len(labels.attrs['failed_years'])} scenes).")
+    return labels, transects
+
+def extract_years(year2tif, years, transects, workers=None, active=None, census=()):
+    """
+    Positions for `years` on fixed transects; failures/threshold audit in .attrs. May be empty.
+    With `active` (transect ids), only those transects are intersected (the rest get NaN rows),
+    except in `census` years, which always cover every transect.
+    """
+    workers = min(_resolve_workers(workers), max(1, len(years)))
+    pruned = transects if active is None else transects[transects["transect_id"].isin(active)].reset_index(drop=True)
+    run_on = {y: transects if active is None or y in census else pruned for y in years}
+    profile = profiling.active()
+    if workers == 1:
+        results = [_extract_year(y, year2tif[y], run_on[y], profile) for y in years]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = [ex.submit(_extract_year, y, year2tif[y], run_on[y], profile) for y in years]
+            results = [f.result() for f in futs]
+    for *_, records in results:
+        profiling.merge(records)
+    results = [r[:4] for r in results]
+    if active is not None:
+        all_ids = transects[["transect_id"]]
+        results = [(y, pos if pos is None or y in census else
+                    all_ids.merge(pos.drop(columns="year"), on="transect_id", how="left").assign(year=y), thr, err)
+                   for y, pos, thr, err in results]
+
+    rows, failed, thresholds = [], {}, []
+    for y, pos, thr_rec, err in sorted(results, key=lambda t: t[0]):
+        if err is not None:
+            failed[y] = err
+            print(f"  ! extraction failed for {y}: {err}")
             continue
-        pos = shoreline_position(year2tif[y], transects)
-        pos["year"] = y
         rows.append(pos)
-    labels = pd.concat(rows, ignore_index=True)
-    return labels, transects
+        thresholds.append({"year": y, **thr_rec})
+        if "thr_val" in thr_rec:
+            print(f"  {y}: thr={thr_rec['thr_val']:.4f} ({thr_rec['rule']}, "
+                  f"water {'>=' if thr_rec['water_high'] else '<='} thr) | valid px={thr_rec['n_valid']}")
+        else:
+            print(f"  {y}: no valid NDWI pixels")
+    if rows:
+        labels = pd.concat(rows, ignore_index=True)
+    else:
+        labels = pd.DataFrame({"transect_id": pd.Series(dtype=int), "position_m": pd.Series(dtype=float),
+                               "year": pd.Series(dtype=int)})
+    labels.attrs["failed_years"] = failed
+    labels.attrs["thresholds"] = thresholds
+    return labels
+
+DRIVER_COLUMNS = ["valid_time", "swh", "mwp", "tp"]   # what annual_features reads
+
+def load_hourly_drivers(waves_csv, rain_csv, columns=None):
+    """Merged hourly ERA5 waves + rain; memory-mapped from the columnar cache (era5_cache.py) when unchanged."""
+    with profiling.stage("load_hourly_drivers"):
+        return era5_cache.load(waves_csv, rain_csv, _merge_hourly_drivers, columns)
 
-def load_hourly_drivers(waves_csv, rain_csv):
+def _merge_hourly_drivers(waves_csv, rain_csv):
     w = pd.read_csv(waves_csv, parse_dates=["valid_time"])
     r = pd.read_csv(rain_csv, parse_dates=["valid_time"])
     df = pd.merge_asof(
@@ -194,23 +773,33 @@ def load_hourly_drivers(waves_csv, rain_csv):
     return df
 
 def annual_features(hourly):
-    df = hourly.copy()
-    df["date"] = df["valid_time"].dt.date
-    df["year"] = df["valid_time"].dt.year
-    daily = df.groupby(["year", "date"]).agg(
-        hs_max=("swh", "max"),
-        tp_mean=("mwp", "mean"),
-        rain_sum=("tp", "sum"),
-    ).reset_index()
-    hs95 = daily.groupby("year")["hs_max"].quantile(0.95).rename("hs95")
-    daily = daily.merge(hs95, on="year", how="left")
-    daily["storm_day"] = (daily["hs_max"] >= daily["hs95"]).astype(int)
-    daily["rain_3d"] = daily.groupby("year")["rain_sum"].transform(lambda x: x.rolling(3, min_periods=1).sum())
-    annual = daily.groupby("year").agg(
-        storm_days=("storm_day", "sum"),
-        wave_power=("hs_max", lambda x: float(np.nansum(np.square(x)))),
-        rain_3d_max=("rain_3d", "max"),
-    ).reset_index()
+    with profiling.stage("annual_features"):
+        return with_storm_index(annual_components(hourly))
+
+def annual_components(hourly):
+    """Per-year driver components; each year depends only on its own hourly rows."""
+    with profiling.stage("annual_components"):
+        df = hourly.copy()
+        df["date"] = df["valid_time"].dt.date
+        df["year"] = df["valid_time"].dt.year
+        daily = df.groupby(["year", "date"]).agg(
+            hs_max=("swh", "max"),
+            tp_mean=("mwp", "mean"),
+            rain_sum=("tp", "sum"),
+        ).reset_index()
+        hs95 = daily.groupby("year")["hs_max"].quantile(0.95).rename("hs95")
+        daily = daily.merge(hs95, on="year", how="left")
+        daily["storm_day"] = (daily["hs_max"] >= daily["hs95"]).astype(int)
+        daily["rain_3d"] = daily.groupby("year")["rain_sum"].transform(lambda x: x.rolling(3, min_periods=1).sum())
+        return daily.groupby("year").agg(
+            storm_days=("storm_day", "sum"),
+            wave_power=("hs_max", lambda x: float(np.nansum(np.square(x)))),
+            rain_3d_max=("rain_3d", "max"),
+        ).reset_index()
+
+def with_storm_index(annual):
+    """storm_index is max-normalized over all years, so it is recomputed whenever any year changes."""
+    annual = annual.copy()
     annual["storm_index"] = (
         0.6 * (annual["storm_days"] / (annual["storm_days"].max() + 1e-6)) +
         0.4 * (annual["wave_power"] / (annual["wave_power"].max() + 1e-6))
@@ -218,30 +807,61 @@ def annual_features(hourly):
     return annual[["year", "storm_days", "wave_power", "rain_3d_max", "storm_index"]]
 
 def build_training(labels, feats, y0=TRAIN_YEAR_START, y1=TRAIN_YEAR_END):
-    s = labels.copy()
-    s = s[s["year"].between(y0, y1)].sort_values(["transect_id", "year"])
-    s["delta_pos_m"] = s.groupby("transect_id")["position_m"].diff()
-    s = s.dropna(subset=["delta_pos_m"])
-    return s.merge(feats, on="year", how="left")
+    """Year-on-year deltas per transect in [y0, y1] joined to that year's drivers; labels may be long or a PositionMatrix."""
+    pm = labels if isinstance(labels, PositionMatrix) else PositionMatrix.from_labels(labels)
+    return pm.between(y0, y1).delta_frame().merge(feats, on="year", how="left")
 
-def main():
+def trim_outliers(train):
+    """Drop the 1%/99% delta_pos_m tails (only with >= 50 samples)."""
+    if len(train) >= 50:
+        lo, hi = train["delta_pos_m"].quantile([0.01, 0.99])
+        train = train[train["delta_pos_m"].between(lo, hi)]
+    return train
+
+def train(ndwi_dir=NDWI_DIR, waves_csv=WAVES_CSV, rain_csv=RAIN_CSV, art_dir=ART_DIR, full=False, workers=None,
+          profile=PROFILE_STAGES, cprofile=PROFILE_CPROFILE):
+    """
+    Full Path A training for one site; artifacts go to art_dir. Returns a small summary dict.
+    profile: stage timings -> art_dir/profile_report.json (see profiling.py); cprofile adds a
+    cProfile of the slowest scene, re-extracted with the extraction cache bypassed.
+    """
+    if not (profile or cprofile):
+        return _train(ndwi_dir, waves_csv, rain_csv, art_dir, full, workers)
+    with profiling.collect() as records:
+        with profiling.stage("train"):
+            summary = _train(ndwi_dir, waves_csv, rain_csv, art_dir, full, workers)
+    extra = {}
+    scene = profiling.slowest_scene(records) if cprofile else None
+    if scene:
+        transects = pd.read_csv(os.path.join(art_dir, "transects.csv"), float_precision="round_trip")
+        year = profiling.scene_year(scene)
+        with extract_cache.bypass():
+            extra["cprofile"] = profiling.profile_call(lambda: _extract_year(year, scene, transects),
+                                                       os.path.join(art_dir, f"profile_slowest_{year}"))
+        extra["cprofile_scene"] = scene
+    report = profiling.write_report(records, art_dir, **extra)
+    print(f"Stage profile: {report}" + (f" | cProfile ({scene}): {extra['cprofile']}" if scene else ""))
+    return summary
+
+def _train(ndwi_dir, waves_csv, rain_csv, art_dir, full, workers):
     # Sanity
-    assert os.path.isdir(NDWI_DIR), f"NDWI_DIR not found: {NDWI_DIR}"
-    assert os.path.isfile(WAVES_CSV), f"WAVES_CSV not found: {WAVES_CSV}"
-    assert os.path.isfile(RAIN_CSV), f"RAIN_CSV not found: {RAIN_CSV}"
+    assert os.path.isdir(ndwi_dir), f"NDWI_DIR not found: {ndwi_dir}"
+    assert os.path.isfile(waves_csv), f"WAVES_CSV not found: {waves_csv}"
+    assert os.path.isfile(rain_csv), f"RAIN_CSV not found: {rain_csv}"
+    os.makedirs(art_dir, exist_ok=True)
+
+    # label/driver stores are updated in place: only new or changed years are recomputed
+    from incremental import update_labels, update_drivers
 
     print("Extracting shoreline labels…")
-    labels, transects = build_labels(NDWI_DIR)
-    labels.to_csv(os.path.join(ART_DIR, "shoreline_positions_annual.csv"), index=False)
-    transects.to_csv(os.path.join(ART_DIR, "transects.csv"), index=False)
+    labels, transects, _ = update_labels(ndwi_dir, art_dir, workers=workers, full=full)
 
     print(f"Labels years: {labels['year'].min()}–{labels['year'].max()} | "
           f"years={labels['year'].nunique()} | transects={labels['transect_id'].nunique()}")
 
     print("Engineering annual drivers from ERA5…")
-    hourly = load_hourly_drivers(WAVES_CSV, RAIN_CSV)
-    feats = annual_features(hourly)
-    feats.to_csv(os.path.join(ART_DIR, "annual_driver_features.csv"), index=False)
+    hourly = load_hourly_drivers(waves_csv, rain_csv, columns=DRIVER_COLUMNS)
+    feats, _ = update_drivers(hourly, art_dir, full=full)
     print(f"Drivers years: {feats['year'].min()}–{feats['year'].max()} | years={feats['year'].nunique()}")
 
     # ---------------------------
@@ -250,9 +870,7 @@ def main():
     train = build_training(labels, feats)
     print(f"Training samples (pre-trim): {len(train)}")
 
-    if len(train) >= 50:
-        lo, hi = train["delta_pos_m"].quantile([0.01, 0.99])
-        train = train[train["delta_pos_m"].between(lo, hi)]
+    train = trim_outliers(train)
     print(f"Training samples (post-trim): {len(train)}")
 
     if len(train) < 5:
@@ -262,26 +880,16 @@ def main():
     y = train["delta_pos_m"].values
     years = train["year"].values
 
-    # LOO-Year CV for alpha
-    alphas = [0.1, 0.3, 1.0, 3.0, 10.0, 30.0]
+    # LOO-Year CV for alpha (closed form, all folds x alphas in one batched solve; see ridge_cv.py)
+    alphas = RIDGE_ALPHAS
     best_alpha, best_mae = None, float("inf")
-    uniq_years = np.unique(years)
-    if uniq_years.size >= 3:
-        for a in alphas:
-            fold_mae = []
-            for yr in uniq_years:
-                tr = years != yr
-                te = years == yr
-                if te.sum() == 0 or tr.sum() == 0:
-                    continue
-                mdl = Ridge(alpha=a).fit(X[tr], y[tr])
-                pred = mdl.predict(X[te])
-                fold_mae.append(np.mean(np.abs(pred - y[te])))
-            if fold_mae:
-                m = float(np.mean(fold_mae))
-                print(f"alpha={a:.2f} | LOO-Year MAE={m:.2f} m")
-                if m < best_mae:
-                    best_mae, best_alpha = m, a
+    if np.unique(years).size >= 3:
+        with profiling.stage("alpha_tuning"):
+            maes = loo_year_mae(X, y, years, alphas)
+        for a, m in zip(alphas, maes):
+            print(f"alpha={a:.2f} | LOO-Year MAE={m:.2f} m")
+        i = int(np.argmin(maes))
+        best_alpha, best_mae = alphas[i], float(maes[i])
 
     alpha_final = best_alpha if best_alpha is not None else RIDGE_ALPHA
     if best_alpha is not None:
@@ -302,8 +910,8 @@ def main():
     )
     global_mean_delta = float(train["delta_pos_m"].mean())
 
-    joblib.dump(mdl, os.path.join(ART_DIR, "model_ridge.pkl"))
-    with open(os.path.join(ART_DIR, "model_features.json"), "w") as f:
+    joblib.dump(mdl, os.path.join(art_dir, "model_ridge.pkl"))
+    with open(os.path.join(art_dir, "model_features.json"), "w") as f:
         json.dump({
             "features": ["storm_days", "wave_power", "rain_3d_max", "storm_index"],
             "alpha": float(alpha_final),
@@ -311,9 +919,17 @@ def main():
             "global_mean_delta": global_mean_delta,
             "pathA": True
         }, f, indent=2)
-    typical.to_csv(os.path.join(ART_DIR, "typical_annual_delta_by_transect.csv"), index=False)
+    typical.to_csv(os.path.join(art_dir, "typical_annual_delta_by_transect.csv"), index=False)
 
-    print("Done. Artifacts saved to ./artifacts")
+    print(f"Done. Artifacts saved to {art_dir}")
+    return {"alpha": float(alpha_final), "loo_year_mae_m": None if best_alpha is None else best_mae,
+            "insample_mae_m": insample_mae, "n_train": int(len(y)), "years": int(labels["year"].nunique()),
+            "transects": int(labels["transect_id"].nunique())}
+
+def main():
+    args = sys.argv[1:]
+    train(full=not INCREMENTAL_ARTIFACTS or "--full" in args,
+          profile=PROFILE_STAGES or "--profile" in args, cprofile=PROFILE_CPROFILE or "--cprofile" in args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,66 @@
+# transect_quality.py — per-transect validity index (which transects ever intersect the shoreline)
+#
+# artifacts/transect_quality.csv : transect_id, n_years, n_valid, valid_frac, valid_frac_recent, active
+# artifacts/transect_quality.json: thresholds + hash of the transect set the index was built on
+# A transect is active when valid_frac >= QUALITY_MIN_VALID_FRAC and n_valid >= QUALITY_MIN_VALID_YEARS,
+# counted over the years extracted on every transect (years extracted pruned would only ever lower it).
+# Written by train_model.py and check_positions.py; used to skip dead transects during extraction
+# (QUALITY_PRUNE_EXTRACTION) and to serve only the active set (QUALITY_SERVE_ACTIVE_ONLY).
+import os, json
+import numpy as np
+import pandas as pd
+
+import extract_cache
+from config import QUALITY_MIN_VALID_FRAC, QUALITY_MIN_VALID_YEARS, QUALITY_RECENT_YEARS
+
+INDEX_CSV = "transect_quality.csv"
+INDEX_JSON = "transect_quality.json"
+TRANSECTS_CSV = "transects.csv"
+
+def build_index(pm, min_valid_frac=QUALITY_MIN_VALID_FRAC, min_valid_years=QUALITY_MIN_VALID_YEARS,
+                recent_years=QUALITY_RECENT_YEARS, exclude_years=()):
+    """Quality index from a PositionMatrix (same valid fractions as check_positions.py), without exclude_years."""
+    valid = np.isfinite(pm.P)
+    if len(exclude_years):
+        valid = valid[:, ~np.isin(pm.years, exclude_years)]
+    recent = valid[:, -recent_years:] if recent_years else valid
+    n_valid = valid.sum(axis=1)
+    frac = valid.mean(axis=1)
+    return pd.DataFrame({
+        "transect_id": pm.transect_ids.astype(int),
+        "n_years": valid.shape[1],
+        "n_valid": n_valid,
+        "valid_frac": frac.round(3),
+        "valid_frac_recent": recent.mean(axis=1).round(3),
+        "active": (frac >= min_valid_frac) & (n_valid >= min_valid_years),
+    })
+
+def save_index(index, transects, art_dir):
+    index.to_csv(os.path.join(art_dir, INDEX_CSV), index=False)
+    meta = {
+        "transects": extract_cache.transects_hash(transects),
+        "min_valid_frac": QUALITY_MIN_VALID_FRAC,
+        "min_valid_years": QUALITY_MIN_VALID_YEARS,
+        "recent_years": QUALITY_RECENT_YEARS,
+        "n_transects": int(len(index)),
+        "n_active": int(index["active"].sum()),
+    }
+    with open(os.path.join(art_dir, INDEX_JSON), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Transect quality: {meta['n_active']}/{meta['n_transects']} active "
+          f"(valid_frac >= {QUALITY_MIN_VALID_FRAC}, >= {QUALITY_MIN_VALID_YEARS} valid years)")
+
+def active_ids(art_dir, transects=None):
+    """Active transect ids, or None when there is no index or it was built on a different transect set."""
+    csv, meta_path = os.path.join(art_dir, INDEX_CSV), os.path.join(art_dir, INDEX_JSON)
+    if not (os.path.exists(csv) and os.path.exists(meta_path)):
+        return None
+    if transects is None:
+        transects = pd.read_csv(os.path.join(art_dir, TRANSECTS_CSV), float_precision="round_trip")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("transects") != extract_cache.transects_hash(transects):
+        print("  ! transect quality index is stale (different transect set); not pruning")
+        return None
+    index = pd.read_csv(csv)
+    return index.loc[index["active"], "transect_id"].to_numpy(int)
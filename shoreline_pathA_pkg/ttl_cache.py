@@ -0,0 +1,245 @@
+# ttl_cache.py — bounded in-memory LRU cache with soft / hard TTL (serve_api's OWM and forecast stores)
+#
+# Entries are {data, fetched, fresh_until, expires, nbytes}. get() returns an entry until its hard
+# TTL (callers decide what to do with a stale one) and marks it most recently used. put() evicts the
+# least recently used entries beyond max_entries / max_bytes (0 = unbounded). nbytes is the compact
+# JSON size of the data as reported by `sizeof` (what the API sends), not Python heap use. sweep()
+# drops every entry past its hard TTL, so keys that are never read again do not linger.
+#
+# SqliteTTLCache has the same interface over one SQLite file, so several uvicorn workers share a
+# single copy of each payload (stored as compact JSON) with the same TTL / LRU rules. Each worker
+# keeps a few decoded payloads in memory, revalidated against the row's fetch time on every get.
+# Hit/miss/eviction counters are per worker; entries and bytes are shared. acquire()/release()
+# give a per-key lease so only one worker refreshes a key at a time.
+import os, json, time, sqlite3, threading
+from collections import OrderedDict
+
+def json_size(data):
+    return len(json.dumps(data, separators=(",", ":")))
+
+class TTLCache:
+    backend, shared = "memory", False
+
+    def __init__(self, name, ttl_sec, hard_ttl_sec, max_entries=0, max_bytes=0, sizeof=json_size, clock=time.time):
+        self.name, self.ttl_sec, self.hard_ttl_sec = name, ttl_sec, hard_ttl_sec
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self.sizeof, self.clock = sizeof, clock
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def __len__(self):
+        return len(self._d)
+
+    def _drop(self, key):
+        self.nbytes -= self._d.pop(key)["nbytes"]
+
+    def get(self, key):
+        """Live entry (fresh or stale), or None when missing / past its hard TTL."""
+        with self._lock:
+            e = self._d.get(key)
+            if e is not None and e["expires"] > self.clock():
+                self._d.move_to_end(key)
+                self.hits += 1
+                return e
+            if e is not None:
+                self._drop(key)
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def peek(self, key, with_data=True):
+        """Like get() without touching recency or counters."""
+        with self._lock:
+            e = self._d.get(key)
+        return e if e is not None and e["expires"] > self.clock() else None
+
+    def put(self, key, data, fetched=None):
+        """Store data aged from `fetched` (epoch sec the upstream data was fetched; default now)."""
+        t = self.clock() if fetched is None else fetched
+        e = {"data": data, "fetched": t, "fresh_until": t + self.ttl_sec, "expires": t + self.hard_ttl_sec,
+             "nbytes": self.sizeof(data)}
+        with self._lock:
+            if key in self._d:
+                self._drop(key)
+            self._d[key] = e
+            self.nbytes += e["nbytes"]
+            # the newest entry always stays, even if it alone is over max_bytes
+            while len(self._d) > 1 and ((self.max_entries and len(self._d) > self.max_entries) or
+                                        (self.max_bytes and self.nbytes > self.max_bytes)):
+                self._drop(next(iter(self._d)))
+                self.evictions += 1
+        return e
+
+    def sweep(self):
+        """Drop entries past their hard TTL; returns how many."""
+        now = self.clock()
+        with self._lock:
+            dead = [k for k, e in self._d.items() if e["expires"] <= now]
+            for k in dead:
+                self._drop(k)
+            self.expired += len(dead)
+        return len(dead)
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            return {"backend": self.backend, "entries": len(self._d), "max_entries": self.max_entries,
+                    "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "occupancy": round(max(len(self._d) / self.max_entries if self.max_entries else 0,
+                                           self.nbytes / self.max_bytes if self.max_bytes else 0), 4),
+                    "stale": sum(e["fresh_until"] <= now for e in self._d.values()),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "expired": self.expired}
+
+class SqliteTTLCache:
+    backend, shared = "sqlite", True
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (store TEXT, key TEXT, data BLOB, fetched REAL, fresh_until REAL,
+                                        expires REAL, nbytes INTEGER, last_used REAL, PRIMARY KEY (store, key));
+    CREATE INDEX IF NOT EXISTS entries_lru ON entries (store, last_used);
+    CREATE TABLE IF NOT EXISTS leases (store TEXT, key TEXT, owner INTEGER, until REAL, PRIMARY KEY (store, key));
+    """
+
+    def __init__(self, path, name, ttl_sec, hard_ttl_sec, max_entries=0, max_bytes=0, clock=time.time,
+                 namespace=None, local_entries=4):
+        self.path, self.name, self.store = path, name, namespace or name
+        self.ttl_sec, self.hard_ttl_sec = ttl_sec, hard_ttl_sec
+        self.max_entries, self.max_bytes, self.clock = max_entries, max_bytes, clock
+        self.local_entries = local_entries
+        self._local = OrderedDict()   # key -> (fetched, decoded data)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA busy_timeout=30000")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM entries WHERE store=?", (self.store,)).fetchone()[0]
+
+    def _remember(self, key, fetched, data):
+        self._local[key] = (fetched, data)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_entries:
+            self._local.popitem(last=False)
+
+    def _row(self, key):
+        r = self._db.execute("SELECT fetched, fresh_until, expires, nbytes, last_used FROM entries WHERE store=? AND key=?",
+                             (self.store, key)).fetchone()
+        return None if r is None else dict(zip(("fetched", "fresh_until", "expires", "nbytes", "last_used"), r))
+
+    def _data(self, key, e):
+        hit = self._local.get(key)
+        if hit is not None and hit[0] == e["fetched"]:
+            self._local.move_to_end(key)
+            return hit[1]
+        blob = self._db.execute("SELECT data FROM entries WHERE store=? AND key=?", (self.store, key)).fetchone()
+        if blob is None:   # replaced or evicted by another worker in between
+            return None
+        data = json.loads(blob[0])
+        self._remember(key, e["fetched"], data)
+        return data
+
+    def get(self, key):
+        """Live entry (fresh or stale), or None when missing / past its hard TTL."""
+        now = self.clock()
+        with self._lock:
+            e = self._row(key)
+            if e is not None and e["expires"] > now:
+                data = self._data(key, e)
+                if data is not None:
+                    if now - e.pop("last_used") > 1.0:   # LRU order to the second; skips a write per hit
+                        self._db.execute("UPDATE entries SET last_used=? WHERE store=? AND key=?", (now, self.store, key))
+                    self.hits += 1
+                    return {"data": data, **e}
+            elif e is not None:
+                self._db.execute("DELETE FROM entries WHERE store=? AND key=? AND expires<=?", (self.store, key, now))
+                self._local.pop(key, None)
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def peek(self, key, with_data=False):
+        """Like get() without touching recency or counters; metadata only unless with_data."""
+        with self._lock:
+            e = self._row(key)
+            if e is None or e["expires"] <= self.clock():
+                return None
+            e.pop("last_used")
+            if with_data:
+                e["data"] = self._data(key, e)
+                if e["data"] is None:
+                    return None
+            return e
+
+    def put(self, key, data, fetched=None):
+        """Store data aged from `fetched` (epoch sec the upstream data was fetched; default now)."""
+        now = self.clock()
+        t = now if fetched is None else fetched
+        blob = json.dumps(data, separators=(",", ":")).encode()
+        e = {"data": data, "fetched": t, "fresh_until": t + self.ttl_sec, "expires": t + self.hard_ttl_sec,
+             "nbytes": len(blob)}
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?)",
+                                 (self.store, key, blob, t, e["fresh_until"], e["expires"], len(blob), now))
+                n, nbytes = self._db.execute("SELECT count(*), total(nbytes) FROM entries WHERE store=?",
+                                             (self.store,)).fetchone()
+                while n > 1 and ((self.max_entries and n > self.max_entries) or (self.max_bytes and nbytes > self.max_bytes)):
+                    old, size = self._db.execute("SELECT key, nbytes FROM entries WHERE store=? AND key!=? "
+                                                 "ORDER BY last_used LIMIT 1", (self.store, key)).fetchone()
+                    self._db.execute("DELETE FROM entries WHERE store=? AND key=?", (self.store, old))
+                    self._local.pop(old, None)
+                    n, nbytes = n - 1, nbytes - size
+                    self.evictions += 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._remember(key, t, data)
+        return e
+
+    def sweep(self):
+        """Drop entries past their hard TTL (and dead leases); returns how many entries."""
+        now = self.clock()
+        with self._lock:
+            n = self._db.execute("DELETE FROM entries WHERE store=? AND expires<=?", (self.store, now)).rowcount
+            self._db.execute("DELETE FROM leases WHERE store=? AND until<=?", (self.store, now))
+            self.expired += n
+        return n
+
+    def acquire(self, key, lease_sec):
+        """Take the refresh lease for key unless another live holder has it."""
+        now = self.clock()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM leases WHERE store=? AND key=? AND until<=?", (self.store, key, now))
+                got = self._db.execute("INSERT OR IGNORE INTO leases VALUES (?,?,?,?)",
+                                       (self.store, key, os.getpid(), now + lease_sec)).rowcount == 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return got
+
+    def release(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE store=? AND key=? AND owner=?", (self.store, key, os.getpid()))
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            n, nbytes, stale = self._db.execute(
+                "SELECT count(*), total(nbytes), total(fresh_until<=?) FROM entries WHERE store=?", (now, self.store)).fetchone()
+        return {"backend": self.backend, "path": self.path, "entries": n, "max_entries": self.max_entries,
+                "bytes": int(nbytes), "max_bytes": self.max_bytes,
+                "occupancy": round(max(n / self.max_entries if self.max_entries else 0,
+                                       nbytes / self.max_bytes if self.max_bytes else 0), 4),
+                "stale": int(stale), "local_entries": len(self._local), "worker_pid": os.getpid(),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "expired": self.expired}
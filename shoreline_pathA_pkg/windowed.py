@@ -0,0 +1,191 @@
+# windowed.py — bounded-memory NDWI processing over rasterio row-strip windows
+#
+# The whole-array path (train_model.raster_to_water / contour_coastline) holds the
+# band plus several full-size temporaries. Here every pass reads one strip at a time:
+#   1. min/max/count            -> rescale decision (same as prepare_ndwi)
+#   2. histogram + gather pass  -> exact percentiles (same values as np.nanpercentile)
+#   3. water-fraction counts    -> threshold/orientation (thresholds.decide)
+#   4. polygonize / contour per strip, stitched across strip edges (the contour's water component
+#      is labelled per strip and joined through the row each strip shares with the next)
+# Peak raster memory is ~ RASTER_MEMORY_MB regardless of scene size.
+import numpy as np
+import shapely
+from scipy import ndimage, sparse
+from scipy.sparse.csgraph import connected_components
+from rasterio.windows import Window
+from rasterio.features import shapes
+from shapely.geometry import shape, LineString
+from shapely.ops import unary_union
+from affine import Affine
+
+from config import NDWI_THRESHOLD, NDWI_AUTO_RESCALE, NDWI_WATER_HIGH, RASTER_MEMORY_MB
+from contours import EIGHT, iso_segments, longest_line, nan_as_land, touching_cells
+from thresholds import HIST_BINS, hist_binner, percentile_ranks, lerp_percentile, decide
+
+# float32 band + rescaled copy + masks + polygonize scratch, per strip pixel
+BYTES_PER_PIXEL = 16
+
+def needs_windowing(src, budget_mb=RASTER_MEMORY_MB):
+    return exceeds_budget(src.height, src.width, budget_mb)
+
+def exceeds_budget(height, width, budget_mb=RASTER_MEMORY_MB):
+    return bool(budget_mb) and width * height * BYTES_PER_PIXEL > budget_mb * 2**20
+
+def strip_windows(src, budget_mb=RASTER_MEMORY_MB, overlap=0):
+    """Full-width row strips sized to the budget; `overlap` extra rows shared with the next strip."""
+    rows = max(1, int(budget_mb * 2**20 // (src.width * BYTES_PER_PIXEL)) - overlap)
+    for r0 in range(0, src.height, rows):
+        yield Window(0, r0, src.width, min(rows + overlap, src.height - r0))
+
+class WindowedNDWI:
+    """One NDWI band streamed strip by strip, with prepare_ndwi's NaN/rescale handling."""
+
+    def __init__(self, src, budget_mb=RASTER_MEMORY_MB):
+        self.src, self.budget_mb = src, budget_mb
+        self.n, vmin, vmax = 0, np.inf, -np.inf
+        for _, arr in self._raw():
+            v = arr[np.isfinite(arr)]
+            if v.size:
+                self.n += v.size
+                vmin, vmax = min(vmin, float(v.min())), max(vmax, float(v.max()))
+        self.vmin, self.vmax = vmin, vmax
+        self.rescale = self.n > 0 and NDWI_AUTO_RESCALE and (vmax - vmin) > 2.0
+
+    def _raw(self, overlap=0):
+        for win in strip_windows(self.src, self.budget_mb, overlap):
+            arr = self.src.read(1, window=win).astype(np.float32)
+            arr[~np.isfinite(arr)] = np.nan
+            yield win, arr
+
+    def strips(self, overlap=0):
+        for win, arr in self._raw(overlap):
+            if self.rescale:
+                arr = (arr - self.vmin) / (self.vmax - self.vmin + 1e-9)
+            yield win, arr
+
+    def value_range(self):
+        if not self.rescale:
+            return self.vmin, self.vmax
+        lo, hi = np.float32(self.vmin), np.float32(self.vmax)
+        span = self.vmax - self.vmin + 1e-9
+        return float((lo - self.vmin) / span), float((hi - self.vmin) / span)
+
+    def percentiles(self, qs):
+        """Exact np.nanpercentile (linear) values for each q, via histogram + gather of the needed ranks."""
+        n = self.n
+        need = {r for q in qs for r in percentile_ranks(n, q)[:2]}
+        # thresholds' binning, shared by both passes, keeps ranks consistent
+        binof = hist_binner(*self.value_range())
+        counts = np.zeros(HIST_BINS, dtype=np.int64)
+        for _, arr in self.strips():
+            counts += np.bincount(binof(arr[np.isfinite(arr)]), minlength=HIST_BINS)
+        cum = np.concatenate([[0], np.cumsum(counts)])
+
+        # bins holding each needed order statistic; gather only their values
+        bins = {r: int(np.searchsorted(cum, r, side="right") - 1) for r in need}
+        wanted = sorted(set(bins.values()))
+        gathered = {b: [] for b in wanted}
+        for _, arr in self.strips():
+            v = arr[np.isfinite(arr)]
+            idx = binof(v)
+            for b in wanted:
+                gathered[b].append(v[idx == b])
+        gathered = {b: np.sort(np.concatenate(g)) for b, g in gathered.items()}
+        kth = lambda k: gathered[bins[k]][k - cum[bins[k]]]
+        return {q: lerp_percentile(kth, n, q) for q in qs}
+
+    def water_fractions(self, rules):
+        """Water fraction over valid pixels for each (thr_val, water_high) rule."""
+        hits = np.zeros(len(rules), dtype=np.int64)
+        for _, arr in self.strips():
+            valid = np.isfinite(arr)
+            for i, (t, high) in enumerate(rules):
+                hits[i] += int(np.count_nonzero(((arr >= t) if high else (arr <= t)) & valid))
+        return [float(h / self.n) for h in hits]
+
+    def decide(self, thr=NDWI_THRESHOLD):
+        """thresholds.decide from streamed statistics: (thr_val, water_high, audit)."""
+        pct = self.percentiles([60.0, 35.0, 65.0])
+        thr_val = pct[60.0] if thr == "auto" else float(thr)
+        mid = 0.5 * (pct[35.0] + pct[65.0])
+        rules = [(thr_val, NDWI_WATER_HIGH), (thr_val, not NDWI_WATER_HIGH), (mid, True), (mid, False)]
+        fracs = dict(zip(rules, self.water_fractions(rules)))
+        return decide(pct.__getitem__, lambda t, high: fracs[(t, high)], thr)
+
+    def water_rule(self, thr=NDWI_THRESHOLD):
+        thr_val, water_high, _ = self.decide(thr)
+        return thr_val, water_high
+
+def water_polygons(src, thr=NDWI_THRESHOLD, budget_mb=RASTER_MEMORY_MB):
+    """
+    Windowed raster_to_water: polygonize each strip in integer pixel space (so polygons
+    from adjacent strips share exact edges), union, then georeference once.
+    """
+    nd = WindowedNDWI(src, budget_mb)
+    if nd.n == 0:
+        return None
+    thr_val, high = nd.water_rule(thr)
+    geoms = []
+    for win, arr in nd.strips():
+        water = (arr >= thr_val).astype(np.uint8) if high else (arr <= thr_val).astype(np.uint8)
+        shift = Affine.translation(0, win.row_off)
+        for shp, val in shapes(water, transform=shift):
+            if int(val) == 1:
+                geoms.append(shape(shp))
+    if not geoms:
+        return None
+    # simplify(0) drops the collinear vertices left where strip seams were dissolved
+    merged = shapely.simplify(unary_union(geoms), 0)
+    t = src.transform
+    georef = lambda g: shapely.transform(g, lambda xy: np.column_stack(t * (xy[:, 0], xy[:, 1])))
+    # keep the whole-array path's ring direction, so the coastline (and transect normals) run the same
+    # way: a single water polygon passes through its unary_union as rasterio traced it (clockwise in
+    # pixel space), several come out with clockwise shells in world space
+    if merged.geom_type == "Polygon":
+        return georef(shapely.orient_polygons(merged, exterior_cw=True))
+    return shapely.orient_polygons(georef(merged), exterior_cw=True)
+
+def contour_line(src, thr=NDWI_THRESHOLD, budget_mb=RASTER_MEMORY_MB):
+    """
+    Windowed contour_coastline (train_model.shore_line): strips overlap by one row so no cell is
+    lost at strip edges, and the iso-line is traced around the largest water component only.
+    """
+    nd = WindowedNDWI(src, budget_mb)
+    if nd.n == 0:
+        return LineString()
+    thr_val, high = nd.water_rule(thr)
+    water = lambda arr: (arr >= thr_val) if high else (arr <= thr_val)
+    segs = []
+    for (win, arr), ids in zip(nd.strips(overlap=1), _largest_component_labels(nd, water)):
+        labels, _ = ndimage.label(water(arr), structure=EIGHT)
+        cells = touching_cells(np.isin(labels, ids))
+        segs.append(iso_segments(nan_as_land(arr, thr_val, high), thr_val, row_offset=win.row_off, cells=cells))
+    line = longest_line(np.concatenate(segs), src.transform)
+    return line if high or line.is_empty else line.reverse()
+
+def _largest_component_labels(nd, water):
+    """
+    Streamed contours.largest_component: for each strip (overlap=1), its ndimage labels that belong
+    to the scene's largest 8-connected water component. Strips are labelled on their own; labels
+    meeting on a shared row are the same component.
+    """
+    sizes, counts, links, last = [], [], [], None
+    for k, (_, arr) in enumerate(nd.strips(overlap=1)):
+        labels, n = ndimage.label(water(arr), structure=EIGHT)
+        off = len(sizes)
+        # the shared first row was counted with the strip above
+        sizes.extend(np.bincount(labels[1 if k else 0:].ravel(), minlength=n + 1)[1:])
+        ids = np.where(labels > 0, labels + off - 1, -1)
+        if last is not None:
+            both = (last >= 0) & (ids[0] >= 0)
+            links.append(np.stack([last[both], ids[0][both]]))
+        last = ids[-1]
+        counts.append(n)
+    if not sizes:
+        return [np.empty(0, dtype=int) for _ in counts]
+    pairs = np.concatenate(links, axis=1) if links else np.empty((2, 0), dtype=int)
+    graph = sparse.coo_matrix((np.ones(pairs.shape[1]), (pairs[0], pairs[1])), shape=(len(sizes), len(sizes)))
+    _, comp = connected_components(graph, directed=False)
+    best = np.argmax(np.bincount(comp, weights=sizes))
+    offs = np.cumsum([0] + counts)
+    return [np.flatnonzero(comp[o:o + n] == best) + 1 for o, n in zip(offs, counts)]